@@ -66,8 +66,10 @@ from app.navigation import (
     MainNavigation,
     OrgNavigation,
 )
+from app.notify_client import clear_request_memo
 from app.notify_client.api_key_api_client import api_key_api_client
 from app.notify_client.billing_api_client import billing_api_client
+from app.notify_client.cache import cache_serializer, local_cache
 from app.notify_client.complaint_api_client import complaint_api_client
 from app.notify_client.email_branding_client import email_branding_client
 from app.notify_client.events_api_client import events_api_client
@@ -79,6 +81,7 @@ from app.notify_client.letter_branding_client import letter_branding_client
 from app.notify_client.letter_jobs_client import letter_jobs_client
 from app.notify_client.newsletter_api_client import newsletter_api_client
 from app.notify_client.notification_api_client import notification_api_client
+from app.notify_client.notification_counts_client import clear_todays_counts_from_redis
 from app.notify_client.org_invite_api_client import org_invite_api_client
 from app.notify_client.organisations_api_client import organisations_client
 from app.notify_client.platform_stats_api_client import platform_stats_api_client
@@ -199,6 +202,8 @@ def create_app(application):
         zendesk_client,
         redis_client,
         bounce_rate_client,
+        local_cache,
+        cache_serializer,
     ):
         client.init_app(application)
 
@@ -272,6 +277,8 @@ def init_app(application):
     application.before_request(load_organisation_before_request)
     application.before_request(request_helper.check_proxy_header_before_request)
     application.before_request(load_request_nonce)
+    application.teardown_request(clear_request_memo)
+    application.teardown_request(clear_todays_counts_from_redis)
 
     @application.before_request
     def make_session_permanent():
@@ -6,10 +6,19 @@ REQUEST_TIMEOUT = 5
 GC_ARTICLES_AUTH_API_ENDPOINT = "/wp-json/jwt-auth/v1/token"
 GC_ARTICLES_AUTH_TOKEN_CACHE_KEY = "gc-articles-bearer-token"
 GC_ARTICLES_AUTH_TOKEN_CACHE_TTL = int(timedelta(days=1).total_seconds())
+# Cached tokens are replaced this long before they expire
+GC_ARTICLES_AUTH_TOKEN_EXPIRY_MARGIN = int(timedelta(minutes=5).total_seconds())
 GC_ARTICLES_FALLBACK_CACHE_PREFIX = "gc-articles-fallback--"
 GC_ARTICLES_FALLBACK_CACHE_TTL = int(timedelta(days=7).total_seconds())
 GC_ARTICLES_CACHE_PREFIX = "gc-articles--"
 GC_ARTICLES_DEFAULT_CACHE_TTL = int(timedelta(days=1).total_seconds())
+# Cached pages older than this are still shown, but are fetched again in the background
+GC_ARTICLES_FRESH_CACHE_TTL = int(timedelta(minutes=5).total_seconds())
+GC_ARTICLES_REFRESH_LOCK_TTL = 30
+# How often the list of every page's slug is fetched again, and how long a path with no page is remembered
+GC_ARTICLES_SLUG_INDEX_FRESH_TTL = int(timedelta(minutes=5).total_seconds())
+GC_ARTICLES_MISSING_PAGE_CACHE_TTL = int(timedelta(minutes=5).total_seconds())
+GC_ARTICLES_SLUG_INDEX_PAGE_SIZE = 100
 GC_ARTICLES_NAV_CACHE_TTL = int(timedelta(days=5).total_seconds())
 
 
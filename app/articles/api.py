@@ -1,3 +1,6 @@
+import base64
+import hashlib
+import time
 from typing import Union
 
 import requests
@@ -8,15 +11,21 @@ from app.articles import (
     GC_ARTICLES_AUTH_API_ENDPOINT,
     GC_ARTICLES_AUTH_TOKEN_CACHE_KEY,
     GC_ARTICLES_AUTH_TOKEN_CACHE_TTL,
+    GC_ARTICLES_AUTH_TOKEN_EXPIRY_MARGIN,
     GC_ARTICLES_FALLBACK_CACHE_PREFIX,
     GC_ARTICLES_FALLBACK_CACHE_TTL,
+    GC_ARTICLES_SLUG_INDEX_PAGE_SIZE,
     REQUEST_TIMEOUT,
     get_current_locale,
 )
 from app.extensions import redis_client
 
 
-def get_content(endpoint: str, params={}, auth_required=False, cacheable=True) -> Union[dict, None]:
+def get_content(endpoint: str, params={}, auth_required=False, cacheable=True, empty_result=None) -> Union[dict, None]:
+    """
+    Get content from GC Articles, or None if it can't be fetched. If GC Articles answers with
+    nothing at all, `empty_result` is returned instead, so callers can tell the two apart.
+    """
     base_url = current_app.config["GC_ARTICLES_API"]
     cache_key = _get_cache_key(endpoint, params)
     headers = _get_headers(auth_required=auth_required)
@@ -24,12 +33,22 @@ def get_content(endpoint: str, params={}, auth_required=False, cacheable=True) -
     try:
         url = f"https://{base_url}/wp-json/{endpoint}"
         response = requests.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+
+        if auth_required and response.status_code in (401, 403) and _forget_token_if_rejected(headers):
+            """The cached token has stopped working, so try once more with a new one"""
+            headers = _get_headers(auth_required=True)
+            response = requests.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+
         parsed = json.loads(response.content.decode("utf-8"))
 
         if response.status_code == 403:
             raise Forbidden()
 
-        if response.status_code >= 400 or not parsed:
+        if response.status_code < 400 and not parsed:
+            current_app.logger.info(f"No content found. URL: {url}, params: {params}")
+            return empty_result
+
+        if response.status_code >= 400:
             """Getting back a 4xx or 5xx status code"""
             current_app.logger.info(
                 f"Error requesting content. URL: {url}, params: {params}, status: {response.status_code}, data: {parsed}"
@@ -61,9 +80,40 @@ def get_content(endpoint: str, params={}, auth_required=False, cacheable=True) -
         return None
 
 
+def get_page_slugs(lang: str) -> Union[list, None]:
+    """
+    Get the slug of every published page in `lang`, a page of results at a time, or None if
+    GC Articles can't list them all.
+    """
+    base_url = current_app.config["GC_ARTICLES_API"]
+    url = f"https://{base_url}/wp-json/wp/v2/pages"
+    headers = _get_headers()
+    slugs = []
+    page = 1
+
+    try:
+        while True:
+            params: dict[str, str | int] = {
+                "lang": lang,
+                "per_page": GC_ARTICLES_SLUG_INDEX_PAGE_SIZE,
+                "page": page,
+                "_fields": "slug",
+            }
+            response = requests.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            slugs += [item["slug"] for item in json.loads(response.content.decode("utf-8"))]
+
+            if page >= int(response.headers.get("X-WP-TotalPages", 1)):
+                return slugs
+            page += 1
+    except Exception as err:
+        current_app.logger.info(f"Error listing page slugs. URL: {url}, lang: {lang}, page: {page}: {err}")
+        return None
+
+
 def _get_cache_key(endpoint, params):
     cache_key = f"{GC_ARTICLES_FALLBACK_CACHE_PREFIX}{endpoint}"
-    lang = get_current_locale(current_app)
+    lang = params.get("lang") or get_current_locale(current_app)
     slug = params.get("slug")
     if slug:
         cache_key += f"/{lang}/{slug}"
@@ -83,16 +133,23 @@ def validate_token(token):
     return res.status_code == 200
 
 
+# This process's copy of the cached token, so most requests don't need to ask Redis for it either
+_token_cache: dict = {}
+
+
 def authenticate(username, password, base_endpoint) -> Union[str, None]:
+    """
+    Get a token for the GC Articles API, reusing the cached one until it's about to expire.
+    """
     auth_endpoint = GC_ARTICLES_AUTH_API_ENDPOINT
 
     url = f"https://{base_endpoint}{auth_endpoint}"
+    credentials = hashlib.sha256(f"{base_endpoint}|{username}|{password}".encode("utf-8")).hexdigest()
 
-    """If we have a token cached, check if it's still valid and return it"""
-    if redis_client.get(GC_ARTICLES_AUTH_TOKEN_CACHE_KEY) is not None:
-        token = redis_client.get(GC_ARTICLES_AUTH_TOKEN_CACHE_KEY)
-        if validate_token(token):
-            return token
+    """If we have a token cached that isn't about to expire, return it"""
+    cached = _get_cached_token(credentials)
+    if cached is not None:
+        return cached["token"]
 
     try:
         """Otherwise get a fresh one"""
@@ -100,13 +157,65 @@ def authenticate(username, password, base_endpoint) -> Union[str, None]:
 
         parsed = json.loads(res.text)
 
-        redis_client.set(GC_ARTICLES_AUTH_TOKEN_CACHE_KEY, parsed["token"], ex=GC_ARTICLES_AUTH_TOKEN_CACHE_TTL)
+        _cache_token(credentials, parsed["token"])
 
         return parsed["token"]
     except Exception:
         return None
 
 
+def _get_cached_token(credentials):
+    cached = _token_cache.get("token")
+    if cached is None:
+        try:
+            cached = json.loads(redis_client.get(GC_ARTICLES_AUTH_TOKEN_CACHE_KEY))
+        except (TypeError, ValueError):
+            # Nothing cached, or a token cached without its expiry
+            return None
+        if not isinstance(cached, dict):
+            return None
+
+    if cached.get("credentials") != credentials or cached["expires_at"] - time.time() < GC_ARTICLES_AUTH_TOKEN_EXPIRY_MARGIN:
+        return None
+
+    _token_cache["token"] = cached
+    return cached
+
+
+def _cache_token(credentials, token):
+    expires_at = _get_token_expiry(token) or time.time() + GC_ARTICLES_AUTH_TOKEN_CACHE_TTL
+    cached = {"token": token, "credentials": credentials, "expires_at": expires_at}
+    _token_cache["token"] = cached
+    ttl = int(min(expires_at - time.time(), GC_ARTICLES_AUTH_TOKEN_CACHE_TTL))
+    if ttl > 0:
+        redis_client.set(GC_ARTICLES_AUTH_TOKEN_CACHE_KEY, json.dumps(cached), ex=ttl)
+
+
+def _get_token_expiry(token) -> Union[int, None]:
+    """
+    Read when a JWT expires from its payload, without verifying it. GC Articles checks the signature.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return int(claims["exp"])
+    except Exception:
+        return None
+
+
+def _forget_token_if_rejected(headers) -> bool:
+    """
+    After GC Articles refuses a request, check whether the token we sent is still valid. If it
+    isn't, forget it so that the next `authenticate` gets a new one.
+    """
+    token = headers.get("Authorization", "").removeprefix("Bearer ")
+    if validate_token(token):
+        return False
+    _token_cache.clear()
+    redis_client.delete(GC_ARTICLES_AUTH_TOKEN_CACHE_KEY)
+    return True
+
+
 def _get_headers(auth_required=False):
     base_endpoint = current_app.config["GC_ARTICLES_API"]
     username = current_app.config["GC_ARTICLES_API_AUTH_USERNAME"]
@@ -17,11 +17,31 @@ def get_nav_items() -> Optional[list]:
     return items
 
 
-def _get_nav_wp(locale: str) -> Optional[list]:
-    nav_url = "menus/v1/menus/notify-admin"
+def _get_nav_url(locale: str) -> str:
     if locale == "fr":
-        nav_url = "menus/v1/menus/notify-admin-fr"
+        return "menus/v1/menus/notify-admin-fr"
+    return "menus/v1/menus/notify-admin"
+
+
+def cache_nav(locale: str) -> bool:
+    """
+    Fetch the navigation menu for `locale` from GC Articles and cache it, even if it's already
+    cached. Returns whether the menu was found.
+    """
+    return _fetch_nav_wp(_get_nav_url(locale)) is not None
+
 
+def _fetch_nav_wp(nav_url: str) -> Optional[dict]:
+    cache_key = f"{GC_ARTICLES_CACHE_PREFIX}{nav_url}"
+    nav_response = get_content(nav_url)
+    if nav_response is not None:
+        redis_client.set(cache_key, json.dumps(nav_response), ex=GC_ARTICLES_NAV_CACHE_TTL)
+        current_app.logger.info(f"Saving menu to cache: {cache_key}")
+    return nav_response
+
+
+def _get_nav_wp(locale: str) -> Optional[list]:
+    nav_url = _get_nav_url(locale)
     cache_key = f"{GC_ARTICLES_CACHE_PREFIX}{nav_url}"
 
     cached = redis_client.get(cache_key)
@@ -29,11 +49,8 @@ def _get_nav_wp(locale: str) -> Optional[list]:
         current_app.logger.info(f"Cache hit: {cache_key}")
         nav_response = json.loads(cached)
     else:
-        nav_response = get_content(nav_url)
-        if nav_response is not None:
-            redis_client.set(cache_key, json.dumps(nav_response), ex=GC_ARTICLES_NAV_CACHE_TTL)
-            current_app.logger.info(f"Saving menu to cache: {cache_key}")
-        else:
+        nav_response = _fetch_nav_wp(nav_url)
+        if nav_response is None:
             return []
 
     nav_items = None
@@ -1,3 +1,5 @@
+import threading
+import time
 from typing import Union
 
 from flask import current_app, json
@@ -5,39 +7,195 @@ from flask import current_app, json
 from app.articles import (
     GC_ARTICLES_CACHE_PREFIX,
     GC_ARTICLES_DEFAULT_CACHE_TTL,
+    GC_ARTICLES_FRESH_CACHE_TTL,
+    GC_ARTICLES_MISSING_PAGE_CACHE_TTL,
+    GC_ARTICLES_REFRESH_LOCK_TTL,
+    GC_ARTICLES_SLUG_INDEX_FRESH_TTL,
     get_current_locale,
 )
-from app.articles.api import get_content
+from app.articles.api import get_content, get_page_slugs
 from app.extensions import redis_client
 
+# Returned instead of None when GC Articles answers that it has no such page, rather than failing to answer
+NO_PAGE = object()
 
-def get_page_by_slug_with_cache(endpoint: str, params={"slug": ""}) -> Union[dict, None]:
+
+def get_page_by_slug_with_cache(endpoint: str, params={"slug": ""}, empty_result=None) -> Union[dict, None]:
+    """
+    Get a page from the cache, or from GC Articles if it isn't cached yet. If GC Articles has no
+    such page, `empty_result` is returned.
+
+    Cached pages are shown for up to `GC_ARTICLES_DEFAULT_CACHE_TTL`. Once a page is older than
+    `GC_ARTICLES_FRESH_CACHE_TTL` it is still shown, and fetched again in the background so
+    the next visitor sees any changes without waiting on GC Articles.
+    """
     lang = get_current_locale(current_app)
-    slug = params.get("slug")
-    cache_key = f"{GC_ARTICLES_CACHE_PREFIX}{endpoint}/{lang}/{slug}"
+    cache_key = _page_cache_key(endpoint, lang, params.get("slug"))
+    params = {"lang": lang, **params}
 
     cached = redis_client.get(cache_key)
 
     if cached is not None:
         current_app.logger.info(f"Cache hit: {cache_key}")
-        response = json.loads(cached)
-    else:
-        response = get_page_by_slug(endpoint, params)
+        entry = json.loads(cached)
+        # Pages cached before they were saved with the time they were fetched are treated as stale
+        if not isinstance(entry, dict) or "fetched_at" not in entry:
+            entry = {"response": entry, "fetched_at": 0}
+        if time.time() - entry["fetched_at"] >= GC_ARTICLES_FRESH_CACHE_TTL:
+            _refresh_page_in_background(endpoint, params, cache_key)
+        return entry["response"]
+
+    response = get_page_by_slug(endpoint, params, empty_result=empty_result)
 
-        if response is not None:
-            current_app.logger.info(f"Saving menu to cache: {cache_key}")
-            redis_client.set(cache_key, json.dumps(response), ex=GC_ARTICLES_DEFAULT_CACHE_TTL)
+    if response is not None and response is not empty_result:
+        _set_page_cache(cache_key, response)
 
     return response
 
 
-def get_page_by_slug(endpoint: str, params={"slug": ""}) -> Union[dict, None]:
+def cache_page_by_slug(endpoint: str, slug: str, lang: str) -> bool:
+    """
+    Fetch a page from GC Articles and cache it for `get_page_by_slug_with_cache`, even if it's
+    already cached. Returns whether the page was found.
+    """
+    response = get_content(endpoint, {"slug": slug, "lang": lang}, auth_required=False)
+    if response is None:
+        return False
+    _set_page_cache(_page_cache_key(endpoint, lang, slug), response)
+    return True
+
+
+def _page_cache_key(endpoint, lang, slug):
+    return f"{GC_ARTICLES_CACHE_PREFIX}{endpoint}/{lang}/{slug}"
+
+
+def _set_page_cache(cache_key, response):
+    current_app.logger.info(f"Saving page to cache: {cache_key}")
+    redis_client.set(
+        cache_key,
+        json.dumps({"response": response, "fetched_at": time.time()}),
+        ex=GC_ARTICLES_DEFAULT_CACHE_TTL,
+    )
+
+
+def _refresh_page_in_background(endpoint, params, cache_key):
+    _refresh_in_background(cache_key, _refresh_page, endpoint, params, cache_key)
+
+
+def _refresh_in_background(cache_key, refresh, *args):
+    """
+    Call `refresh(app, *args, lock_key)` on a background thread, unless another worker is
+    already refreshing `cache_key`. `refresh` must delete `lock_key` when it's done.
+    """
+    lock_key = f"{cache_key}-refresh-lock"
+    if not redis_client.set(lock_key, "1", ex=GC_ARTICLES_REFRESH_LOCK_TTL, nx=True):
+        return
+    threading.Thread(
+        target=refresh,
+        args=(current_app._get_current_object(), *args, lock_key),
+        daemon=True,
+    ).start()
+
+
+def _refresh_page(app, endpoint, params, cache_key, lock_key):
+    with app.app_context():
+        try:
+            response = get_content(endpoint, params, auth_required=False)
+            if response is not None:
+                _set_page_cache(cache_key, response)
+        except Exception as e:
+            current_app.logger.warning(f"Unable to refresh cached page {cache_key}: {e}")
+        finally:
+            redis_client.delete(lock_key)
+
+
+def _slug_index_cache_key(lang):
+    return f"{GC_ARTICLES_CACHE_PREFIX}slug-index/{lang}"
+
+
+def _missing_page_cache_key(slug):
+    return f"{GC_ARTICLES_CACHE_PREFIX}missing/{slug}"
+
+
+def get_slug_index(lang: str) -> Union[set, None]:
+    """
+    Get the slugs of every published page in `lang`, or None if they haven't been listed yet.
+
+    The slugs are listed again in the background every `GC_ARTICLES_SLUG_INDEX_FRESH_TTL`.
+    """
+    cache_key = _slug_index_cache_key(lang)
+    cached = redis_client.get(cache_key)
+
+    if cached is None:
+        _refresh_in_background(cache_key, _refresh_slug_index, lang)
+        return None
+
+    entry = json.loads(cached)
+    if time.time() - entry["fetched_at"] >= GC_ARTICLES_SLUG_INDEX_FRESH_TTL:
+        _refresh_in_background(cache_key, _refresh_slug_index, lang)
+    return set(entry["slugs"])
+
+
+def cache_slug_index(lang: str) -> bool:
+    """
+    List the slugs of every published page in `lang` and cache them for `get_slug_index`.
+    Returns whether GC Articles could list them.
+    """
+    slugs = get_page_slugs(lang)
+    if slugs is None:
+        return False
+    redis_client.set(
+        _slug_index_cache_key(lang),
+        json.dumps({"slugs": slugs, "fetched_at": time.time()}),
+        ex=GC_ARTICLES_DEFAULT_CACHE_TTL,
+    )
+    return True
+
+
+def _refresh_slug_index(app, lang, lock_key):
+    with app.app_context():
+        try:
+            cache_slug_index(lang)
+        except Exception as e:
+            current_app.logger.warning(f"Unable to refresh the slug index for {lang}: {e}")
+        finally:
+            redis_client.delete(lock_key)
+
+
+def is_unknown_page(endpoint: str, slug: str) -> bool:
+    """
+    Whether GC Articles is known not to have a page at `slug` in any language, either because a
+    recent request for it found nothing or because it isn't in the slug index, so the request can
+    be answered with a 404 without asking GC Articles. Cached pages are never unknown, even if
+    they were published after the slug index was last listed.
+    """
+    current_lang = get_current_locale(current_app)
+    languages = [current_lang] + [lang for lang in current_app.config["LANGUAGES"] if lang != current_lang]
+    if any(redis_client.get(_page_cache_key(endpoint, lang, slug)) is not None for lang in languages):
+        return False
+
+    if redis_client.get(_missing_page_cache_key(slug)) is not None:
+        return True
+
+    slug_indexes = [get_slug_index(lang) for lang in current_app.config["LANGUAGES"]]
+    known = [slugs for slugs in slug_indexes if slugs is not None]
+    if len(known) != len(slug_indexes):
+        return False
+    # WordPress lowercases slugs when it looks pages up
+    return all(slug.lower() not in slugs for slugs in known)
+
+
+def set_missing_page(slug: str) -> None:
+    redis_client.set(_missing_page_cache_key(slug), "1", ex=GC_ARTICLES_MISSING_PAGE_CACHE_TTL)
+
+
+def get_page_by_slug(endpoint: str, params={"slug": ""}, empty_result=None) -> Union[dict, None]:
     """if no explict lang is set, set to the current locale"""
     if not params.get("lang"):
         lang_params = {"lang": get_current_locale(current_app)}
-        return get_content(endpoint, {**params, **lang_params}, auth_required=False)
+        return get_content(endpoint, {**params, **lang_params}, auth_required=False, empty_result=empty_result)
 
-    return get_content(endpoint, params, auth_required=False)
+    return get_content(endpoint, params, auth_required=False, empty_result=empty_result)
 
 
 def get_page_by_id(endpoint: str) -> Union[dict, None]:
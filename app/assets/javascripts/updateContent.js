@@ -2,6 +2,7 @@
   "use strict";
 
   var queues = {};
+  var etags = {};
   //var dd = new diffDOM();
   var dd = new window.DiffDOM();
 
@@ -23,8 +24,15 @@
       $.ajax(resource, {
         method: form ? "post" : "get",
         data: form ? $("#" + form).serialize() : {},
+        headers: etags[resource] ? { "If-None-Match": etags[resource] } : {},
       })
-        .done((response) => {
+        .done((response, textStatus, xhr) => {
+          if (xhr.status === 304) {
+            // nothing has changed since the last poll
+            clearQueue(queue);
+            return;
+          }
+          etags[resource] = xhr.getResponseHeader("ETag");
           flushQueue(queue, response);
           if (response.stop === 1) {
             poll = function () {};
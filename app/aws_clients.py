@@ -0,0 +1,55 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+from flask import current_app
+
+_session = None
+_session_pid = None
+_clients: dict = {}
+_lock = threading.Lock()
+
+
+def _get_boto3_config():
+    return Config(
+        max_pool_connections=current_app.config["AWS_MAX_POOL_CONNECTIONS"],
+        retries={"max_attempts": current_app.config["AWS_MAX_ATTEMPTS"], "mode": current_app.config["AWS_RETRY_MODE"]},
+    )
+
+
+def _get_boto3_session():
+    """
+    Get the boto3 session shared by every request in this worker. A new session, with new clients,
+    is made after a fork, because connections can't be shared between processes.
+    """
+    global _session, _session_pid
+    if _session_pid != os.getpid():
+        with _lock:
+            if _session_pid != os.getpid():
+                _clients.clear()
+                _session, _session_pid = boto3.session.Session(), os.getpid()
+    return _session
+
+
+def get_aws_client(service_name, region_name=None):
+    """
+    Get this worker's boto3 client for `service_name`, so its connection pool and loaded service model
+    are reused across requests instead of built for every call.
+    """
+    session = _get_boto3_session()
+    key = (service_name, region_name)
+    if key not in _clients:
+        with _lock:
+            if key not in _clients:
+                _clients[key] = session.client(service_name, region_name=region_name, config=_get_boto3_config())
+    return _clients[key]
+
+
+def get_s3_resource(region_name=None):
+    """
+    Get a new boto3 S3 resource, from its own session. Resources aren't thread-safe, so unlike
+    clients they can't be shared between the threads and greenlets of a worker. Use
+    `get_aws_client("s3")` where the client API will do.
+    """
+    return boto3.session.Session().resource("s3", region_name=region_name, config=_get_boto3_config())
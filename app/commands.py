@@ -1,5 +1,13 @@
+import time
+
+import click
 from flask import current_app
 
+UNTAGGED_TEMPLATE_CACHE_PATTERNS = [
+    "service-????????-????-????-????-????????????-templates",
+    "template-????????-????-????-????-????????????-version-*",
+]
+
 
 def list_routes():
     """List URLs of all application routes."""
@@ -7,5 +15,68 @@ def list_routes():
         print("{:10} {}".format(", ".join(rule.methods - set(["OPTIONS", "HEAD"])), rule.rule))  # noqa
 
 
+@click.option(
+    "--interval",
+    type=int,
+    default=None,
+    help="Warm the caches again every INTERVAL seconds until stopped, so they're refreshed before they expire.",
+)
+def warm_gc_articles_cache(interval):
+    """Fill the caches of GC Articles pages and menus, and of the homepage stats, in both languages."""
+    while True:
+        failures = _warm_gc_articles_cache()
+        print("Warmed GC Articles caches, {} failed: {}".format(len(failures), ", ".join(failures)))  # noqa
+        if not interval:
+            return
+        time.sleep(interval)
+
+
+def _warm_gc_articles_cache():
+    from app.articles.menu import cache_nav
+    from app.articles.pages import cache_page_by_slug, cache_slug_index
+    from app.articles.routing import GC_ARTICLES_ROUTES
+    from app.extensions import cache
+    from app.utils import get_latest_stats, get_live_services_count
+
+    def warm(name, warm_cache, *args):
+        try:
+            if warm_cache(*args) is False:
+                failures.append(name)
+        except Exception as e:
+            current_app.logger.warning(f"Unable to warm the cache of {name}: {e}")
+            failures.append(name)
+
+    def warm_latest_stats(lang):
+        cache.delete_memoized(get_latest_stats, lang, filter_heartbeats=True)
+        get_latest_stats(lang, filter_heartbeats=True)
+
+    failures: list = []
+    cache.delete_memoized(get_live_services_count)
+
+    for lang in current_app.config["LANGUAGES"]:
+        # Pages and menus are cached under the language of the request
+        with current_app.test_request_context("/", query_string={"lang": lang}):
+            warm(f"menu ({lang})", cache_nav, lang)
+            warm(f"slug index ({lang})", cache_slug_index, lang)
+            for paths in GC_ARTICLES_ROUTES.values():
+                warm(paths[lang], cache_page_by_slug, "wp/v2/pages", paths[lang].lstrip("/"), lang)
+            warm(f"stats ({lang})", warm_latest_stats, lang)
+
+    return failures
+
+
+def delete_untagged_template_caches():
+    """
+    Delete the service template and template version caches saved before they were tagged, which
+    template category changes can't find to delete. Only needs running once, after tagging is deployed.
+    """
+    from app.notify_client import cache
+
+    for pattern in UNTAGGED_TEMPLATE_CACHE_PATTERNS:
+        print("Deleted {} keys matching {}".format(cache.delete_keys_by_pattern(pattern), pattern))  # noqa
+
+
 def setup_commands(application):
     application.cli.command("list-routes")(list_routes)
+    application.cli.command("warm-gc-articles-cache")(warm_gc_articles_cache)
+    application.cli.command("delete-untagged-template-caches")(delete_untagged_template_caches)
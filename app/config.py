@@ -41,9 +41,21 @@ class Config(object):
     ANTIVIRUS_API_HOST = os.environ.get("ANTIVIRUS_API_HOST")
     ANTIVIRUS_API_KEY = os.environ.get("ANTIVIRUS_API_KEY")
     API_HOST_NAME = os.environ.get("API_HOST_NAME")
+    # Serve identical API GETs made while handling a single request from a request-local memo
+    API_REQUEST_MEMO_ENABLED = env.bool("API_REQUEST_MEMO_ENABLED", True)
+    API_REQUEST_MEMO_MAX_ENTRIES = env.int("API_REQUEST_MEMO_MAX_ENTRIES", 50)  # oldest responses are dropped beyond this
+    # Reuse connections to the API through a pooled session shared by every API client in a worker
+    API_HTTP_KEEPALIVE_ENABLED = env.bool("API_HTTP_KEEPALIVE_ENABLED", True)
+    API_HTTP_POOL_CONNECTIONS = env.int("API_HTTP_POOL_CONNECTIONS", 4)  # hosts to keep a pool for
+    API_HTTP_POOL_MAXSIZE = env.int("API_HTTP_POOL_MAXSIZE", 50)  # connections kept per host
+    API_HTTP_POOL_BLOCK = env.bool("API_HTTP_POOL_BLOCK", False)  # wait for a free connection instead of going over
     ASSET_DOMAIN = os.getenv("ASSET_DOMAIN", "assets.notification.canada.ca")
     ASSET_PATH = "/static/"
     AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
+    # Settings for the boto3 clients shared by every request in a worker
+    AWS_MAX_POOL_CONNECTIONS = env.int("AWS_MAX_POOL_CONNECTIONS", 50)  # connections kept per client
+    AWS_MAX_ATTEMPTS = env.int("AWS_MAX_ATTEMPTS", 3)  # attempts at each call, including the first
+    AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")
     A11Y_FEEDBACK_URL_EN = os.environ.get(
         "A11Y_FEEDBACK_URL_EN", "https://forms-formulaires.alpha.canada.ca/en/id/cmk4jw8nu00wrx9016kz1gf54"
     )
@@ -55,13 +67,29 @@ class Config(object):
     BR_DISPLAY_VOLUME_MINIMUM = 1000
 
     BULK_SEND_AWS_BUCKET = os.getenv("BULK_SEND_AWS_BUCKET")
+    # Seconds the listing of files in BULK_SEND_AWS_BUCKET is cached in Redis, 0 to list the bucket every time
+    BULK_SEND_UPLOADS_CACHE_TTL = env.int("BULK_SEND_UPLOADS_CACHE_TTL", 60)
+    # Files from BULK_SEND_AWS_BUCKET shown on each page of the send from S3 page
+    BULK_SEND_UPLOADS_PAGE_SIZE = env.int("BULK_SEND_UPLOADS_PAGE_SIZE", 50)
 
     CHECK_PROXY_HEADER = False
+    # Run independent API and Redis reads (e.g. the dashboard partials) concurrently
+    CONCURRENT_FETCH_ENABLED = env.bool("CONCURRENT_FETCH_ENABLED", True)
     CONTACT_EMAIL = os.environ.get("CONTACT_EMAIL", "assistance+notification@cds-snc.ca")
     CSV_MAX_ROWS = env.int("CSV_MAX_ROWS", 50_000)
     CSV_MAX_ROWS_BULK_SEND = env.int("CSV_MAX_ROWS_BULK_SEND", 100_000)
     CSV_UPLOAD_BUCKET_NAME = os.getenv("CSV_UPLOAD_BUCKET_NAME", "notification-alpha-canada-ca-csv-upload")
+    # Uploaded spreadsheets of at least this many bytes are converted and sent to S3 in chunks, 0 to disable
+    CSV_UPLOAD_STREAMING_MIN_SIZE = env.int("CSV_UPLOAD_STREAMING_MIN_SIZE", 5 * 1024 * 1024)
+    # Worker processes that validate the rows of big CSV uploads in the background, 0 to validate them in the web request
+    CSV_VALIDATION_PROCESSES = env.int("CSV_VALIDATION_PROCESSES", 0)
+    # Uploads with at least this many rows are validated in the CSV_VALIDATION_PROCESSES processes
+    CSV_VALIDATION_PROCESSES_MIN_ROWS = env.int("CSV_VALIDATION_PROCESSES_MIN_ROWS", 10_000)
     DANGEROUS_SALT = os.environ.get("DANGEROUS_SALT")
+    # Seconds that rendered dashboard.json partials are shared between pollers of a service, 0 to disable
+    DASHBOARD_PARTIALS_CACHE_TTL = env.int("DASHBOARD_PARTIALS_CACHE_TTL", 5)
+    # Seconds one worker may spend recomputing the partials before others stop waiting for it
+    DASHBOARD_PARTIALS_LOCK_TIMEOUT = env.int("DASHBOARD_PARTIALS_LOCK_TIMEOUT", 3)
     DEBUG = False
     DEBUG_KEY = os.environ.get("DEBUG_KEY", "")
     DEFAULT_FREE_SMS_FRAGMENT_LIMITS = {
@@ -133,6 +161,12 @@ class Config(object):
     PERMANENT_SESSION_LIFETIME = 8 * 60 * 60  # 8 hours
     REDIS_ENABLED = env.bool("REDIS_ENABLED", False)
     REDIS_URL = os.environ.get("REDIS_URL")
+    # Per-worker in-process tier in front of Redis for the `cache.set` API client decorators
+    REDIS_LOCAL_CACHE_ENABLED = env.bool("REDIS_LOCAL_CACHE_ENABLED", False)
+    REDIS_LOCAL_CACHE_MAX_SIZE = env.int("REDIS_LOCAL_CACHE_MAX_SIZE", 1_000)
+    REDIS_LOCAL_CACHE_TTL = env.int("REDIS_LOCAL_CACHE_TTL", 5)  # seconds
+    # Compress values cached by the API client decorators from this many bytes up; 0 stores plain JSON
+    REDIS_CACHE_COMPRESSION_THRESHOLD = env.int("REDIS_CACHE_COMPRESSION_THRESHOLD", 0)
     CACHE_TYPE = "RedisCache" if REDIS_ENABLED else "SimpleCache"
     CACHE_REDIS_URL = os.environ.get("REDIS_URL")
     REPORTS_BUCKET_NAME = os.getenv("REPORTS_BUCKET_NAME", "notification-canada-ca-production-reports")
@@ -227,6 +261,8 @@ class Test(Development):
     ANTIVIRUS_API_HOST = "https://test-antivirus"
     ANTIVIRUS_API_KEY = "test-antivirus-secret"
     API_HOST_NAME = os.environ.get("API_HOST_NAME", "http://localhost:6011")
+    API_HTTP_KEEPALIVE_ENABLED = False
+    API_REQUEST_MEMO_ENABLED = False
     ASSET_DOMAIN = "static.example.com"
     DANGEROUS_SALT = os.environ.get("DANGEROUS_SALT", "dev-notify-salt")
     DEBUG = True
@@ -1,4 +1,6 @@
 import calendar
+import hashlib
+import json
 import time
 from datetime import datetime, timedelta
 from functools import partial
@@ -21,16 +23,18 @@ from werkzeug.utils import redirect
 from app import (
     billing_api_client,
     current_service,
+    get_current_locale,
     job_api_client,
     notification_api_client,
     service_api_client,
     template_statistics_client,
 )
-from app.extensions import annual_limit_client, bounce_rate_client
+from app.extensions import annual_limit_client, bounce_rate_client, redis_client
 from app.main import main
 from app.models.enum.bounce_rate_status import BounceRateStatus
 from app.models.enum.notification_statuses import NotificationStatuses
 from app.models.enum.template_types import TemplateType
+from app.notify_client.cache import acquire_lock, release_lock
 from app.statistics_utils import add_rate_to_job, get_formatted_percentage
 from app.types import AnnualData, DashboardTotals
 from app.utils import (
@@ -42,6 +46,7 @@ from app.utils import (
     get_current_financial_year,
     get_month_name,
     get_page_from_request,
+    run_concurrently,
     user_has_permissions,
     yyyy_mm_to_datetime,
 )
@@ -169,7 +174,71 @@ def service_dashboard(service_id):
 @main.route("/services/<service_id>/dashboard.json")
 @user_has_permissions("view_activity")
 def service_dashboard_updates(service_id):
-    return jsonify(**get_dashboard_partials(service_id))
+    cached = get_cached_dashboard_partials(service_id)
+    response = jsonify(**cached["partials"])
+    response.set_etag(cached["etag"])
+    # Polling clients send back the ETag they last saw and get an empty 304 if nothing changed
+    return response.make_conditional(request)
+
+
+def get_cached_dashboard_partials(service_id):
+    """
+    Every open dashboard tab polls `dashboard.json`, so teammates watching the same service
+    share one rendering of the partials for `DASHBOARD_PARTIALS_CACHE_TTL` seconds. The cache
+    key includes the language and the viewer's permissions because both change the markup.
+
+    Only one worker recomputes an expired entry; the others wait briefly for its result
+    rather than sending the same requests to the API.
+    """
+    ttl = current_app.config["DASHBOARD_PARTIALS_CACHE_TTL"]
+    if not ttl or not current_app.config["REDIS_ENABLED"]:
+        return _with_etag(get_dashboard_partials(service_id))
+
+    cache_key = _dashboard_partials_cache_key(service_id)
+    lock_key = f"{cache_key}-lock"
+
+    cached = redis_client.get(cache_key)
+    if cached:
+        return json.loads(cached)
+
+    try:
+        lock_token = acquire_lock(lock_key, current_app.config["DASHBOARD_PARTIALS_LOCK_TIMEOUT"])
+    except Exception:
+        current_app.logger.warning("Failed to take lock {}, rendering dashboard partials without it".format(lock_key))
+        return _with_etag(get_dashboard_partials(service_id))
+
+    if lock_token:
+        try:
+            result = _with_etag(get_dashboard_partials(service_id))
+            redis_client.set(cache_key, json.dumps(result), ex=ttl)
+        finally:
+            release_lock(lock_key, lock_token)
+        return result
+
+    deadline = time.monotonic() + current_app.config["DASHBOARD_PARTIALS_LOCK_TIMEOUT"]
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        cached = redis_client.get(cache_key)
+        if cached:
+            return json.loads(cached)
+
+    # whoever held the lock didn't finish in time, so don't leave this tab waiting any longer
+    return _with_etag(get_dashboard_partials(service_id))
+
+
+def _dashboard_partials_cache_key(service_id):
+    permissions = sorted(current_user.permissions.get(service_id, []))
+    if current_user.platform_admin:
+        permissions.append("platform_admin")
+    permissions_hash = hashlib.sha1(",".join(permissions).encode("utf-8")).hexdigest()[:12]
+    return f"dashboard-partials-{service_id}-{get_current_locale(current_app)}-{permissions_hash}"
+
+
+def _with_etag(partials):
+    # debug_timings changes on every computation, so it can't be part of the ETag
+    content = {key: value for key, value in partials.items() if key != "debug_timings"}
+    etag = hashlib.sha1(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+    return {"etag": etag, "partials": partials}
 
 
 @main.route("/services/<service_id>/template-activity")
@@ -413,32 +482,34 @@ def get_dashboard_partials(service_id):
     # Time each backend API call
     start_total = time.time()
 
-    start = time.time()
-    all_statistics_weekly = template_statistics_client.get_template_statistics_for_service(service_id, limit_days=7)
-    timings["template_statistics_weekly"] = (time.time() - start) * 1000
+    # The API and Redis reads below don't depend on each other, so fetch them concurrently
+    # and let the slowest one, rather than the sum of all of them, set the dashboard latency
+    (
+        all_statistics_weekly,
+        (scheduled_jobs, immediate_jobs_raw),
+        (dashboard_totals_daily, highest_notification_count_daily, all_statistics_daily, annual_data),
+        bounce_rate_data,
+    ) = run_concurrently(
+        partial(
+            _timed_call,
+            timings,
+            "template_statistics_weekly",
+            template_statistics_client.get_template_statistics_for_service,
+            service_id,
+            limit_days=7,
+        ),
+        partial(_get_jobs, service_id, timings),
+        partial(_get_daily_and_annual_stats, service_id, timings),
+        partial(_timed_call, timings, "get_bounce_rate_data", get_bounce_rate_data_from_redis, service_id),
+    )
 
     start = time.time()
     template_statistics_weekly = aggregate_template_usage(all_statistics_weekly)[:10]
     timings["aggregate_template_usage"] = (time.time() - start) * 1000
 
-    scheduled_jobs, immediate_jobs = [], []
-    if job_api_client.has_jobs(service_id):
-        start = time.time()
-        scheduled_jobs = job_api_client.get_scheduled_jobs(service_id)
-        timings["get_scheduled_jobs"] = (time.time() - start) * 1000
-
-        start = time.time()
-        immediate_jobs_raw = job_api_client.get_immediate_jobs(service_id, page_size=10)
-        timings["get_immediate_jobs"] = (time.time() - start) * 1000
-
-        start = time.time()
-        immediate_jobs = [add_rate_to_job(job) for job in immediate_jobs_raw]
-        timings["add_rate_to_job"] = (time.time() - start) * 1000
-
-    # get the daily stats
     start = time.time()
-    dashboard_totals_daily, highest_notification_count_daily, all_statistics_daily = _get_daily_stats(service_id)
-    timings["_get_daily_stats"] = (time.time() - start) * 1000
+    immediate_jobs = [add_rate_to_job(job) for job in immediate_jobs_raw]
+    timings["add_rate_to_job"] = (time.time() - start) * 1000
 
     # TODO FF_USE_BILLABLE_UNITS removal - Track if using billable units for display purposes
     use_billable_units = current_app.config.get("FF_USE_BILLABLE_UNITS", False)
@@ -454,14 +525,6 @@ def get_dashboard_partials(service_id):
     sms_billable_units_weekly = stats_weekly_billable["sms"]["requested"]
     timings["weekly_stats_aggregation"] = (time.time() - start) * 1000
 
-    start = time.time()
-    bounce_rate_data = get_bounce_rate_data_from_redis(service_id)
-    timings["get_bounce_rate_data"] = (time.time() - start) * 1000
-
-    start = time.time()
-    annual_data = get_annual_data(service_id, dashboard_totals_daily)
-    timings["get_annual_data"] = (time.time() - start) * 1000
-
     # Calculate total time
     total_time = (time.time() - start_total) * 1000
     current_app.logger.info(f"TIMING: Total get_dashboard_partials execution took {total_time:.2f}ms")
@@ -521,6 +584,33 @@ def aggregate_by_type_daily(data, daily_data: DashboardTotals) -> AnnualData:
     }
 
 
+def _get_jobs(service_id, timings):
+    if not job_api_client.has_jobs(service_id):
+        return [], []
+
+    return run_concurrently(
+        partial(_timed_call, timings, "get_scheduled_jobs", job_api_client.get_scheduled_jobs, service_id),
+        partial(_timed_call, timings, "get_immediate_jobs", job_api_client.get_immediate_jobs, service_id, page_size=10),
+    )
+
+
+def _get_daily_and_annual_stats(service_id, timings):
+    # annual data adds today's totals on top of the fiscal year to date, so has to wait for them
+    dashboard_totals_daily, highest_notification_count_daily, all_statistics_daily = _timed_call(
+        timings, "_get_daily_stats", _get_daily_stats, service_id
+    )
+    annual_data = _timed_call(timings, "get_annual_data", get_annual_data, service_id, dashboard_totals_daily)
+    return dashboard_totals_daily, highest_notification_count_daily, all_statistics_daily, annual_data
+
+
+def _timed_call(timings, name, fn, *args, **kwargs):
+    start = time.time()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[name] = (time.time() - start) * 1000
+
+
 def _get_daily_stats(service_id):
     # TODO: get from redis, else fallback to template_statistics_client.get_template_statistics_for_service
     all_statistics_daily = template_statistics_client.get_template_statistics_for_service(service_id, limit_days=1)
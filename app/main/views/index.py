@@ -26,9 +26,12 @@ from app.articles import (
 )
 from app.articles.menu import get_nav_items
 from app.articles.pages import (
+    NO_PAGE,
     get_page_by_id,
     get_page_by_slug,
     get_page_by_slug_with_cache,
+    is_unknown_page,
+    set_missing_page,
 )
 from app.articles.routing import gca_url_for
 from app.main import main
@@ -429,14 +432,13 @@ def page_content(path=""):
 
     params = {"slug": path, "lang": lang}
 
-    """If user is authenticated, don't cache it"""
-    if current_user.is_authenticated:
-        response = get_page_by_slug(endpoint, params=params)
-    else:
-        response = get_page_by_slug_with_cache(endpoint, params=params)
+    if is_unknown_page(endpoint, path):
+        abort(404)
+
+    response = get_page_by_slug_with_cache(endpoint, params=params, empty_result=NO_PAGE)
 
-    if not response:
-        return _try_alternate_language(endpoint, params)
+    if response is NO_PAGE or not response:
+        return _try_alternate_language(endpoint, params, missing=response is NO_PAGE)
 
     if isinstance(response, list):
         response = response[0]
@@ -471,16 +473,25 @@ def _render_articles_page(response, newsletter_form=None):
     )
 
 
-def _try_alternate_language(endpoint, params):
+def _try_alternate_language(endpoint, params, missing=False):
     """
     If response was empty, it's possible the logged-in user's current language
     doesn't match the requested page language, so let's try again.
+
+    `missing` is whether GC Articles said it has no page in the current language,
+    rather than failing to answer.
     """
     slug = params.get("slug")
 
     """try again, with same slug but new language"""
     params["lang"] = _get_alt_locale(params.get("lang"))
-    response = get_page_by_slug(endpoint, params=params)
+    response = get_page_by_slug(endpoint, params=params, empty_result=NO_PAGE)
+
+    if response is NO_PAGE:
+        """only remember the page is missing once GC Articles has said so in both languages"""
+        if missing:
+            set_missing_page(slug)
+        abort(404)
 
     if isinstance(response, list):
         response = response[0]
@@ -1,10 +1,9 @@
 from flask import current_app, flash, redirect, render_template, request, url_for
 from flask_babel import _
-from flask_login import current_user
 from notifications_python_client.errors import HTTPError
 
 from app import get_current_locale
-from app.articles.pages import get_page_by_slug, get_page_by_slug_with_cache
+from app.articles.pages import get_page_by_slug_with_cache
 from app.main import main
 from app.main.forms import NewsletterLanguageForm, NewsletterSubscriptionForm
 from app.notify_client.newsletter_api_client import newsletter_api_client
@@ -52,10 +51,7 @@ def newsletter_subscription():
         lang = get_current_locale(current_app)
         params = {"slug": path, "lang": lang}
 
-        if current_user.is_authenticated:
-            response = get_page_by_slug(endpoint, params=params)
-        else:
-            response = get_page_by_slug_with_cache(endpoint, params=params)
+        response = get_page_by_slug_with_cache(endpoint, params=params)
 
         if isinstance(response, list):
             response = response[0]
@@ -17,7 +17,7 @@ from app import (
     platform_stats_api_client,
     service_api_client,
 )
-from app.extensions import antivirus_client, redis_client
+from app.extensions import antivirus_client
 from app.main import main
 from app.main.forms import (
     ClearCacheForm,
@@ -26,6 +26,7 @@ from app.main.forms import (
     RequiredDateFilterForm,
     ReturnedLettersForm,
 )
+from app.notify_client import cache
 from app.notify_client.api_key_api_client import api_key_api_client
 from app.statistics_utils import (
     get_formatted_percentage,
@@ -635,7 +636,7 @@ def clear_cache():
     if form.validate_on_submit():
         to_delete = form.model_type.data
 
-        num_deleted = max(redis_client.delete_cache_keys_by_pattern(pattern) for pattern in CACHE_KEYS[to_delete])
+        num_deleted = max(cache.delete_keys_by_pattern(pattern) for pattern in CACHE_KEYS[to_delete])
         msg = _l("Removed {count} {name} object{plural} from redis")
         flash(
             msg.format(count=num_deleted, name=to_delete, plural="s" if num_deleted != 1 else ""),
@@ -1,5 +1,8 @@
+import hashlib
 import itertools
 import json
+from datetime import timedelta
+from functools import partial
 from string import ascii_uppercase
 from zipfile import BadZipFile
 
@@ -53,36 +56,57 @@ from app.main.forms import (
 )
 from app.main.views.dashboard import aggregate_notifications_stats
 from app.models.user import Users
-from app.notify_client.notification_counts_client import notification_counts_client
+from app.notify_client.notification_counts_client import (
+    get_todays_count_from_redis,
+    notification_counts_client,
+)
 from app.s3_client.s3_csv_client import (
     copy_bulk_send_file_to_uploads,
     get_csv_metadata,
+    get_row_offset_index,
     list_bulk_send_uploads,
     s3download,
+    s3download_range,
     s3upload,
+    s3upload_chunks,
+    s3upload_row_offset_index,
     set_metadata_on_csv_upload,
 )
 from app.template_previews import TemplatePreview, get_page_count_for_letter
 from app.utils import (
+    CSV_ROW_OFFSET_INDEX_STRIDE,
     PermanentRedirect,
+    SMSFragmentCounter,
     Spreadsheet,
+    SummarisedRecipientCSV,
+    count_csv_rows,
     email_or_sms_not_enabled,
     file_attachments_enabled_for_service,
     filter_attachments,
+    format_csv_duplicate_warnings,
+    format_csv_row_errors,
+    generate_next_dict,
+    generate_previous_dict,
+    get_csv_rows_from_offset_index,
+    get_csv_summary_rows_shown_end,
+    get_csv_validation_pool,
     get_errors_for_csv,
     get_help_argument,
     get_limit_reset_time_et,
+    get_page_from_request,
     get_template,
     get_warnings_for_csv,
     should_skip_template_page,
+    summarise_recipient_csv,
     unicode_truncate,
     user_has_permissions,
+    validate_csv,
 )
 
 
 def daily_sms_count(service_id):
     """Get the number of SMS messages (not fragments) sent today for a service."""
-    return int(redis_client.get(sms_daily_count_cache_key(service_id)) or "0")
+    return int(get_todays_count_from_redis(service_id, sms_daily_count_cache_key(service_id)) or "0")
 
 
 def daily_sms_billable_units_count(service_id):
@@ -94,7 +118,151 @@ def daily_sms_billable_units_count(service_id):
 
 
 def daily_email_count(service_id):
-    return int(redis_client.get(email_daily_count_cache_key(service_id)) or "0")
+    return int(get_todays_count_from_redis(service_id, email_daily_count_cache_key(service_id)) or "0")
+
+
+# How long the validation summary of an uploaded CSV is kept while the user checks and sends it
+CSV_VALIDATION_SUMMARY_TTL = int(timedelta(hours=1).total_seconds())
+# How long the check page waits for an upload validated in the background before validating
+# it again, in case the worker validating it stopped
+CSV_VALIDATION_PENDING_TTL = int(timedelta(minutes=10).total_seconds())
+
+
+def csv_validation_summary_cache_key(service_id, upload_id):
+    return f"csv-validation-summary-{service_id}-{upload_id}"
+
+
+def get_csv_validation_summary(service_id, upload_id, fingerprint=None):
+    """
+    Get the summary saved when an uploaded CSV was first validated, so later views of the same
+    upload don't have to validate every row again. With a `fingerprint`, only a summary made
+    with the same template, sender and limits is returned.
+    """
+    cached = redis_client.get(csv_validation_summary_cache_key(service_id, upload_id))
+    if not cached:
+        return None
+    summary = json.loads(cached)
+    if fingerprint is not None and summary.get("fingerprint") != fingerprint:
+        return None
+    return summary
+
+
+def set_csv_validation_summary(service_id, upload_id, summary):
+    redis_client.set(
+        csv_validation_summary_cache_key(service_id, upload_id),
+        json.dumps(summary),
+        ex=CSV_VALIDATION_SUMMARY_TTL,
+    )
+
+
+def _summarise_csv_validation(recipients, contents, template_id, fingerprint, sms_parts_to_send, is_sms_parts_estimated):
+    return {
+        "fingerprint": fingerprint,
+        "template_id": str(template_id),
+        **summarise_recipient_csv(recipients, contents, sms_parts_to_send, is_sms_parts_estimated),
+    }
+
+
+def csv_row_offset_index_stored_cache_key(service_id, upload_id):
+    return f"csv-row-offset-index-stored-{service_id}-{upload_id}"
+
+
+def store_row_offset_index(service_id, upload_id, row_offset_index):
+    """
+    Store the row offset index of an uploaded CSV in S3, unless that's already been done. The
+    index only saves reading the whole file, so failing to store it isn't an error.
+    """
+    cache_key = csv_row_offset_index_stored_cache_key(service_id, upload_id)
+    if redis_client.get(cache_key):
+        return
+    try:
+        s3upload_row_offset_index(service_id, upload_id, row_offset_index)
+    except Exception as e:
+        current_app.logger.warning("Unable to store row offset index for upload {}: {}".format(upload_id, e))
+        return
+    redis_client.set(cache_key, "1", ex=CSV_VALIDATION_SUMMARY_TTL)
+
+
+def csv_validation_pending_cache_key(service_id, upload_id, fingerprint):
+    return f"csv-validation-pending-{service_id}-{upload_id}-{fingerprint}"
+
+
+def validate_csv_in_background(service_id, upload_id, template_id, contents, db_template, fingerprint, safelist):
+    """
+    Start validating a big upload in this worker's CSV validation pool, unless that's already
+    been started, and save its summary when it's done.
+
+    Returns whether the check page should wait for that summary. It shouldn't when the upload
+    has more rows than can be sent, or validating it in the background failed, and validates
+    the upload itself instead.
+    """
+    cache_key = csv_validation_pending_cache_key(service_id, upload_id, fingerprint)
+    cached = redis_client.get(cache_key)
+    if cached:
+        return json.loads(cached) == "pending"
+
+    max_rows = get_csv_max_rows(service_id)
+    if count_csv_rows(contents) > max_rows:
+        # Nothing can be sent from it, so it's only checked for having too many rows
+        return False
+
+    redis_client.set(cache_key, json.dumps("pending"), ex=CSV_VALIDATION_PENDING_TTL)
+    try:
+        future = get_csv_validation_pool(current_app.config["CSV_VALIDATION_PROCESSES"]).submit(
+            validate_csv,
+            contents,
+            db_template,
+            prefix=current_service.name,
+            show_prefix=current_service.prefix_sms,
+            safelist=safelist,
+            international_sms=current_service.has_permission("international_sms"),
+            max_rows=max_rows,
+        )
+    except RuntimeError as e:
+        current_app.logger.warning("Unable to validate upload {} in the background: {}".format(upload_id, e))
+        redis_client.delete(cache_key)
+        return False
+    future.add_done_callback(
+        partial(_save_csv_validation, current_app._get_current_object(), service_id, upload_id, template_id, fingerprint)
+    )
+    return True
+
+
+def _save_csv_validation(app, service_id, upload_id, template_id, fingerprint, future):
+    cache_key = csv_validation_pending_cache_key(service_id, upload_id, fingerprint)
+    with app.app_context():
+        try:
+            validation = future.result()
+        except Exception as e:
+            app.logger.warning("Unable to validate upload {} in the background: {}".format(upload_id, e))
+            redis_client.set(cache_key, json.dumps("failed"), ex=CSV_VALIDATION_PENDING_TTL)
+            return
+        set_csv_validation_summary(
+            service_id, upload_id, {"fingerprint": fingerprint, "template_id": str(template_id), **validation}
+        )
+        store_row_offset_index(service_id, upload_id, validation["row_offset_index"])
+        redis_client.delete(cache_key)
+
+
+def upload_spreadsheet(service_id, file):
+    """
+    Convert an uploaded spreadsheet to CSV and store it in S3, returning its upload id. Big files are
+    converted and uploaded in chunks so they never need to fit in memory all at once.
+    """
+    min_streaming_size = current_app.config["CSV_UPLOAD_STREAMING_MIN_SIZE"]
+    file.stream.seek(0, 2)
+    file_size = file.stream.tell()
+    file.stream.seek(0)
+
+    if min_streaming_size and file_size >= min_streaming_size:
+        return s3upload_chunks(
+            service_id,
+            Spreadsheet.iter_csv_data_from_file(file, filename=file.filename),
+            current_app.config["AWS_REGION"],
+        )
+
+    data = Spreadsheet.from_file(file, filename=file.filename).as_dict
+    return s3upload(service_id, data, current_app.config["AWS_REGION"])
 
 
 def service_can_bulk_send(service_id):
@@ -286,11 +454,7 @@ def send_messages(service_id, template_id):
     form = CsvUploadForm()
     if form.validate_on_submit():
         try:
-            upload_id = s3upload(
-                service_id,
-                Spreadsheet.from_file(form.file.data, filename=form.file.data.filename).as_dict,
-                current_app.config["AWS_REGION"],
-            )
+            upload_id = upload_spreadsheet(service_id, form.file.data)
             return redirect(
                 url_for(
                     ".check_messages",
@@ -381,12 +545,24 @@ def s3_send(service_id, template_id):
         sms_sender=sms_sender,
     )
 
-    s3_objects = list_bulk_send_uploads()
+    page = get_page_from_request()
+    if page is None:
+        abort(404, "Invalid page argument ({}).".format(request.args.get("page")))
+    prefix = request.args.get("prefix", "")
+    page_size = current_app.config["BULK_SEND_UPLOADS_PAGE_SIZE"]
+
+    s3_files = list_bulk_send_uploads(prefix=prefix)
+    # Accept any file in the bucket when submitting, in case new files have moved the chosen one to another page
+    choices = s3_files if request.method == "POST" else s3_files[(page - 1) * page_size : page * page_size]
     form = SelectCsvFromS3Form(
-        choices=[(x.key, x.key) for x in s3_objects],  # (value, label)
+        choices=[(x["key"], x["key"]) for x in choices],  # (value, label)
         label="Select a file from Amazon S3",
     )
 
+    url_args = {"template_id": template_id, **({"prefix": prefix} if prefix else {})}
+    prev_page = generate_previous_dict("main.s3_send", service_id, page, url_args) if page > 1 else None
+    next_page = generate_next_dict("main.s3_send", service_id, page, url_args) if page * page_size < len(s3_files) else None
+
     if form.validate_on_submit():
         try:
             upload_id = copy_bulk_send_file_to_uploads(
@@ -424,6 +600,8 @@ def s3_send(service_id, template_id):
         column_headings=list(ascii_uppercase[: len(column_headings)]),
         example=[column_headings, get_example_csv_rows(template)],
         form=form,
+        prev_page=prev_page,
+        next_page=next_page,
     )
 
 
@@ -755,7 +933,9 @@ def send_test_preview(service_id, template_id, filetype):
     return TemplatePreview.from_utils_template(template, filetype, page=request.args.get("page"))
 
 
-def _check_messages(service_id, template_id, upload_id, preview_row, letters_as_pdf=False, user_language="en"):
+def _check_messages(
+    service_id, template_id, upload_id, preview_row, letters_as_pdf=False, user_language="en", preview_only=False
+):
     try:
         # The happy path is that the job doesn’t already exist, so the
         # API will return a 404 and the client will raise HTTPError.
@@ -775,8 +955,6 @@ def _check_messages(service_id, template_id, upload_id, preview_row, letters_as_
     remaining_sms_messages_today = current_service.sms_daily_limit - sms_sent_today
     remaining_email_messages_today = current_service.message_limit - emails_sent_today
 
-    contents = s3download(service_id, upload_id)
-
     db_template = current_service.get_template_with_user_permission_or_403(template_id, current_user)
 
     email_reply_to = None
@@ -810,24 +988,87 @@ def _check_messages(service_id, template_id, upload_id, preview_row, letters_as_
         page_count=get_page_count_for_letter(db_template),
     )
 
+    safelist = (
+        list(itertools.chain.from_iterable([user.name, user.mobile_number, user.email_address] for user in Users(service_id)))
+        if current_service.trial_mode
+        else None
+    )
+    # Everything that changes how the rows validate or how many SMS parts they need
+    fingerprint = hashlib.sha1(
+        json.dumps(
+            [
+                str(template_id),
+                db_template["version"],
+                sms_sender,
+                current_service.name,
+                current_service.prefix_sms,
+                current_service.trial_mode,
+                current_service.has_permission("international_sms"),
+                get_csv_max_rows(service_id),
+                # Trial mode services can only send to their team, so team changes change the errors
+                sorted(map(str, safelist)) if safelist is not None else None,
+            ],
+            default=str,
+        ).encode("utf-8")
+    ).hexdigest()
+    summary = get_csv_validation_summary(service_id, upload_id, fingerprint)
+    max_initial_rows_shown = int(request.args.get("show") or 10)
+    max_errors_shown = 50
+    row_offset_index = None
+    if preview_only:
+        row_offset_index = summary["row_offset_index"] if summary else get_row_offset_index(service_id, upload_id)
+    partial_contents = bool(
+        row_offset_index and preview_row >= 2 and (preview_row - 2) // CSV_ROW_OFFSET_INDEX_STRIDE < len(row_offset_index) - 2
+    )
+    if partial_contents:
+        # Only read the header and the block of rows holding the row being previewed
+        contents, positions = get_csv_rows_from_offset_index(
+            partial(s3download_range, service_id, upload_id), row_offset_index, [preview_row - 2]
+        )
+        preview_row = positions[preview_row - 2] + 2
+    elif summary and "allowed_to_send_to" in summary:
+        # Only read as far as the last row shown, the rest is in the summary
+        contents = s3download_range(
+            service_id,
+            upload_id,
+            0,
+            get_csv_summary_rows_shown_end(summary, preview_row - 2, max_initial_rows_shown, max_errors_shown),
+        ).decode("utf-8")
+    else:
+        contents = s3download(service_id, upload_id)
+
+    if (
+        summary is None
+        and not preview_only
+        and current_app.config["CSV_VALIDATION_PROCESSES"]
+        and redis_client.active
+        and db_template["template_type"] in ("sms", "email")
+        and contents.count("\n") >= current_app.config["CSV_VALIDATION_PROCESSES_MIN_ROWS"]
+        and validate_csv_in_background(service_id, upload_id, template_id, contents, db_template, fingerprint, safelist)
+    ):
+        return dict(validating_in_background=True, original_file_name=request.args.get("original_file_name", ""))
+
     attachment_context = get_template_attachment_context(template_id, db_template["template_type"])
-    recipients = RecipientCSV(
-        contents,
+    recipients_kwargs = dict(
         template=template,
         template_type=template.template_type,
         placeholders=template.placeholders,
-        max_initial_rows_shown=int(request.args.get("show") or 10),
-        max_errors_shown=50,
-        safelist=(
-            itertools.chain.from_iterable([user.name, user.mobile_number, user.email_address] for user in Users(service_id))
-            if current_service.trial_mode
-            else None
-        ),
+        max_initial_rows_shown=max_initial_rows_shown,
+        max_errors_shown=max_errors_shown,
+        safelist=safelist,
         remaining_messages=recipients_remaining_messages,
         international_sms=current_service.has_permission("international_sms"),
         max_rows=get_csv_max_rows(service_id),
         user_language=user_language,
     )
+    if not partial_contents and summary and "allowed_to_send_to" in summary:
+        # Only validate the rows shown, everything else about the file comes from the summary
+        rows_shown_end = get_csv_summary_rows_shown_end(summary, preview_row - 2, max_initial_rows_shown, max_errors_shown)
+        recipients = SummarisedRecipientCSV(
+            contents.encode("utf-8")[:rows_shown_end].decode("utf-8"), summary, **recipients_kwargs
+        )
+    else:
+        recipients = RecipientCSV(contents, **recipients_kwargs)
 
     if request.args.get("from_test"):
         # only happens if generating a letter preview test
@@ -839,16 +1080,25 @@ def _check_messages(service_id, template_id, upload_id, preview_row, letters_as_
 
     sms_parts_to_send = 0
     is_sms_parts_estimated = False
-    if db_template["template_type"] == "sms":
-        if len(recipients) > 1000:
-            # estimate using the first row
-            template.values = recipients[0].recipient_and_personalisation
-            sms_parts_to_send = template.fragment_count * len(recipients)
-            is_sms_parts_estimated = True
-        else:
-            for row in range(len(recipients)):
-                template.values = recipients[row].recipient_and_personalisation
-                sms_parts_to_send += template.fragment_count
+    if summary:
+        sms_parts_to_send = summary["sms_parts_to_send"]
+        is_sms_parts_estimated = summary["is_sms_parts_estimated"]
+    elif db_template["template_type"] == "sms":
+        sms_parts_to_send = SMSFragmentCounter(template).total(row.recipient_and_personalisation for row in recipients.rows)
+
+    if (
+        summary is None
+        and not partial_contents
+        and redis_client.active
+        and recipients.has_recipient_columns
+        and not recipients.too_many_rows
+    ):
+        summary = _summarise_csv_validation(
+            recipients, contents, template_id, fingerprint, sms_parts_to_send, is_sms_parts_estimated
+        )
+        set_csv_validation_summary(service_id, upload_id, summary)
+        # Uploads get their row offset index the first time they're checked, so uploading doesn't wait for it
+        store_row_offset_index(service_id, upload_id, summary["row_offset_index"])
 
     if preview_row < 2:
         abort(404)
@@ -858,17 +1108,38 @@ def _check_messages(service_id, template_id, upload_id, preview_row, letters_as_
     elif preview_row > 2:
         abort(404)
 
+    if summary and "bad_recipient_row_count" in summary:
+        # Take the row counts from the summary rather than validating every row again
+        row_errors = format_csv_row_errors(
+            template.template_type,
+            summary["bad_recipient_row_count"],
+            summary["missing_data_row_count"],
+            summary["content_too_long_row_count"],
+        )
+        row_warnings = format_csv_duplicate_warnings(
+            template.template_type, summary["count_of_duplicate_recipients"], summary["count_of_duplicate_recipient_rows"]
+        )
+        count_of_recipients = summary["row_count"]
+        count_of_duplicate_recipients = summary["count_of_duplicate_recipients"]
+        count_of_duplicate_recipient_rows = summary["count_of_duplicate_recipient_rows"]
+    else:
+        row_errors = get_errors_for_csv(recipients, template.template_type)
+        row_warnings = get_warnings_for_csv(recipients, template.template_type)
+        count_of_recipients = len(recipients)
+        count_of_duplicate_recipients = recipients.count_of_unique_duplicate_recipients
+        count_of_duplicate_recipient_rows = recipients.count_of_duplicate_recipient_rows
+
     return dict(
         recipients=recipients,
         template=template,
         **attachment_context,
         errors=recipients.has_errors,
-        row_errors=get_errors_for_csv(recipients, template.template_type),
-        row_warnings=get_warnings_for_csv(recipients, template.template_type),
-        count_of_recipients=len(recipients),
+        row_errors=row_errors,
+        row_warnings=row_warnings,
+        count_of_recipients=count_of_recipients,
         count_of_displayed_recipients=len(list(recipients.displayed_rows)),
-        count_of_duplicate_recipients=recipients.count_of_unique_duplicate_recipients,
-        count_of_duplicate_recipient_rows=recipients.count_of_duplicate_recipient_rows,
+        count_of_duplicate_recipients=count_of_duplicate_recipients,
+        count_of_duplicate_recipient_rows=count_of_duplicate_recipient_rows,
         original_file_name=request.args.get("original_file_name", ""),
         upload_id=upload_id,
         form=CsvUploadForm(),
@@ -905,6 +1176,12 @@ def _check_messages(service_id, template_id, upload_id, preview_row, letters_as_
 def check_messages(service_id, template_id, upload_id, row_index=2):
     current_lang = get_current_locale(current_app)
     data = _check_messages(service_id, template_id, upload_id, row_index, user_language=current_lang)
+    if data.get("validating_in_background"):
+        return render_template(
+            "views/check/validating.html",
+            original_file_name=SanitiseASCII.encode(data["original_file_name"]),
+            back_link=url_for(".send_messages", service_id=service_id, template_id=template_id),
+        )
     all_statistics_daily = template_statistics_client.get_template_statistics_for_service(service_id, limit_days=1)
     # Use billable_units for daily stats (used for limit tracking)
     data["stats_daily"] = aggregate_notifications_stats(all_statistics_daily, use_billable_units=True)
@@ -1035,7 +1312,7 @@ def check_messages_preview(service_id, template_id, upload_id, filetype, row_ind
     else:
         abort(404)
 
-    template = _check_messages(service_id, template_id, upload_id, row_index, letters_as_pdf=True)["template"]
+    template = _check_messages(service_id, template_id, upload_id, row_index, letters_as_pdf=True, preview_only=True)["template"]
     return TemplatePreview.from_utils_template(template, filetype, page=page)
 
 
@@ -1050,9 +1327,20 @@ def download_duplicate_recipients(service_id, template_id, upload_id):
     upload (which is scoped to this authenticated user) and is not persisted,
     so duplicates are visible only to the authenticated sender (issue #3319).
     """
-    contents = s3download(service_id, upload_id)
     db_template = current_service.get_template_with_user_permission_or_403(template_id, current_user)
     template = get_template(db_template, current_service)
+
+    summary = get_csv_validation_summary(service_id, upload_id)
+    row_indices = None
+    if summary and summary["template_id"] == str(template_id):
+        # Only read the blocks of rows holding duplicates found when the upload was checked
+        contents, positions = get_csv_rows_from_offset_index(
+            partial(s3download_range, service_id, upload_id), summary["row_offset_index"], summary["duplicate_row_indices"]
+        )
+        row_indices = {position: row_index for row_index, position in positions.items()}
+    else:
+        contents = s3download(service_id, upload_id)
+
     recipients = RecipientCSV(
         contents,
         template=template,
@@ -1064,11 +1352,14 @@ def download_duplicate_recipients(service_id, template_id, upload_id):
     )
 
     column_headers = recipients.column_headers
-    duplicate_rows = list(recipients.rows_with_duplicate_recipients)
+    if row_indices is None:
+        duplicate_rows = [(row.index, row) for row in recipients.rows_with_duplicate_recipients]
+    else:
+        duplicate_rows = [(row_indices[row.index], row) for row in recipients.rows if row.index in row_indices]
 
     rows = [["Row number", *column_headers]]
-    for row in duplicate_rows:
-        rows.append([str(row.index + 2), *(row[column].data or "" for column in column_headers)])
+    for row_index, row in duplicate_rows:
+        rows.append([str(row_index + 2), *(row[column].data or "" for column in column_headers)])
 
     safe_filename = SanitiseASCII.encode(request.args.get("original_file_name", "duplicates.csv"))
     return (
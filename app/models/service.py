@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from flask import Markup, abort, current_app
 from flask_babel import _
 from flask_babel import lazy_gettext as _l
@@ -64,6 +66,10 @@ class Service(JSONModel):
         super().__init__(_dict)
         if "permissions" not in self._dict:
             self.permissions = {"email", "sms", "letter"}
+        # Worked out at most once per user, and per folder, template type and user, for this request
+        self._user_template_folders = {}
+        self._user_template_folders_by_parent_id = {}
+        self._folder_visibility = {}
 
     @classmethod
     def from_id(cls, service_id):
@@ -172,6 +178,18 @@ class Service(JSONModel):
     def all_template_ids(self):
         return {template["id"] for template in self.all_templates}
 
+    @cached_property
+    def _templates_by_folder_and_type(self):
+        """
+        The templates in each folder, in the order of `all_templates`, by template type and under "all".
+        """
+        templates = defaultdict(lambda: defaultdict(list))
+        for template in self.all_templates:
+            templates_in_folder = templates[template.get("folder")]
+            templates_in_folder["all"].append(template)
+            templates_in_folder[template["template_type"]].append(template)
+        return templates
+
     def get_templates(self, template_type="all", template_folder_id=None, user=None):
         if user and template_folder_id:
             folder = self.get_template_folder(template_folder_id)
@@ -182,11 +200,11 @@ class Service(JSONModel):
             template_type = [template_type]
         if template_folder_id:
             template_folder_id = str(template_folder_id)
-        return [
-            template
-            for template in self.all_templates
-            if (set(template_type) & {"all", template["template_type"]}) and template.get("folder") == template_folder_id
-        ]
+
+        templates_in_folder = self._templates_by_folder_and_type.get(template_folder_id, {})
+        if "all" in template_type or len(template_type) == 1:
+            return list(templates_in_folder.get("all" if "all" in template_type else template_type[0], []))
+        return [template for template in templates_in_folder.get("all", []) if template["template_type"] in template_type]
 
     def get_template(self, template_id, version=None):
         return service_api_client.get_service_template(self.id, str(template_id), version)["data"]
@@ -489,6 +507,21 @@ class Service(JSONModel):
     def all_template_folder_ids(self):
         return {folder["id"] for folder in self.all_template_folders}
 
+    @cached_property
+    def _template_folders_by_id(self):
+        return {folder["id"]: folder for folder in self.all_template_folders}
+
+    @cached_property
+    def _template_folders_by_parent_id(self):
+        return self._group_by_parent_id(self.all_template_folders)
+
+    @staticmethod
+    def _group_by_parent_id(folders):
+        folders_by_parent_id = defaultdict(list)
+        for folder in folders:
+            folders_by_parent_id[folder["parent_id"]].append(folder)
+        return folders_by_parent_id
+
     def get_user_template_folders(self, user):
         """Returns a modified list of folders a user has permission to view
 
@@ -503,6 +536,11 @@ class Service(JSONModel):
         folder making sure it displays in the closest visible parent.
 
         """
+        if user.id not in self._user_template_folders:
+            self._user_template_folders[user.id] = self._get_user_template_folders(user)
+        return list(self._user_template_folders[user.id])
+
+    def _get_user_template_folders(self, user):
         user_folders = []
         for folder in self.all_template_folders:
             if not user.has_template_folder_permission(folder, service=self):
@@ -534,16 +572,18 @@ class Service(JSONModel):
 
     def get_template_folders(self, template_type="all", parent_folder_id=None, user=None):
         if user:
-            folders = self.get_user_template_folders(user)
+            if user.id not in self._user_template_folders_by_parent_id:
+                self._user_template_folders_by_parent_id[user.id] = self._group_by_parent_id(self.get_user_template_folders(user))
+            folders_by_parent_id = self._user_template_folders_by_parent_id[user.id]
         else:
-            folders = self.all_template_folders
+            folders_by_parent_id = self._template_folders_by_parent_id
         if parent_folder_id:
             parent_folder_id = str(parent_folder_id)
 
         return [
             folder
-            for folder in folders
-            if (folder["parent_id"] == parent_folder_id and self.is_folder_visible(folder["id"], template_type, user))
+            for folder in folders_by_parent_id.get(parent_folder_id, [])
+            if self.is_folder_visible(folder["id"], template_type, user)
         ]
 
     def get_template_folder(self, folder_id):
@@ -553,22 +593,26 @@ class Service(JSONModel):
                 "name": _l("Templates"),
                 "parent_id": None,
             }
-        return self._get_by_id(self.all_template_folders, folder_id)
+        try:
+            return self._template_folders_by_id[str(folder_id)]
+        except KeyError:
+            abort(404)
 
     def is_folder_visible(self, template_folder_id, template_type="all", user=None):
         if template_type == "all":
             return True
 
-        if self.get_templates(template_type, template_folder_id):
-            return True
-
-        if any(
-            self.is_folder_visible(child_folder["id"], template_type, user)
-            for child_folder in self.get_template_folders(template_type, template_folder_id, user)
-        ):
-            return True
-
-        return False
+        key = (
+            str(template_folder_id) if template_folder_id else template_folder_id,
+            template_type if isinstance(template_type, str) else tuple(template_type),
+            user.id if user else None,
+        )
+        if key not in self._folder_visibility:
+            self._folder_visibility[key] = bool(self.get_templates(template_type, template_folder_id)) or any(
+                self.is_folder_visible(child_folder["id"], template_type, user)
+                for child_folder in self.get_template_folders(template_type, template_folder_id, user)
+            )
+        return self._folder_visibility[key]
 
     def get_template_folder_path(self, template_folder_id):
         folder = self.get_template_folder(template_folder_id)
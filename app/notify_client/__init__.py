@@ -1,22 +1,122 @@
+import json
 import logging
+import os
 import re
+import socket
+import threading
+from copy import deepcopy
 
-from flask import abort, has_request_context, request
+import notifications_python_client.base
+import requests
+from flask import abort, g, has_request_context, request
 from flask_login import current_user
 from notifications_python_client import __version__
 from notifications_python_client.base import BaseAPIClient
 from notifications_python_client.errors import HTTP503Error
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app.extensions import statsd_client
 
 logger = logging.getLogger(__name__)
 
+# Greenlet-local under gevent: whether the request in progress had to open a new connection
+_connection_tracking = threading.local()
+
+
+# Greenlet-local under gevent: the shared session the request in progress is sent with, if any
+_api_session = threading.local()
+
+
+class _RequestsWithAPISession:
+    """
+    Stands in for `requests` in the API client library, so `BaseAPIClient._perform_request` sends
+    requests with the shared session while one is set for them, and with `requests.request` otherwise.
+    """
+
+    def request(self, method, url, **kwargs):
+        return (getattr(_api_session, "current", None) or requests).request(method, url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+notifications_python_client.base.requests = _RequestsWithAPISession()
+
+
+class _TrackingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _connection_tracking.opened = True
+        return super()._new_conn()
+
+
+class _TrackingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _connection_tracking.opened = True
+        return super()._new_conn()
+
+
+class _APIHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        # TCP keep-alive stops idle pooled connections being silently dropped by load balancers
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TrackingHTTPConnectionPool,
+            "https": _TrackingHTTPSConnectionPool,
+        }
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_api_session(pool_connections, pool_maxsize, pool_block):
+    """
+    Get the `requests.Session` shared by every API client in this worker, so connections (and their TLS
+    handshakes) are reused across requests instead of opened for every API call. A new session is made
+    after a fork, because connections can't be shared between processes.
+    """
+    global _session, _session_pid
+    if _session_pid != os.getpid():
+        with _session_lock:
+            if _session_pid != os.getpid():
+                adapter = _APIHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session, _session_pid = session, os.getpid()
+    return _session
+
 
 def _attach_current_user(data):
     return dict(created_by=current_user.id, **data)
 
 
+def clear_request_memo(exception=None):
+    """
+    Teardown handler for the request-scoped GET memo kept by `NotifyAdminAPIClient.get`.
+    """
+    memo = g.pop("api_get_memo", None)
+    saved_calls = g.pop("api_get_memo_hits", 0)
+    if memo is not None and saved_calls:
+        logger.debug("Request memo saved {} API GET call(s) across {} distinct URL(s)".format(saved_calls, len(memo)))
+
+
+def _invalidate_request_memo():
+    # any write can change what a later GET in the same request should return
+    if has_request_context():
+        g.pop("api_get_memo", None)
+
+
 class NotifyAdminAPIClient(BaseAPIClient):
     def __init__(self):
         super().__init__("a" * 73, "b")
+        self.request_memo_enabled = False
+        self.request_memo_max_entries = 0
+        self.keepalive_enabled = False
 
     def init_app(self, app):
         self.base_url = app.config["API_HOST_NAME"]
@@ -24,6 +124,12 @@ class NotifyAdminAPIClient(BaseAPIClient):
         self.api_key = app.config["ADMIN_CLIENT_SECRET"]
         self.route_secret = app.config["ROUTE_SECRET_KEY_1"]
         self.waf_secret = app.config["WAF_SECRET"]
+        self.request_memo_enabled = app.config["API_REQUEST_MEMO_ENABLED"]
+        self.request_memo_max_entries = app.config["API_REQUEST_MEMO_MAX_ENTRIES"]
+        self.keepalive_enabled = app.config["API_HTTP_KEEPALIVE_ENABLED"]
+        self.pool_connections = app.config["API_HTTP_POOL_CONNECTIONS"]
+        self.pool_maxsize = app.config["API_HTTP_POOL_MAXSIZE"]
+        self.pool_block = app.config["API_HTTP_POOL_BLOCK"]
 
     def generate_headers(self, api_token):
         headers = {
@@ -74,7 +180,22 @@ class NotifyAdminAPIClient(BaseAPIClient):
             is None
         ):
             self.log_admin_call(url, "GET")
-        return super().request("GET", url, params=params)
+        # Paged GETs (like the pages of a CSV export) are each fetched once, and can be big
+        if not (self.request_memo_enabled and has_request_context()) or (params and "page" in params):
+            return super().request("GET", url, params=params)
+
+        # Identical GETs made by before_request hooks, decorators, views and templates
+        # while serving one request are only sent to the API once
+        memo = g.setdefault("api_get_memo", {})
+        key = (url, json.dumps(params, sort_keys=True, default=str))
+        if key in memo:
+            g.api_get_memo_hits = g.get("api_get_memo_hits", 0) + 1
+            return deepcopy(memo[key])
+        api_response = super().request("GET", url, params=params)
+        memo[key] = deepcopy(api_response)
+        while len(memo) > self.request_memo_max_entries:
+            del memo[next(iter(memo))]
+        return api_response
 
     def post(self, *args, **kwargs):
         if "url" in kwargs:
@@ -82,6 +203,7 @@ class NotifyAdminAPIClient(BaseAPIClient):
         if len(args) > 0:
             self.log_admin_call(args[0], "POST")
         self.check_inactive_service()
+        _invalidate_request_memo()
         return super().post(*args, **kwargs)
 
     def put(self, *args, **kwargs):
@@ -90,6 +212,7 @@ class NotifyAdminAPIClient(BaseAPIClient):
         if len(args) > 0:
             self.log_admin_call(args[0], "PUT")
         self.check_inactive_service()
+        _invalidate_request_memo()
         return super().put(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
@@ -98,6 +221,7 @@ class NotifyAdminAPIClient(BaseAPIClient):
         if len(args) > 0:
             self.log_admin_call(args[0], "DELETE")
         self.check_inactive_service()
+        _invalidate_request_memo()
         return super().delete(*args, **kwargs)
 
     def _perform_request(self, method, url, kwargs):
@@ -106,12 +230,24 @@ class NotifyAdminAPIClient(BaseAPIClient):
         # the admin can't connect to the API.
         for i in [1, 2, 3]:
             try:
-                return super()._perform_request(method, url, kwargs)
+                return self._send_request(method, url, kwargs)
             except HTTP503Error as e:
                 logger.warn("Retrying API request after failure {} {}".format(method, url))
                 if i == 3:
                     raise e
 
+    def _send_request(self, method, url, kwargs):
+        if not self.keepalive_enabled:
+            return super()._perform_request(method, url, kwargs)
+
+        _api_session.current = get_api_session(self.pool_connections, self.pool_maxsize, self.pool_block)
+        _connection_tracking.opened = False
+        try:
+            return super()._perform_request(method, url, kwargs)
+        finally:
+            _api_session.current = None
+            statsd_client.incr("api_client.connections.{}".format("opened" if _connection_tracking.opened else "reused"))
+
 
 class InviteTokenError(Exception):
     pass
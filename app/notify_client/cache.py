@@ -1,39 +1,293 @@
 import json
-from contextlib import suppress
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
 from datetime import timedelta
+from fnmatch import fnmatchcase
 from functools import wraps
 from inspect import signature
+from string import Formatter
+from time import monotonic, sleep, time
+from uuid import uuid4
 
 from app.extensions import redis_client
 
 TTL = int(timedelta(days=7).total_seconds())
 
+# Single-flight refreshes: how long a refresh lock lives, and how long other callers wait for it
+REFRESH_LOCK_TTL = 10
+REFRESH_LOCK_WAIT = 2.0
+REFRESH_LOCK_POLL_INTERVAL = 0.05
 
-def _get_argument(argument_name, client_method, args, kwargs):
-    with suppress(KeyError):
-        return kwargs[argument_name]
+# Deletes a lock only if it still holds the caller's token, so a caller that outlived the lock's TTL
+# can't release the lock someone else has taken since
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
 
-    with suppress(ValueError, IndexError):
-        argument_index = list(signature(client_method).parameters).index(argument_name)
-        return args[argument_index - 1]  # -1 because `args` doesn’t include `self`
+# Deletes every key in a tag set, then the set itself. Keys are stored and tagged in one transaction
+# (see `_set_and_tag`), and scripts run atomically, so no key can be stored between the two untagged
+DELETE_TAGGED_KEYS_SCRIPT = """
+local keys = redis.call('ZRANGE', KEYS[1], 0, -1)
+for i = 1, #keys, 1000 do
+    redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+end
+redis.call('DEL', KEYS[1])
+return keys
+"""
 
-    with suppress(KeyError):
-        return signature(client_method).parameters[argument_name].default
+logger = logging.getLogger(__name__)
 
-    raise TypeError("{}() takes no argument called '{}'".format(client_method.__name__, argument_name))
 
+class CacheSerializer:
+    """
+    Turns API responses into the values stored in Redis by the `set` decorators, and back.
 
-def _make_key(key_format, client_method, args, kwargs):
-    return key_format.format(
-        **{
-            argument_name: _get_argument(argument_name, client_method, args, kwargs)
-            for argument_name in list(signature(client_method).parameters)
-        }
-    )
+    Values are stored as JSON. With a compression threshold set, values at least that long are
+    stored zlib-compressed behind a versioned prefix instead. JSON can never start with the prefix,
+    so plain entries written before compression was turned on (or after it's turned off) stay
+    readable, and another format can be added later under a new prefix.
+    """
 
+    COMPRESSED_PREFIX = b"\x00zlib1:"
+    COMPRESSION_LEVEL = 6
 
-def set_service_template(key_format):
+    def __init__(self):
+        self.compression_threshold = 0
+
+    def init_app(self, app):
+        self.compression_threshold = app.config["REDIS_CACHE_COMPRESSION_THRESHOLD"]
+
+    def dumps(self, value):
+        serialized = json.dumps(value)
+        if self.compression_threshold and len(serialized) >= self.compression_threshold:
+            return self.COMPRESSED_PREFIX + zlib.compress(serialized.encode("utf-8"), self.COMPRESSION_LEVEL)
+        return serialized
+
+    def loads(self, serialized):
+        if isinstance(serialized, bytes) and serialized.startswith(self.COMPRESSED_PREFIX):
+            serialized = zlib.decompress(serialized[len(self.COMPRESSED_PREFIX) :])
+        return json.loads(serialized)
+
+
+cache_serializer = CacheSerializer()
+
+
+class LocalCache:
+    """
+    A small per-process LRU cache that sits in front of Redis for the `set` decorator.
+
+    Entries are the raw strings stored in Redis, so a local hit saves the network round
+    trip but behaves exactly like a Redis hit. Entries expire after a short TTL so that
+    a missed invalidation message can only ever serve stale data for a few seconds.
+    Invalidations are broadcast to the other workers over a Redis pub/sub channel.
+    """
+
+    CHANNEL = "admin-local-cache-invalidation"
+    LISTENER_RETRY_INTERVAL = 10  # seconds between attempts to subscribe if Redis can't be reached
+
+    def __init__(self):
+        self.enabled = False
+        self.max_size = 0
+        self.ttl = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener_lock = threading.Lock()
+        self._listener = None
+        self._listener_pid = None
+        self._listener_retry_at = 0
+
+    def init_app(self, app):
+        self.enabled = app.config["REDIS_LOCAL_CACHE_ENABLED"]
+        self.max_size = app.config["REDIS_LOCAL_CACHE_MAX_SIZE"]
+        self.ttl = app.config["REDIS_LOCAL_CACHE_TTL"]
+        self._redis_enabled = app.config["REDIS_ENABLED"]
+        self.clear()
+
+    def get(self, key):
+        if not self.enabled or not self._ensure_listener():
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (value, monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, *keys):
+        if not self.enabled or not keys:
+            return
+        self._evict_local(keys=keys)
+        self._publish({"pid": os.getpid(), "keys": list(keys)})
+
+    def evict_by_pattern(self, pattern):
+        if not self.enabled:
+            return
+        self._evict_local(pattern=pattern)
+        self._publish({"pid": os.getpid(), "pattern": pattern})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict_local(self, keys=(), pattern=None):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            if pattern is not None:
+                # Redis glob patterns (`*`, `?`) mean the same thing to fnmatch
+                for key in [key for key in self._entries if fnmatchcase(key, pattern)]:
+                    del self._entries[key]
+
+    def _publish(self, message):
+        if not self._redis_enabled:
+            return
+        try:
+            redis_client.redis_store.publish(self.CHANNEL, json.dumps(message))
+        except Exception:
+            logger.exception("Failed to publish local cache invalidation")
+
+    def _handle_message(self, message):
+        try:
+            data = message["data"]
+            payload = json.loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+        except (KeyError, TypeError, ValueError):
+            return
+        if payload.get("pid") == os.getpid():
+            return
+        self._evict_local(keys=payload.get("keys", []), pattern=payload.get("pattern"))
+
+    def _ensure_listener(self):
+        """
+        Subscribe to invalidations from the other workers if this process isn't already, and return
+        whether it is. Entries aren't served while it isn't, because invalidations could be missed.
+        """
+        # Started lazily so that each forked gunicorn worker gets its own subscriber
+        if not self._redis_enabled or self._is_listening():
+            return True
+        with self._listener_lock:
+            if self._is_listening():
+                return True
+            if monotonic() < self._listener_retry_at:
+                return False
+            # Anything cached before the fork, or while we weren't listening, may have been invalidated
+            self.clear()
+            try:
+                pubsub = redis_client.redis_store.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.CHANNEL: self._handle_message})
+                self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+            except Exception:
+                logger.exception("Failed to subscribe to local cache invalidations")
+                self._listener_retry_at = monotonic() + self.LISTENER_RETRY_INTERVAL
+                return False
+            self._listener_pid = os.getpid()
+            return True
+
+    def _is_listening(self):
+        return self._listener_pid == os.getpid() and self._listener is not None and self._listener.is_alive()
+
+
+local_cache = LocalCache()
+
+
+def _key_maker(key_format, client_method):
+    """
+    Work out once, when a method is decorated, where each argument in `key_format` comes from, so
+    building the key on every call doesn't need to inspect the method's signature again.
+    """
+    parameters = signature(client_method).parameters
+    parameter_names = list(parameters)
+    arguments = {}
+
+    for _, field_name, _, _ in Formatter().parse(key_format):
+        if field_name is None:
+            continue
+        argument_name = re.split(r"[.\[]", field_name, maxsplit=1)[0]
+        if argument_name not in parameters:
+            raise TypeError("{}() takes no argument called '{}'".format(client_method.__name__, argument_name))
+        # -1 because `args` doesn’t include `self`
+        arguments[argument_name] = (parameter_names.index(argument_name) - 1, parameters[argument_name].default)
+
+    def make_key(args, kwargs):
+        values = {}
+        for argument_name, (argument_index, default) in arguments.items():
+            if argument_name in kwargs:
+                values[argument_name] = kwargs[argument_name]
+            elif 0 <= argument_index < len(args):
+                values[argument_name] = args[argument_index]
+            else:
+                values[argument_name] = default
+        return key_format.format(**values)
+
+    return make_key
+
+
+def _tag_key(tag):
+    # A sorted set, so not the plain sets used by `cache-tag-{tag}` keys before members expired
+    return f"cache-tagged-{tag}"
+
+
+def _set_and_tag(redis_key, value, tags):
+    """
+    Store `value` under `redis_key` and add the key to the set of each of `tags`, in one transaction
+    so that `delete_by_tag` can't run in between and miss the key.
+
+    Tag sets are sorted by when each key expires, and keys that have expired are pruned whenever a
+    key is tagged, so sets for tags that are rarely deleted (like template versions) don't keep growing.
+    """
+    if not tags or not redis_client.active:
+        redis_client.set(redis_key, value, ex=TTL)
+        return
+    now = time()
+    try:
+        pipe = redis_client.redis_store.pipeline(transaction=True)
+        pipe.set(redis_key, value, ex=TTL)
+        for tag in tags:
+            pipe.zremrangebyscore(_tag_key(tag), "-inf", now)
+            pipe.zadd(_tag_key(tag), {redis_key: now + TTL})
+            pipe.expire(_tag_key(tag), TTL)
+        pipe.execute()
+    except Exception:
+        logger.exception("Failed to set tagged cache key {}".format(redis_key))
+
+
+def _delete_tagged_keys(tag):
+    if not redis_client.active:
+        return
+    try:
+        keys = redis_client.redis_store.eval(DELETE_TAGGED_KEYS_SCRIPT, 1, _tag_key(tag))
+    except Exception:
+        logger.exception("Failed to delete cache keys tagged {}".format(tag))
+        return
+    local_cache.evict(*(key.decode("utf-8") if isinstance(key, bytes) else key for key in keys))
+
+
+def set_service_template(key_format, tags=()):
     def _set(client_method):
+        make_key = _key_maker(key_format, client_method)
+
         @wraps(client_method)
         def new_client_method(client_instance, *args, **kwargs):
             """
@@ -43,28 +297,25 @@ def set_service_template(key_format):
             decorator checks the category on the template against the cached category and updates the template if it is
             dirty
             """
-            redis_key = _make_key(key_format, client_method, args, kwargs)
+            redis_key = make_key(args, kwargs)
             cached_template = redis_client.get(redis_key)
 
             if cached_template:
-                template_category = json.loads(cached_template.decode("utf-8")).get("template_category")
+                template = cache_serializer.loads(cached_template)
+                template_category = template.get("template_category")
                 cached_category = redis_client.get(f"template_category-{template_category['id']}") if template_category else None
 
                 if cached_category:
-                    category = json.loads(cached_category.decode("utf-8"))
+                    category = cache_serializer.loads(cached_category)
 
                     if not category == template_category:
-                        redis_client.set(redis_key, json.dumps(cached_category), ex=TTL)
+                        _set_and_tag(redis_key, json.dumps(cached_category), tags)
 
-                return json.loads(cached_template.decode("utf-8"))
+                return template
 
             api_response = client_method(client_instance, *args, **kwargs)
 
-            redis_client.set(
-                redis_key,
-                json.dumps(api_response),
-                ex=TTL,
-            )
+            _set_and_tag(redis_key, cache_serializer.dumps(api_response), tags)
             return api_response
 
         return new_client_method
@@ -72,20 +323,90 @@ def set_service_template(key_format):
     return _set
 
 
-def set(key_format):
+def acquire_lock(lock_key, ttl):
+    """
+    Take the Redis lock `lock_key` for `ttl` seconds. Returns a token to pass to `release_lock`,
+    or `None` if someone else holds the lock. Raises if Redis can't be reached, so that callers
+    can go ahead without the lock instead of waiting for a lock nobody can take.
+    """
+    token = uuid4().hex
+    if redis_client.redis_store.set(lock_key, token, ex=ttl, nx=True):
+        return token
+    return None
+
+
+def release_lock(lock_key, token):
+    try:
+        redis_client.redis_store.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+    except Exception:
+        logger.exception("Failed to release lock {}".format(lock_key))
+
+
+def _acquire_refresh_lock(redis_key):
+    """
+    Returns `((lock_key, token), None)` if the caller should refresh `redis_key` while holding the
+    lock, or `(None, cached)` if another caller refreshed it while we waited. If that caller is too
+    slow, or Redis can't be reached, returns `(None, None)` and we refresh the value without the lock.
+    """
+    lock_key = f"{redis_key}-refresh-lock"
+    try:
+        token = acquire_lock(lock_key, REFRESH_LOCK_TTL)
+    except Exception:
+        logger.warning("Failed to take lock {}, refreshing without it".format(lock_key))
+        return None, None
+    if token:
+        return (lock_key, token), None
+
+    deadline = monotonic() + REFRESH_LOCK_WAIT
+    while monotonic() < deadline:
+        sleep(REFRESH_LOCK_POLL_INTERVAL)
+        cached = redis_client.get(redis_key)
+        if cached:
+            return None, cached
+    return None, None
+
+
+def set(key_format, single_flight=False, tags=()):
+    """
+    Cache the API response in Redis under `key_format`, formatted with the method's arguments.
+
+    Keys are added to the Redis set for each of `tags`, so that `delete_by_tag` can invalidate a
+    whole family of keys (e.g. every service's template list) without scanning the keyspace.
+
+    With `single_flight=True`, only one caller at a time refreshes a missing key from the API and
+    the others wait briefly for its result. Use it for hot keys that are invalidated by edits, so
+    every request in flight doesn't hit the API at once when the key is deleted.
+    """
+
     def _set(client_method):
+        make_key = _key_maker(key_format, client_method)
+
         @wraps(client_method)
         def new_client_method(client_instance, *args, **kwargs):
-            redis_key = _make_key(key_format, client_method, args, kwargs)
+            redis_key = make_key(args, kwargs)
+            cached = local_cache.get(redis_key)
+            if cached:
+                return cache_serializer.loads(cached)
             cached = redis_client.get(redis_key)
             if cached:
-                return json.loads(cached.decode("utf-8"))
-            api_response = client_method(client_instance, *args, **kwargs)
-            redis_client.set(
-                redis_key,
-                json.dumps(api_response),
-                ex=TTL,
-            )
+                local_cache.set(redis_key, cached)
+                return cache_serializer.loads(cached)
+
+            lock = None
+            if single_flight and redis_client.active:
+                lock, cached = _acquire_refresh_lock(redis_key)
+                if cached:
+                    local_cache.set(redis_key, cached)
+                    return cache_serializer.loads(cached)
+
+            try:
+                api_response = client_method(client_instance, *args, **kwargs)
+                serialized = cache_serializer.dumps(api_response)
+                _set_and_tag(redis_key, serialized, tags)
+            finally:
+                if lock:
+                    release_lock(*lock)
+            local_cache.set(redis_key, serialized)
             return api_response
 
         return new_client_method
@@ -93,15 +414,40 @@ def set(key_format):
     return _set
 
 
+def delete_keys(*keys):
+    """
+    Delete cached keys from Redis and from the local cache of every worker, for code that
+    invalidates keys itself rather than with the `delete` decorators.
+    """
+    try:
+        redis_client.delete(*keys)
+    finally:
+        local_cache.evict(*keys)
+
+
+def delete_keys_by_pattern(pattern):
+    """
+    Like `delete_keys`, for every key matching a Redis glob pattern. Scans the keyspace, so keep
+    it for rare, manual sweeps. Returns the number of keys deleted from Redis.
+    """
+    try:
+        return redis_client.delete_cache_keys_by_pattern(pattern)
+    finally:
+        local_cache.evict_by_pattern(pattern)
+
+
 def delete(key_format):
     def _delete(client_method):
+        make_key = _key_maker(key_format, client_method)
+
         @wraps(client_method)
         def new_client_method(client_instance, *args, **kwargs):
             try:
                 api_response = client_method(client_instance, *args, **kwargs)
             finally:
-                redis_key = _make_key(key_format, client_method, args, kwargs)
+                redis_key = make_key(args, kwargs)
                 redis_client.delete(redis_key)
+                local_cache.evict(redis_key)
             return api_response
 
         return new_client_method
@@ -117,8 +463,28 @@ def delete_by_pattern(pattern):
                 api_response = client_method(client_instance, *args, **kwargs)
             finally:
                 redis_client.delete_cache_keys_by_pattern(pattern)
+                local_cache.evict_by_pattern(pattern)
             return api_response
 
         return new_client_method
 
     return _delete_by_pattern
+
+
+def delete_by_tag(tag):
+    """
+    Delete every key cached with `tag`, without scanning the keyspace.
+    """
+
+    def _delete_by_tag(client_method):
+        @wraps(client_method)
+        def new_client_method(client_instance, *args, **kwargs):
+            try:
+                api_response = client_method(client_instance, *args, **kwargs)
+            finally:
+                _delete_tagged_keys(tag)
+            return api_response
+
+        return new_client_method
+
+    return _delete_by_tag
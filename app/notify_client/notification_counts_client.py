@@ -1,13 +1,14 @@
-from flask import current_app
+from flask import current_app, g, has_request_context
 from notifications_utils.clients.redis import (
     billable_units_sms_daily_count_cache_key,
     email_daily_count_cache_key,
     sms_daily_count_cache_key,
 )
 
-from app import redis_client, service_api_client, template_statistics_client
-from app.extensions import annual_limit_client
+from app.extensions import annual_limit_client, redis_client
 from app.models.service import Service
+from app.notify_client.service_api_client import service_api_client
+from app.notify_client.template_statistics_api_client import template_statistics_client
 from app.utils import get_current_financial_year
 
 
@@ -16,13 +17,13 @@ class NotificationCounts:
         # try to get today's stats from redis
         # TODO FF_USE_BILLABLE_UNITS removal - Use billable units when feature flag is enabled
         if current_app.config.get("FF_USE_BILLABLE_UNITS"):
-            todays_sms_val = redis_client.get(billable_units_sms_daily_count_cache_key(service_id))
+            todays_sms_val = get_todays_count_from_redis(service_id, billable_units_sms_daily_count_cache_key(service_id))
             todays_sms = int(todays_sms_val) if todays_sms_val is not None else None
         else:
-            todays_sms_val = redis_client.get(sms_daily_count_cache_key(service_id))
+            todays_sms_val = get_todays_count_from_redis(service_id, sms_daily_count_cache_key(service_id))
             todays_sms = int(todays_sms_val) if todays_sms_val is not None else None
 
-        todays_email = redis_client.get(email_daily_count_cache_key(service_id))
+        todays_email = get_todays_count_from_redis(service_id, email_daily_count_cache_key(service_id))
         todays_email = int(todays_email) if todays_email is not None else None
 
         if todays_sms is not None and todays_email is not None:
@@ -140,6 +141,40 @@ class NotificationCounts:
         return limit_stats
 
 
+def get_todays_count_from_redis(service_id, cache_key):
+    """
+    Get one of today's notification counters for a service from Redis.
+
+    The send and dashboard pages read several of these counters in a request, so when Redis is
+    enabled all of a service's counters are fetched in a single MGET on the first read and
+    remembered until the end of the request.
+    """
+    if not redis_client.active or not has_request_context():
+        return redis_client.get(cache_key)
+
+    todays_counts = g.setdefault("todays_counts_from_redis", {})
+    if service_id not in todays_counts:
+        cache_keys = [
+            sms_daily_count_cache_key(service_id),
+            billable_units_sms_daily_count_cache_key(service_id),
+            email_daily_count_cache_key(service_id),
+        ]
+        try:
+            values = redis_client.redis_store.mget(cache_keys)
+        except Exception:
+            current_app.logger.exception("Failed to get today's notification counts from Redis for service {}".format(service_id))
+            values = [None] * len(cache_keys)
+        todays_counts[service_id] = dict(zip(cache_keys, values))
+    return todays_counts[service_id][cache_key]
+
+
+def clear_todays_counts_from_redis(exception=None):
+    """
+    Teardown handler for the counters remembered by `get_todays_count_from_redis`.
+    """
+    g.pop("todays_counts_from_redis", None)
+
+
 # TODO: consolidate this function and other functions that transform the results of template_statistics_client calls
 def _aggregate_notifications_stats(template_statistics, count_field="count"):
     template_statistics = _filter_out_cancelled_stats(template_statistics)
@@ -2,12 +2,11 @@ from itertools import chain
 
 from notifications_python_client.errors import HTTPError
 
-from app.extensions import redis_client
 from app.notify_client import NotifyAdminAPIClient, _attach_current_user, cache
 
 
 class OrganisationsClient(NotifyAdminAPIClient):
-    @cache.set("organisations")
+    @cache.set("organisations", single_flight=True)
     def get_organisations(self):
         return self.get(url="/organisations")
 
@@ -46,7 +45,7 @@ class OrganisationsClient(NotifyAdminAPIClient):
         api_response = self.post(url="/organisations/{}".format(org_id), data=kwargs)
 
         if kwargs.get("organisation_type") and cached_service_ids:
-            redis_client.delete(*map("service-{}".format, cached_service_ids))
+            cache.delete_keys(*map("service-{}".format, cached_service_ids))
 
         return api_response
 
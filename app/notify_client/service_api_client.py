@@ -311,7 +311,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
             _attach_current_user({"postage": postage}),
         )
 
-    @cache.set_service_template("template-{template_id}-version-{version}")
+    @cache.set_service_template("template-{template_id}-version-{version}", tags=["template-versions"])
     def get_service_template(self, service_id, template_id, version=None):
         """
         Retrieve a service template.
@@ -329,7 +329,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         endpoint = "/service/{service_id}/template/{template_id}/versions".format(service_id=service_id, template_id=template_id)
         return self.get(endpoint)
 
-    @cache.set("service-{service_id}-templates")
+    @cache.set("service-{service_id}-templates", single_flight=True, tags=["service-templates"])
     def get_service_templates(self, service_id):
         """
         Retrieve all templates for service.
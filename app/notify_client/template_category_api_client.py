@@ -34,7 +34,7 @@ class TemplateCategoryClient(NotifyAdminAPIClient):
     def get_template_category(self, template_category_id):
         return self.get(url="/template-category/{}".format(template_category_id))["template_category"]
 
-    @cache.set("template_categories")
+    @cache.set("template_categories", single_flight=True)
     def get_all_template_categories(self, template_type=None, hidden=None, sort_key=None):
         categories = self.get(url="/template-category")["template_categories"]
 
@@ -47,8 +47,8 @@ class TemplateCategoryClient(NotifyAdminAPIClient):
 
     @cache.delete("template_category-{template_category_id}")
     @cache.delete("template_categories")
-    @cache.delete_by_pattern("service-????????-????-????-????-????????????-templates")
-    @cache.delete_by_pattern("template-????????-????-????-????-????????????-version-*")
+    @cache.delete_by_tag("service-templates")
+    @cache.delete_by_tag("template-versions")
     def update_template_category(
         self,
         template_category_id,
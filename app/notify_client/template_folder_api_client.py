@@ -8,7 +8,7 @@ class TemplateFolderAPIClient(NotifyAdminAPIClient):
         data = {"name": name, "parent_id": parent_id}
         return self.post("/service/{}/template-folder".format(service_id), data)["data"]["id"]
 
-    @cache.set("service-{service_id}-template-folders")
+    @cache.set("service-{service_id}-template-folders", single_flight=True)
     def get_template_folders(self, service_id):
         return self.get("/service/{}/template-folder".format(service_id))["template_folders"]
 
@@ -343,7 +343,7 @@ class UserApiClient(NotifyAdminAPIClient):
             for sid in set(service_ids):
                 try:
                     # delete specific known keys
-                    redis_client.delete(
+                    cache.delete_keys(
                         f"service-{sid}",
                         f"service-{sid}-templates",
                         f"service-{sid}-template-folders",
@@ -352,7 +352,7 @@ class UserApiClient(NotifyAdminAPIClient):
                 except Exception:
                     # if delete of specific keys fails, try pattern delete as a fallback
                     with suppress(Exception):
-                        redis_client.delete_cache_keys_by_pattern(f"service-{sid}*")
+                        cache.delete_keys_by_pattern(f"service-{sid}*")
         except Exception:
             # anything went wrong in the cache invalidation path - don't block the suspend
             pass
@@ -1,17 +1,28 @@
+import io
+import json
 import uuid
 
 import botocore
-from boto3 import resource
+from boto3.s3.transfer import TransferConfig
 from flask import current_app
 from notifications_utils.s3 import s3upload as utils_s3upload
 
+from app.aws_clients import get_aws_client
+from app.extensions import redis_client
 from app.s3_client.s3_logo_client import get_s3_object
 
 FILE_LOCATION_STRUCTURE = "service-{}-notify/{}.csv"
+ROW_OFFSET_INDEX_LOCATION_STRUCTURE = "service-{}-notify/{}.index.json"
 REPORTS_FILE_LOCATION_STRUCTURE = "reports/{}/{}.csv"
 
 # Default chunk size for streaming (1MB)
 CHUNK_SIZE = 1024 * 1024
+# Size of each part of a multipart upload, and so of the most data `s3upload_chunks` buffers at once
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+# Size of each part when S3 copies a big file itself, with no data passing through the admin
+MULTIPART_COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# Where the listing of the whole bulk send bucket is cached
+BULK_SEND_UPLOADS_CACHE_KEY = "bulk-send-uploads"
 
 
 def get_csv_location(service_id, upload_id):
@@ -21,6 +32,13 @@ def get_csv_location(service_id, upload_id):
     )
 
 
+def get_row_offset_index_location(service_id, upload_id):
+    return (
+        current_app.config["CSV_UPLOAD_BUCKET_NAME"],
+        ROW_OFFSET_INDEX_LOCATION_STRUCTURE.format(service_id, upload_id),
+    )
+
+
 def get_report_location(service_id, report_id):
     return REPORTS_FILE_LOCATION_STRUCTURE.format(service_id, report_id)
 
@@ -41,6 +59,50 @@ def s3upload(service_id, filedata, region):
     return upload_id
 
 
+class ChunkReader(io.RawIOBase):
+    """
+    A read-only file object over an iterator of bytes chunks, so they can be uploaded as they are produced.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.leftover = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.leftover:
+            try:
+                self.leftover = next(self.chunks)
+            except StopIteration:
+                return 0
+        data, self.leftover = self.leftover[: len(buffer)], self.leftover[len(buffer) :]
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def s3upload_chunks(service_id, chunks, region):
+    """
+    Like `s3upload`, but for data given as an iterator of bytes chunks. Bigger files are sent as a multipart
+    upload one part at a time, so memory use is bounded by `MULTIPART_CHUNK_SIZE` rather than the file size.
+    """
+    upload_id = str(uuid.uuid4())
+    bucket_name, file_location = get_csv_location(service_id, upload_id)
+    get_aws_client("s3", region_name=region).upload_fileobj(
+        io.BufferedReader(ChunkReader(chunks), buffer_size=CHUNK_SIZE),
+        bucket_name,
+        file_location,
+        ExtraArgs={"ServerSideEncryption": "AES256"},
+        Config=TransferConfig(
+            multipart_threshold=MULTIPART_CHUNK_SIZE,
+            multipart_chunksize=MULTIPART_CHUNK_SIZE,
+            use_threads=False,
+        ),
+    )
+    return upload_id
+
+
 def s3download(service_id, upload_id):
     contents = ""
     try:
@@ -52,6 +114,45 @@ def s3download(service_id, upload_id):
     return contents
 
 
+def s3download_range(service_id, upload_id, start, end):
+    """
+    Download bytes `start` up to but not including `end` of an uploaded CSV, without fetching the rest of it.
+    """
+    if start >= end:
+        return b""
+    try:
+        return get_csv_upload(service_id, upload_id).get(Range="bytes={}-{}".format(start, end - 1))["Body"].read()
+    except botocore.exceptions.ClientError as e:
+        current_app.logger.error("Unable to download s3 file {}".format(FILE_LOCATION_STRUCTURE.format(service_id, upload_id)))
+        raise e
+
+
+def s3upload_row_offset_index(service_id, upload_id, row_offset_index):
+    """
+    Store the row offset index of an uploaded CSV next to it, so views that only need a few
+    of its rows can read them with `s3download_range`.
+    """
+    get_s3_object(*get_row_offset_index_location(service_id, upload_id)).put(
+        Body=json.dumps(row_offset_index).encode("utf-8"),
+        ContentType="application/json",
+        ServerSideEncryption="AES256",
+    )
+
+
+def get_row_offset_index(service_id, upload_id):
+    try:
+        return json.loads(get_s3_object(*get_row_offset_index_location(service_id, upload_id)).get()["Body"].read())
+    except botocore.exceptions.ClientError as e:
+        # Uploads from before indexes were stored don't have one, and callers can read the whole file instead
+        if e.response["Error"]["Code"] != "NoSuchKey":
+            current_app.logger.warning(
+                "Unable to read row offset index for s3 file {}: {}".format(
+                    FILE_LOCATION_STRUCTURE.format(service_id, upload_id), e
+                )
+            )
+        return None
+
+
 def set_metadata_on_csv_upload(service_id, upload_id, **kwargs):
     get_csv_upload(service_id, upload_id).copy_from(
         CopySource="{}/{}".format(*get_csv_location(service_id, upload_id)),
@@ -72,23 +173,61 @@ def get_csv_metadata(service_id, upload_id):
         return {}
 
 
-def list_bulk_send_uploads():
-    s3 = resource("s3")
-    bulk_send_bucket = s3.Bucket(current_app.config["BULK_SEND_AWS_BUCKET"])
+def list_bulk_send_uploads(prefix=""):
+    """
+    List the files in the bulk send bucket whose keys start with `prefix`, most recent first, as
+    dicts of their `key` and `last_modified` time.
+
+    The bucket is listed a page of keys at a time. The whole listing is cached in Redis under one
+    key for `BULK_SEND_UPLOADS_CACHE_TTL` seconds and filtered by `prefix`, so that every visit to the
+    page doesn't list it again and prefixes typed by users never end up in Redis keys.
+    """
+    cache_ttl = current_app.config["BULK_SEND_UPLOADS_CACHE_TTL"]
+    if not cache_ttl:
+        return _list_bulk_send_bucket(prefix)
+
+    cached = redis_client.get(BULK_SEND_UPLOADS_CACHE_KEY)
+    if cached:
+        files = json.loads(cached)
+    else:
+        files = _list_bulk_send_bucket()
+        redis_client.set(BULK_SEND_UPLOADS_CACHE_KEY, json.dumps(files), ex=cache_ttl)
+    return [f for f in files if f["key"].startswith(prefix)]
+
 
+def _list_bulk_send_bucket(prefix=""):
     files = []
-    for f in bulk_send_bucket.objects.all():
-        files.append(f)
+    paginator = get_aws_client("s3").get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=current_app.config["BULK_SEND_AWS_BUCKET"], Prefix=prefix):
+        for f in page.get("Contents", []):
+            files.append({"key": f["Key"], "last_modified": f["LastModified"].isoformat()})
     # sort so most recent files are at the top of the page
-    files.sort(key=lambda f: f.last_modified, reverse=True)
+    files.sort(key=lambda f: f["last_modified"], reverse=True)
     return files
 
 
 def copy_bulk_send_file_to_uploads(service_id, filekey):
-    s3 = resource("s3")
-    obj = s3.Object(current_app.config["BULK_SEND_AWS_BUCKET"], filekey)
-    body = obj.get()["Body"].read()
-    upload_id = s3upload(service_id, {"data": body}, current_app.config["AWS_REGION"])
+    """
+    Copy a file from the bulk send bucket to a new upload, with S3 copying the data itself. Files bigger
+    than `MULTIPART_COPY_CHUNK_SIZE` are copied as a multipart copy.
+    """
+    upload_id = str(uuid.uuid4())
+    bucket_name, file_location = get_csv_location(service_id, upload_id)
+    try:
+        get_aws_client("s3", region_name=current_app.config["AWS_REGION"]).copy(
+            {"Bucket": current_app.config["BULK_SEND_AWS_BUCKET"], "Key": filekey},
+            bucket_name,
+            file_location,
+            ExtraArgs={"ServerSideEncryption": "AES256"},
+            Config=TransferConfig(
+                multipart_threshold=MULTIPART_COPY_CHUNK_SIZE,
+                multipart_chunksize=MULTIPART_COPY_CHUNK_SIZE,
+                use_threads=False,
+            ),
+        )
+    finally:
+        # Files are added to and removed from the bucket outside of Notify, so list it again next time
+        redis_client.delete(BULK_SEND_UPLOADS_CACHE_KEY)
     return upload_id
 
 
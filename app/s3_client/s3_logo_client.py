@@ -1,9 +1,10 @@
 import uuid
 
-from boto3 import resource
 from flask import current_app
 from notifications_utils.s3 import s3upload as utils_s3upload
 
+from app.aws_clients import get_s3_resource
+
 TEMP_TAG = "temp-{user_id}_"
 EMAIL_LOGO_LOCATION_STRUCTURE = "{temp}{unique_id}-{filename}"
 LETTER_PREFIX = "letters/static/images/letter-template/"
@@ -12,8 +13,7 @@ LETTER_TEMP_LOGO_LOCATION = "letters/static/images/letter-template/temp-{user_id
 
 
 def get_s3_object(bucket_name, filename):
-    s3 = resource("s3")
-    return s3.Object(bucket_name, filename)
+    return get_s3_resource().Object(bucket_name, filename)
 
 
 def delete_s3_object(filename):
@@ -31,8 +31,7 @@ def persist_logo(old_name, new_name):
 
 def get_s3_objects_filter_by_prefix(prefix):
     bucket_name = current_app.config["LOGO_UPLOAD_BUCKET_NAME"]
-    s3 = resource("s3")
-    return s3.Bucket(bucket_name).objects.filter(Prefix=prefix)
+    return get_s3_resource().Bucket(bucket_name).objects.filter(Prefix=prefix)
 
 
 def get_temp_truncated_filename(filename, user_id):
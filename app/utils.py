@@ -1,6 +1,9 @@
+import codecs
+import contextvars
 import csv
 import ipaddress
 import json
+import multiprocessing
 import os
 import re
 import unicodedata
@@ -8,8 +11,9 @@ import urllib.error
 import urllib.request
 import uuid
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, time, timedelta
-from functools import wraps
+from functools import partial, wraps
 from io import BytesIO, StringIO
 from itertools import chain
 from os import path
@@ -26,16 +30,26 @@ from flask_babel import _
 from flask_babel import lazy_gettext as _l
 from flask_login import current_user, login_required
 from notifications_utils import SMS_CHAR_COUNT_LIMIT
+from notifications_utils.columns import Columns
 from notifications_utils.field import Field
-from notifications_utils.formatters import make_quotes_smart
+from notifications_utils.formatters import (
+    make_quotes_smart,
+    strip_and_remove_obscure_whitespace,
+)
 from notifications_utils.letter_timings import letter_can_be_cancelled
-from notifications_utils.recipients import RecipientCSV
+from notifications_utils.recipients import (
+    RecipientCSV,
+    first_column_headings,
+    insert_or_append_to_dict,
+)
 from notifications_utils.strftime_codes import no_pad_month
 from notifications_utils.take import Take
 from notifications_utils.template import (
     EmailPreviewTemplate,
     LetterImageTemplate,
     LetterPreviewTemplate,
+    PlainTextEmailTemplate,
+    SMSMessageTemplate,
     SMSPreviewTemplate,
 )
 from notifications_utils.timezones import (
@@ -47,6 +61,7 @@ from werkzeug.datastructures import MultiDict
 from werkzeug.routing import RequestRedirect
 
 from app import cache
+from app.aws_clients import get_aws_client
 from app.models.enum.template_types import TemplateType
 from app.notify_client.organisations_api_client import organisations_client
 from app.notify_client.service_api_client import service_api_client
@@ -193,10 +208,24 @@ def redirect_to_sign_in(f):
 
 
 def get_errors_for_csv(recipients, template_type):
+    return format_csv_row_errors(
+        template_type,
+        number_of_bad_recipients=len(list(recipients.rows_with_bad_recipients)),
+        number_of_rows_with_missing_data=len(list(recipients.rows_with_missing_data)),
+        number_of_rows_with_content_too_long=(
+            len(list(recipients.rows_with_combined_variable_content_too_long))
+            if recipients.template_type == TemplateType.SMS.value
+            else 0
+        ),
+    )
+
+
+def format_csv_row_errors(
+    template_type, number_of_bad_recipients, number_of_rows_with_missing_data, number_of_rows_with_content_too_long
+):
     errors = []
 
-    if any(recipients.rows_with_bad_recipients):
-        number_of_bad_recipients = len(list(recipients.rows_with_bad_recipients))
+    if number_of_bad_recipients:
         if "sms" == template_type:
             if 1 == number_of_bad_recipients:
                 errors.append(_("fix") + " 1 " + _("phone number"))
@@ -213,21 +242,19 @@ def get_errors_for_csv(recipients, template_type):
             else:
                 errors.append(_("fix") + " {} ".format(number_of_bad_recipients) + _("addresses"))
 
-    if any(recipients.rows_with_missing_data):
-        number_of_rows_with_missing_data = len(list(recipients.rows_with_missing_data))
+    if number_of_rows_with_missing_data:
         if 1 == number_of_rows_with_missing_data:
             errors.append(_("enter missing data in 1 row"))
         else:
             errors.append(_("enter missing data in {} rows").format(number_of_rows_with_missing_data))
 
-    if recipients.template_type == TemplateType.SMS.value and any(recipients.rows_with_combined_variable_content_too_long):
-        num_rows_with_combined_content_too_long = len(list(recipients.rows_with_combined_variable_content_too_long))
-        if num_rows_with_combined_content_too_long == 1:
+    if number_of_rows_with_content_too_long:
+        if number_of_rows_with_content_too_long == 1:
             errors.append(_("added custom content exceeds the {} character limit in 1 row").format(SMS_CHAR_COUNT_LIMIT))
         else:
             errors.append(
                 _("added custom content exceeds the {} character limit in {} rows").format(
-                    SMS_CHAR_COUNT_LIMIT, num_rows_with_combined_content_too_long
+                    SMS_CHAR_COUNT_LIMIT, number_of_rows_with_content_too_long
                 )
             )
         # TODO Update the inline cell error messages
@@ -245,14 +272,23 @@ def get_warnings_for_csv(recipients, template_type):
     equivalent. Letters are intentionally excluded because multiple recipients
     can legitimately share an address.
     """
+    if template_type == TemplateType.LETTER.value or not recipients.has_duplicate_recipients:
+        return []
+
+    return format_csv_duplicate_warnings(
+        template_type,
+        recipients.count_of_unique_duplicate_recipients,
+        recipients.count_of_duplicate_recipient_rows,
+    )
+
+
+def format_csv_duplicate_warnings(template_type, unique_duplicates, duplicate_rows):
     warnings = []
 
     if template_type == TemplateType.LETTER.value:
         return warnings
 
-    if recipients.has_duplicate_recipients:
-        unique_duplicates = recipients.count_of_unique_duplicate_recipients
-        duplicate_rows = recipients.count_of_duplicate_recipient_rows
+    if unique_duplicates:
         if unique_duplicates == 1:
             warnings.append(
                 _("1 recipient appears more than once in your list. They will receive the notification multiple times.")
@@ -282,8 +318,12 @@ def localize_and_format_csv_headers(column_headers: list) -> list:
     return localized_headers
 
 
+# A notifications CSV export is sent in chunks of about this many characters
+NOTIFICATIONS_CSV_CHUNK_SIZE = 64 * 1024
+
+
 def generate_notifications_csv(**kwargs):
-    from app import get_current_locale, notification_api_client
+    from app import get_current_locale
     from app.s3_client.s3_csv_client import s3download
 
     lang = get_current_locale(current_app)
@@ -292,11 +332,7 @@ def generate_notifications_csv(**kwargs):
         kwargs["page"] = 1
 
     if kwargs.get("job_id"):
-        original_file_contents = s3download(kwargs["service_id"], kwargs["job_id"])
-        original_upload = RecipientCSV(
-            original_file_contents,
-            template_type=kwargs["template_type"],
-        )
+        original_upload = CSVRowReader(s3download(kwargs["service_id"], kwargs["job_id"]), kwargs["template_type"])
         original_column_headers = original_upload.column_headers
         fieldnames = localize_and_format_csv_headers(
             ["Row number"] + original_column_headers + ["Template", "Type", "Job", "Status", "Time"]
@@ -314,24 +350,37 @@ def generate_notifications_csv(**kwargs):
                 "Time",
             ]
         )
+
+    labels: dict = {}
+
+    def label(value):
+        # Template types and statuses repeat on every row, so only translate each one once
+        if lang == "en":
+            return value
+        if value not in labels:
+            labels[value] = str(_l(value))
+        return labels[value]
+
     # Add encoded Byte Order Mark to the csv so MS Excel treats it as UTF-8 and properly renders accented FR characters.
     yield "\ufeff".encode("utf-8")
-    yield ",".join(fieldnames) + "\n"
 
-    while kwargs["page"]:
-        notifications_resp = notification_api_client.get_notifications_for_service(**kwargs)
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    buffer.write(",".join(fieldnames) + "\n")
+
+    for notifications_resp in _get_notification_pages(kwargs):
         for notification in notifications_resp["notifications"]:
             if kwargs.get("job_id"):
                 values = (
                     [
                         notification["row_number"],
                     ]
-                    + [original_upload[notification["row_number"] - 1].get(header).data for header in original_column_headers]
+                    + [original_upload[notification["row_number"] - 1].get(header) for header in original_column_headers]
                     + [
                         notification["template_name"],
-                        notification["template_type"] if lang == "en" else _l(notification["template_type"]),
+                        label(notification["template_type"]),
                         notification["job_name"],
-                        notification["status"] if lang == "en" else _l(notification["status"]),
+                        label(notification["status"]),
                         notification["created_at"],
                     ]
                 )
@@ -339,20 +388,46 @@ def generate_notifications_csv(**kwargs):
                 values = [
                     notification["recipient"],
                     notification["template_name"],
-                    notification["template_type"] if lang == "en" else _l(notification["template_type"]),
+                    label(notification["template_type"]),
                     notification["created_by_name"] or "",
                     notification["created_by_email_address"] or "",
                     notification["job_name"] or "",
-                    notification["status"] if lang == "en" else _l(notification["status"]),
+                    label(notification["status"]),
                     notification["created_at"],
                 ]
-            yield Spreadsheet.from_rows([map(str, values)]).as_csv_data
+            writer.writerow(map(str, values))
 
-        if notifications_resp["links"].get("next"):
-            kwargs["page"] += 1
-        else:
-            return
-    raise Exception("Should never reach here")
+            if buffer.tell() >= NOTIFICATIONS_CSV_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _get_notification_pages(kwargs):
+    """
+    Yield each page of notifications for `generate_notifications_csv`, fetching the next page
+    from the API while the one before is being written out.
+    """
+    from app import notification_api_client
+
+    notifications_resp = notification_api_client.get_notifications_for_service(**kwargs)
+    prefetch = current_app.config["CONCURRENT_FETCH_ENABLED"]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while True:
+            next_resp = None
+            if notifications_resp["links"].get("next"):
+                kwargs = {**kwargs, "page": kwargs["page"] + 1}
+                fetch_next_page = partial(notification_api_client.get_notifications_for_service, **kwargs)
+                next_resp = executor.submit(contextvars.copy_context().run, fetch_next_page) if prefetch else fetch_next_page
+
+            yield notifications_resp
+
+            if next_resp is None:
+                return
+            notifications_resp = next_resp.result() if prefetch else next_resp()
 
 
 def get_page_from_request():
@@ -416,6 +491,10 @@ def get_remote_addr(request):
 class Spreadsheet:
     allowed_file_extensions = ["csv", "xlsx", "xls", "ods", "xlsm", "tsv"]
 
+    # Size of the reads from an uploaded file, and of the chunks yielded by `iter_csv_data_from_file`
+    read_size = 64 * 1024
+    chunk_size = 1024 * 1024
+
     def __init__(self, csv_data=None, rows=None, filename="", json_data=None):
         self.filename = filename
 
@@ -486,6 +565,64 @@ class Spreadsheet:
         pyexcel.free_resources()
         return instance
 
+    @classmethod
+    def iter_csv_data_from_file(cls, file_content, filename=""):
+        """
+        Yield the same CSV data as `from_file(file_content, filename).as_csv_data`, UTF-8 encoded in
+        chunks of about `chunk_size` bytes, without ever holding all of it in memory.
+        """
+        extension = cls.get_extension(filename)
+
+        if extension == "csv":
+            yield from cls._join_in_chunks(cls._iter_normalised_lines(file_content))
+            return
+
+        if extension == "tsv":
+            file_content = StringIO(Spreadsheet.normalise_newlines(file_content))
+
+        try:
+            yield from cls._join_in_chunks(cls._iter_csv_lines(pyexcel.iget_array(file_type=extension, file_stream=file_content)))
+        finally:
+            pyexcel.free_resources()
+
+    @classmethod
+    def _iter_normalised_lines(cls, file_content):
+        # The same lines as `normalise_newlines`, but decoded as the file is read
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+        separator = ""
+        while True:
+            data = file_content.read(cls.read_size)
+            lines = (pending + decoder.decode(data, final=not data)).splitlines(keepends=True)
+            # The last line may carry on in the next read, or be a `\r` that the next read ends with `\n`
+            pending = lines.pop() if data and lines else ""
+            for line in lines:
+                yield separator + line.splitlines()[0]
+                separator = "\r\n"
+            if not data:
+                return
+
+    @staticmethod
+    def _iter_csv_lines(rows):
+        with StringIO() as converted:
+            output = csv.writer(converted)
+            for row in rows:
+                output.writerow(row)
+                yield converted.getvalue()
+                converted.seek(0)
+                converted.truncate()
+
+    @classmethod
+    def _join_in_chunks(cls, pieces):
+        chunk = bytearray()
+        for piece in pieces:
+            chunk += piece.encode("utf-8")
+            if len(chunk) >= cls.chunk_size:
+                yield bytes(chunk)
+                chunk.clear()
+        if chunk:
+            yield bytes(chunk)
+
     @property
     def as_rows(self):
         if not self._rows:
@@ -505,6 +642,317 @@ class Spreadsheet:
         return io.getvalue()
 
 
+# Rows per block in a CSV row offset index
+CSV_ROW_OFFSET_INDEX_STRIDE = 100
+
+
+def get_csv_row_offset_index(contents):
+    """
+    Get the byte offsets, in the UTF-8 encoded `contents`, of the header row and of every
+    `CSV_ROW_OFFSET_INDEX_STRIDE`th row after it, followed by the end of the last row. Rows are
+    split and numbered the same way `RecipientCSV` does it, so quoted values can span several
+    lines, and empty rows (blank, or only commas) are skipped without being counted.
+    """
+    return _get_csv_row_offsets(contents)[0]
+
+
+def count_csv_rows(contents):
+    """
+    Count the rows of an uploaded CSV the way `RecipientCSV` does, without validating them.
+    """
+    return _get_csv_row_offsets(contents)[1]
+
+
+def _get_csv_row_offsets(contents):
+    stripped = contents.strip()
+    position = len(contents[: len(contents) - len(contents.lstrip())].encode("utf-8"))
+    offsets = [position]
+
+    def lines():
+        nonlocal position
+        for line in StringIO(stripped):
+            position += len(line.encode("utf-8"))
+            yield line
+
+    found_header = False
+    index = 0
+    row_start = position
+    for row in csv.reader(lines(), quoting=csv.QUOTE_MINIMAL, skipinitialspace=True):
+        if any(row):
+            if not found_header:
+                offsets[0] = row_start
+                found_header = True
+            else:
+                if index % CSV_ROW_OFFSET_INDEX_STRIDE == 0:
+                    offsets.append(row_start)
+                index += 1
+        row_start = position
+    offsets.append(row_start)
+    return offsets, index
+
+
+def get_csv_rows_from_offset_index(read_bytes, row_offset_index, row_indices):
+    """
+    Read the header and the blocks of rows holding `row_indices` from a CSV indexed by
+    `get_csv_row_offset_index`, where `read_bytes(start, end)` returns part of the file.
+
+    Returns the CSV data for just those rows, and where each of `row_indices` is in it.
+    """
+    blocks = sorted({row_index // CSV_ROW_OFFSET_INDEX_STRIDE for row_index in row_indices})
+    header_end = row_offset_index[1] if len(row_offset_index) > 2 else row_offset_index[-1]
+    data = [read_bytes(row_offset_index[0], header_end)]
+    for block in blocks:
+        data.append(read_bytes(row_offset_index[block + 1], row_offset_index[block + 2]))
+
+    positions = {
+        row_index: blocks.index(row_index // CSV_ROW_OFFSET_INDEX_STRIDE) * CSV_ROW_OFFSET_INDEX_STRIDE
+        + row_index % CSV_ROW_OFFSET_INDEX_STRIDE
+        for row_index in row_indices
+    }
+    return b"".join(data).decode("utf-8"), positions
+
+
+class CSVRowReader:
+    """
+    Reads rows of an uploaded spreadsheet by index, with the same column headers and values
+    `RecipientCSV` would give them, but without validating anything or keeping parsed rows.
+
+    The file is read through once to find where each row starts. A row is only parsed when it
+    is asked for.
+    """
+
+    def __init__(self, contents, template_type):
+        self.contents = contents.strip()
+        self._recipient_columns = Columns.from_keys(first_column_headings[template_type])
+        self._row_starts = []
+        raw_column_headers = None
+        position = 0
+        while position < len(self.contents):
+            row, end = self._read_row(position)
+            if any(row):
+                if raw_column_headers is None:
+                    raw_column_headers = row
+                else:
+                    self._row_starts.append(position)
+            position = end
+        self._raw_column_headers = raw_column_headers or []
+        self.column_headers = list(OrderedSet(self._raw_column_headers))
+
+    def __len__(self):
+        return len(self._row_starts)
+
+    def __getitem__(self, row_index):
+        row, _end = self._read_row(self._row_starts[row_index])
+        values: dict = {}
+        for header, value in zip(self._raw_column_headers, row):
+            value = strip_and_remove_obscure_whitespace(value) or None
+            # Like RecipientCSV, a repeated recipient column keeps its last value and any other
+            # repeated column keeps a list of its values
+            if header in self._recipient_columns:
+                values[header] = value
+            else:
+                insert_or_append_to_dict(values, header, value)
+        return Columns(values)
+
+    def _read_row(self, position):
+        """
+        Parse the row starting at `position`, returning it and where the next row starts.
+        """
+        end = position
+
+        def lines():
+            nonlocal end
+            while end < len(self.contents):
+                start, end = end, (self.contents.find("\n", end) + 1) or len(self.contents)
+                yield self.contents[start:end]
+
+        row = next(csv.reader(lines(), quoting=csv.QUOTE_MINIMAL, skipinitialspace=True), [])
+        return row, end
+
+
+# Placeholder values made only of these characters are one GSM character each, and nothing in
+# how an SMS is formatted changes them, so they only add their length to the message
+SMS_PLAIN_PLACEHOLDER_VALUE = re.compile(r"[A-Za-z0-9+](?:[A-Za-z0-9@.'/+-]| (?=[A-Za-z0-9]))*")
+
+
+class SMSFragmentCounter:
+    """
+    Counts the SMS parts needed to send an SMS template to every row of a spreadsheet.
+
+    The length of the template's own text is worked out once. Rows whose placeholder values are
+    all plain text are measured by adding up the lengths of their values, and the template is
+    only rendered once for each message length found. Any other row is rendered, once for each
+    different set of values, exactly as `template.fragment_count` would count it.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.placeholders = {Columns.make_key(placeholder): placeholder for placeholder in template.placeholders}
+        self._placeholder_keys = {}
+        self._fragment_counts_by_length = {}
+        self._fragment_counts_by_values = {}
+        self._occurrences = {}
+        self._static_length = None
+
+        # Conditional placeholders show or hide text, so their values aren't just added to the length
+        if "??" in template.content:
+            return
+
+        original_values = template.values
+        try:
+            values = {placeholder: "x" for placeholder in self.placeholders.values()}
+            template.values = values
+            length = template.content_count
+            for key, placeholder in self.placeholders.items():
+                template.values = {**values, placeholder: "xx"}
+                self._occurrences[key] = template.content_count - length
+        finally:
+            template.values = original_values
+        self._static_length = length - sum(self._occurrences.values())
+
+    def total(self, rows):
+        """
+        Get the number of SMS parts needed to send the template with each of `rows`, where each
+        row is a dictionary of values like `Row.recipient_and_personalisation`.
+        """
+        original_values = self.template.values
+        try:
+            return sum(self._count(values) for values in rows)
+        finally:
+            self.template.values = original_values
+
+    def _count(self, values):
+        placeholder_values = {}
+        for column, value in values.items():
+            if column not in self._placeholder_keys:
+                key = Columns.make_key(column)
+                self._placeholder_keys[column] = key if key in self.placeholders else None
+            if self._placeholder_keys[column]:
+                placeholder_values[self._placeholder_keys[column]] = value
+
+        if (
+            self._static_length is not None
+            and len(placeholder_values) == len(self.placeholders)
+            and all(
+                isinstance(value, str) and SMS_PLAIN_PLACEHOLDER_VALUE.fullmatch(value) for value in placeholder_values.values()
+            )
+        ):
+            length = self._static_length + sum(self._occurrences[key] * len(value) for key, value in placeholder_values.items())
+            if length not in self._fragment_counts_by_length:
+                self._fragment_counts_by_length[length] = self._render_fragment_count(values)
+            return self._fragment_counts_by_length[length]
+
+        key = tuple(placeholder_values.get(key) for key in self.placeholders)
+        if key not in self._fragment_counts_by_values:
+            self._fragment_counts_by_values[key] = self._render_fragment_count(values)
+        return self._fragment_counts_by_values[key]
+
+    def _render_fragment_count(self, values):
+        self.template.values = values
+        return self.template.fragment_count
+
+
+_csv_validation_pool = None
+
+
+def get_csv_validation_pool(processes):
+    """
+    Get this worker's pool of processes for validating big CSVs in the background. The
+    processes are spawned rather than forked, so they don't inherit the web worker's gevent
+    hub or open connections.
+    """
+    global _csv_validation_pool
+    if _csv_validation_pool is None:
+        _csv_validation_pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+    return _csv_validation_pool
+
+
+def summarise_recipient_csv(recipients, contents, sms_parts_to_send, is_sms_parts_estimated=False):
+    """
+    Summarise what the check page needs from every row of a validated upload: the row count,
+    the indices of rows with errors and of rows repeating an earlier recipient, the number of
+    rows with each kind of error, whether every recipient can be sent to, the SMS parts needed
+    and the row offset index of the CSV.
+    """
+    bad_recipient_rows = {row.index for row in recipients.rows_with_bad_recipients}
+    missing_data_rows = {row.index for row in recipients.rows_with_missing_data}
+    content_too_long_rows = (
+        {row.index for row in recipients.rows_with_combined_variable_content_too_long}
+        if recipients.template_type == TemplateType.SMS.value
+        else set()
+    )
+    return {
+        "row_count": len(recipients),
+        "error_row_indices": sorted(bad_recipient_rows | missing_data_rows | content_too_long_rows),
+        "bad_recipient_row_count": len(bad_recipient_rows),
+        "missing_data_row_count": len(missing_data_rows),
+        "content_too_long_row_count": len(content_too_long_rows),
+        "duplicate_row_indices": [row.index for row in recipients.rows_with_duplicate_recipients],
+        "count_of_duplicate_recipients": recipients.count_of_unique_duplicate_recipients,
+        "count_of_duplicate_recipient_rows": recipients.count_of_duplicate_recipient_rows,
+        "allowed_to_send_to": recipients.allowed_to_send_to,
+        "sms_parts_to_send": sms_parts_to_send,
+        "is_sms_parts_estimated": is_sms_parts_estimated,
+        "row_offset_index": get_csv_row_offset_index(contents),
+    }
+
+
+def validate_csv(contents, template, prefix=None, show_prefix=True, safelist=None, international_sms=False, max_rows=None):
+    """
+    Validate every row of an uploaded CSV for the `template` dictionary the way the check page
+    does, and summarise it with `summarise_recipient_csv`. This runs in the CSV validation
+    pool, so it only takes and returns things that can be pickled.
+    """
+    if template["template_type"] == TemplateType.SMS.value:
+        template = SMSMessageTemplate(template, prefix=prefix, show_prefix=show_prefix)
+    else:
+        template = PlainTextEmailTemplate(template)
+    recipients = RecipientCSV(
+        contents,
+        template=template,
+        template_type=template.template_type,
+        placeholders=template.placeholders,
+        safelist=safelist,
+        international_sms=international_sms,
+        max_rows=max_rows,
+    )
+    sms_parts_to_send = 0
+    if template.template_type == TemplateType.SMS.value:
+        sms_parts_to_send = SMSFragmentCounter(template).total(row.recipient_and_personalisation for row in recipients.rows)
+    return summarise_recipient_csv(recipients, contents, sms_parts_to_send)
+
+
+def get_csv_summary_rows_shown_end(summary, preview_row_index, max_initial_rows_shown, max_errors_shown):
+    """
+    Get the byte offset, in an uploaded CSV with a validation `summary`, of the end of the block
+    of rows holding the last row the check page shows: the first rows with errors, the first
+    rows, and the row being previewed.
+    """
+    error_row_indices = summary["error_row_indices"][:max_errors_shown]
+    last_row_index = max(error_row_indices[-1] if error_row_indices else -1, max_initial_rows_shown - 1, preview_row_index)
+    last_row_index = min(last_row_index, summary["row_count"] - 1)
+    row_offset_index = summary["row_offset_index"]
+    return row_offset_index[min(last_row_index // CSV_ROW_OFFSET_INDEX_STRIDE + 2, len(row_offset_index) - 1)]
+
+
+class SummarisedRecipientCSV(RecipientCSV):
+    """
+    A `RecipientCSV` for the first rows of an uploaded spreadsheet, which takes what depends
+    on every row of it from the spreadsheet's validation summary.
+    """
+
+    def __init__(self, file_data, summary, **kwargs):
+        super().__init__(file_data, **kwargs)
+        self.summary = summary
+
+    def __len__(self):
+        return self.summary["row_count"]
+
+    @property
+    def allowed_to_send_to(self):
+        return self.summary["allowed_to_send_to"]
+
+
 def get_help_argument():
     return request.args.get("help") if request.args.get("help") in ("1", "2", "3") else None
 
@@ -982,10 +1430,27 @@ def get_limit_reset_time_et() -> dict[str, str]:
     return limit_reset_time_et
 
 
+def run_concurrently(*calls):
+    """
+    Call each of the zero-argument `calls` concurrently and return their results in the
+    same order. Each call runs in a copy of the caller's context, so `current_app`,
+    `request`, `g`, `current_user` and `current_service` work as they do in the view.
+    Under gevent the pool threads are greenlets, so this is cheap for I/O-bound calls.
+
+    The first exception raised by a call is re-raised once every call has finished.
+    """
+    if len(calls) < 2 or not current_app.config["CONCURRENT_FETCH_ENABLED"]:
+        return [call() for call in calls]
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+    return [future.result() for future in futures]
+
+
 @cache.memoize(timeout=5 * 60)
 def get_verified_ses_domains():
     """Query AWS SES for verified domain identities"""
-    ses = boto3.client("ses", region_name="ca-central-1")
+    ses = get_aws_client("ses", region_name="ca-central-1")
 
     # Get all identities
     identities = ses.list_identities(
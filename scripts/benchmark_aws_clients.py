@@ -0,0 +1,42 @@
+"""
+Compare the overhead of building a boto3 S3 or SES client for every call, as the s3_client
+modules used to, against reusing the worker's shared ones from app.aws_clients.
+No AWS calls are made.
+
+    poetry run python -m scripts.benchmark_aws_clients [number of calls]
+"""
+
+import sys
+import time
+
+import boto3
+from app.aws_clients import get_aws_client
+from app.config import Config
+from flask import Flask
+
+
+def time_calls(number_of_calls, call):
+    start = time.perf_counter()
+    for _ in range(number_of_calls):
+        call()
+    return (time.perf_counter() - start) / number_of_calls
+
+
+def main(number_of_calls):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+
+    with app.app_context():
+        results = {
+            "boto3.client('s3')": time_calls(number_of_calls, lambda: boto3.client("s3", region_name="ca-central-1")),
+            "get_aws_client('s3')": time_calls(number_of_calls, lambda: get_aws_client("s3", region_name="ca-central-1")),
+            "boto3.client('ses')": time_calls(number_of_calls, lambda: boto3.client("ses", region_name="ca-central-1")),
+            "get_aws_client('ses')": time_calls(number_of_calls, lambda: get_aws_client("ses", region_name="ca-central-1")),
+        }
+
+    for name, seconds in results.items():
+        print(f"{name}: {seconds * 1000:.3f}ms per call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
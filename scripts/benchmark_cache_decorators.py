@@ -0,0 +1,86 @@
+"""
+Compare building cache keys for the API client decorators by inspecting the decorated method's
+signature on every call, as cache.py used to, against the key makers it now builds once when
+decorating. Then compare reading a large cached template list stored as plain JSON against one
+stored compressed, and how much smaller the compressed one is. No Redis calls are made.
+
+    poetry run python -m scripts.benchmark_cache_decorators [number of calls]
+"""
+
+import sys
+import time
+from inspect import signature
+
+from app.notify_client.cache import CacheSerializer, _key_maker
+
+KEY_FORMAT = "service-{service_id}-template-{template_id}-version-{version}"
+
+
+def get_service_template(self, service_id, template_id, version=None):
+    pass
+
+
+def make_key_by_inspecting_the_signature(args, kwargs):
+    parameters = list(signature(get_service_template).parameters)
+
+    def get_argument(argument_name):
+        if argument_name in kwargs:
+            return kwargs[argument_name]
+        if 0 <= parameters.index(argument_name) - 1 < len(args):
+            return args[parameters.index(argument_name) - 1]
+        return signature(get_service_template).parameters[argument_name].default
+
+    return KEY_FORMAT.format(**{argument_name: get_argument(argument_name) for argument_name in parameters[1:]})
+
+
+def large_service_templates(count=500):
+    return {
+        "data": [
+            {
+                "id": f"{i:08}-0000-0000-0000-000000000000",
+                "name": f"Template {i}",
+                "template_type": "email",
+                "subject": "Your application ((reference)) has been received",
+                "content": "Hello ((name)),\n\nWe received your application on ((date)). " * 5,
+                "folder": None,
+                "archived": False,
+                "version": 3,
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def time_calls(number_of_calls, call):
+    start = time.perf_counter()
+    for _ in range(number_of_calls):
+        call()
+    return (time.perf_counter() - start) / number_of_calls
+
+
+def main(number_of_calls):
+    make_key = _key_maker(KEY_FORMAT, get_service_template)
+    args, kwargs = ("1234", "5678"), {"version": 2}
+    assert make_key(args, kwargs) == make_key_by_inspecting_the_signature(args, kwargs)
+
+    results = {
+        "inspecting the signature": time_calls(number_of_calls, lambda: make_key_by_inspecting_the_signature(args, kwargs)),
+        "precomputed key maker": time_calls(number_of_calls, lambda: make_key(args, kwargs)),
+    }
+
+    for name, seconds in results.items():
+        print(f"{name}: {seconds * 1_000_000:.2f}µs per key")
+
+    cache_serializer = CacheSerializer()
+    plain = cache_serializer.dumps(large_service_templates()).encode("utf-8")
+    cache_serializer.compression_threshold = 16_384
+    compressed = cache_serializer.dumps(large_service_templates())
+    number_of_hits = max(number_of_calls // 1_000, 1)
+
+    for name, serialized in {"plain JSON": plain, "compressed": compressed}.items():
+        seconds = time_calls(number_of_hits, lambda: cache_serializer.loads(serialized))
+        print(f"{name}: {len(serialized):,} bytes, {seconds * 1000:.3f}ms per hit")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,62 @@
+"""
+Compare counting the SMS parts for a large spreadsheet with SMSFragmentCounter against
+rendering the template once per row.
+
+    poetry run python -m scripts.benchmark_sms_fragment_counts [number of rows]
+"""
+
+import random
+import string
+import sys
+import time
+
+from app.utils import SMSFragmentCounter
+from notifications_utils.template import SMSPreviewTemplate
+
+CONTENT = "Hello ((name)), your appointment is on ((date)) at ((clinic)). Reply STOP to opt out."
+
+
+def make_rows(number_of_rows):
+    names = ["".join(random.choices(string.ascii_letters, k=random.randint(2, 40))) for _ in range(500)]
+    names += ["Hélène", "François", "Zoë", "Łukasz"]
+    clinics = ["Ottawa General", "Montréal – Centre", "St. John's Health", "Clinic #4 [West]"]
+    return [
+        {
+            "phone number": "6502532222",
+            "name": random.choice(names),
+            "date": f"2026-{random.randint(1, 12):02}-{random.randint(1, 28):02}",
+            "clinic": random.choice(clinics),
+        }
+        for _ in range(number_of_rows)
+    ]
+
+
+def render_every_row(template, rows):
+    total = 0
+    for row in rows:
+        template.values = row
+        total += template.fragment_count
+    return total
+
+
+def main(number_of_rows):
+    template = SMSPreviewTemplate({"content": CONTENT, "template_type": "sms"}, prefix="Service name", show_prefix=True)
+    rows = make_rows(number_of_rows)
+
+    start = time.perf_counter()
+    counted = SMSFragmentCounter(template).total(rows)
+    counter_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rendered = render_every_row(template, rows)
+    render_time = time.perf_counter() - start
+
+    print(f"{number_of_rows} rows, {counted} parts")
+    print(f"SMSFragmentCounter: {counter_time:.3f}s")
+    print(f"rendering each row: {render_time:.3f}s")
+    if counted != rendered:
+        sys.exit(f"Counts differ: {counted} counted, {rendered} rendered")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
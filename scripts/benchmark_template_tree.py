@@ -0,0 +1,106 @@
+"""
+Compare walking the template folder tree of a large synthetic service, as the choose template
+page does, using linear scans of every template and folder (as Service used to) against the
+indexes and memoised folder visibility Service now builds once per request. No API calls are made.
+
+    poetry run python -m scripts.benchmark_template_tree [number of templates] [number of folders]
+"""
+
+import random
+import sys
+import time
+import uuid
+
+from app.models.service import Service
+
+TEMPLATE_TYPES = ("email", "sms")
+
+
+def make_service(templates, folders):
+    service = Service({"id": str(uuid.uuid4()), "permissions": list(TEMPLATE_TYPES)})
+    service.__dict__["all_templates"] = templates
+    service.__dict__["all_template_folders"] = folders
+    return service
+
+
+def make_tree(number_of_templates, number_of_folders):
+    random.seed(0)
+    folders = []
+    for i in range(number_of_folders):
+        parent = random.choice(folders) if folders and random.random() < 0.8 else None
+        folders.append({"id": str(uuid.uuid4()), "name": f"Folder {i}", "parent_id": parent and parent["id"]})
+    templates = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Template {i}",
+            "template_type": random.choice(TEMPLATE_TYPES),
+            "folder": random.choice([None] + folders)["id"] if folders else None,
+        }
+        for i in range(number_of_templates)
+    ]
+    return templates, folders
+
+
+def linear_get_templates(service, template_type, template_folder_id):
+    return [
+        template
+        for template in service.all_templates
+        if template["template_type"] == template_type and template.get("folder") == template_folder_id
+    ]
+
+
+def linear_get_template_folders(service, template_type, parent_folder_id):
+    return [
+        folder
+        for folder in service.all_template_folders
+        if folder["parent_id"] == parent_folder_id and linear_is_folder_visible(service, folder["id"], template_type)
+    ]
+
+
+def linear_is_folder_visible(service, template_folder_id, template_type):
+    return bool(linear_get_templates(service, template_type, template_folder_id)) or any(
+        linear_is_folder_visible(service, child_folder["id"], template_type)
+        for child_folder in linear_get_template_folders(service, template_type, template_folder_id)
+    )
+
+
+def walk_tree(get_template_folders, get_templates, template_type):
+    folder_ids = [None]
+    while folder_ids:
+        folder_id = folder_ids.pop()
+        get_templates(template_type, folder_id)
+        folder_ids.extend(folder["id"] for folder in get_template_folders(template_type, folder_id))
+
+
+def time_call(call, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        call()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(number_of_templates, number_of_folders):
+    templates, folders = make_tree(number_of_templates, number_of_folders)
+
+    def linear():
+        service = make_service(templates, folders)
+        walk_tree(
+            lambda template_type, folder_id: linear_get_template_folders(service, template_type, folder_id),
+            lambda template_type, folder_id: linear_get_templates(service, template_type, folder_id),
+            "email",
+        )
+
+    def indexed():
+        service = make_service(templates, folders)
+        walk_tree(service.get_template_folders, service.get_templates, "email")
+
+    print(f"{number_of_templates} templates in {number_of_folders} folders")
+    for name, call in {"linear scans": linear, "indexed": indexed}.items():
+        print(f"{name}: {time_call(call) * 1000:.1f}ms to walk the email templates")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
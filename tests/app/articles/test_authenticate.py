@@ -1,7 +1,25 @@
+import base64
+import json
+import time
+
+import pytest
 import requests_mock
 from flask import current_app
 
-from app.articles import api
+from app.articles import GC_ARTICLES_AUTH_TOKEN_CACHE_KEY, api
+from tests import MockRedis
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    api._token_cache.clear()
+    yield
+    api._token_cache.clear()
+
+
+def _jwt(expires_at):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expires_at}).encode("utf-8")).decode("utf-8").rstrip("=")
+    return f"header.{payload}.signature"
 
 
 def test_authenticate_success(app_, mocker):
@@ -53,3 +71,63 @@ def test_authenticate_bad_credentials(app_, mocker):
             assert token is None
             assert mock.called
             assert mock.request_history[0].url == endpoint
+
+
+def _mock_auth_endpoint(mock, base_endpoint, token):
+    mock.request("POST", f"https://{base_endpoint}{api.GC_ARTICLES_AUTH_API_ENDPOINT}", json={"token": token})
+
+
+def test_authenticate_reuses_the_token_without_validating_it(app_, mocker):
+    mock_validate_token = mocker.patch("app.articles.api.validate_token")
+    token = _jwt(int(time.time()) + 3600)
+    with app_.app_context():
+        base_endpoint = current_app.config["GC_ARTICLES_API"]
+        with requests_mock.mock() as mock:
+            _mock_auth_endpoint(mock, base_endpoint, token)
+
+            assert api.authenticate("user", "password", base_endpoint) == token
+            assert api.authenticate("user", "password", base_endpoint) == token
+            assert mock.call_count == 1
+
+    assert not mock_validate_token.called
+
+
+def test_authenticate_gets_a_new_token_when_the_cached_one_is_about_to_expire(app_, mocker):
+    old_token = _jwt(int(time.time()) + 60)
+    new_token = _jwt(int(time.time()) + 3600)
+    with app_.app_context():
+        base_endpoint = current_app.config["GC_ARTICLES_API"]
+        with requests_mock.mock() as mock:
+            _mock_auth_endpoint(mock, base_endpoint, old_token)
+            assert api.authenticate("user", "password", base_endpoint) == old_token
+
+            _mock_auth_endpoint(mock, base_endpoint, new_token)
+            assert api.authenticate("user", "password", base_endpoint) == new_token
+            assert mock.call_count == 2
+
+
+def test_authenticate_uses_a_token_cached_in_redis_by_another_worker(app_, mocker):
+    token = _jwt(int(time.time()) + 3600)
+    with app_.app_context():
+        base_endpoint = current_app.config["GC_ARTICLES_API"]
+        mock_redis = mocker.patch("app.articles.api.redis_client", MockRedis({}))
+        with requests_mock.mock() as mock:
+            _mock_auth_endpoint(mock, base_endpoint, token)
+            api.authenticate("user", "password", base_endpoint)
+        assert json.loads(mock_redis.get(GC_ARTICLES_AUTH_TOKEN_CACHE_KEY))["token"] == token
+
+        api._token_cache.clear()
+        with requests_mock.mock() as mock:
+            assert api.authenticate("user", "password", base_endpoint) == token
+            assert not mock.called
+
+
+def test_authenticate_replaces_a_token_cached_without_its_expiry(app_, mocker):
+    token = _jwt(int(time.time()) + 3600)
+    mocker.patch("app.articles.api.redis_client", MockRedis({GC_ARTICLES_AUTH_TOKEN_CACHE_KEY: "old-token"}))
+    with app_.app_context():
+        base_endpoint = current_app.config["GC_ARTICLES_API"]
+        with requests_mock.mock() as mock:
+            _mock_auth_endpoint(mock, base_endpoint, token)
+
+            assert api.authenticate("user", "password", base_endpoint) == token
@@ -1,12 +1,28 @@
 import json
-from unittest.mock import MagicMock, Mock, call
+import time
+from unittest.mock import ANY, MagicMock, Mock, call
 
 import pytest
 import requests
 import requests_mock
-from app.articles.pages import get_page_by_slug_with_cache
+from app.articles.pages import (
+    _refresh_page,
+    _refresh_slug_index,
+    cache_page_by_slug,
+    get_page_by_slug_with_cache,
+    get_slug_index,
+    is_unknown_page,
+    set_missing_page,
+)
 
-from app.articles import GC_ARTICLES_CACHE_PREFIX, GC_ARTICLES_FALLBACK_CACHE_PREFIX
+from app.articles import (
+    GC_ARTICLES_CACHE_PREFIX,
+    GC_ARTICLES_FALLBACK_CACHE_PREFIX,
+    GC_ARTICLES_FRESH_CACHE_TTL,
+    GC_ARTICLES_MISSING_PAGE_CACHE_TTL,
+    GC_ARTICLES_REFRESH_LOCK_TTL,
+    GC_ARTICLES_SLUG_INDEX_FRESH_TTL,
+)
 from tests import MockRedis
 
 gc_articles_api = "articles.alpha.canada.ca/notification-gc-notify"
@@ -107,6 +123,204 @@ def test_bad_slug_doesnt_save_empty_cache_entry(app_, mocker):
             assert not mock_redis_method.set.called
 
 
+def test_get_page_by_slug_with_cache_does_not_refresh_fresh_pages(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.return_value = json.dumps({"response": response_json, "fetched_at": time.time()})
+    mock_thread = mocker.patch("app.articles.pages.threading.Thread")
+
+    with app_.test_request_context():
+        assert get_page_by_slug_with_cache(endpoint, params) == response_json
+
+    assert not mock_redis.set.called
+    assert not mock_thread.called
+
+
+@pytest.mark.parametrize(
+    "cached",
+    [
+        {"response": response_json, "fetched_at": time.time() - GC_ARTICLES_FRESH_CACHE_TTL},
+        response_json,
+    ],
+)
+def test_get_page_by_slug_with_cache_returns_stale_pages_and_refreshes_them_in_the_background(app_, mocker, cached):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.return_value = json.dumps(cached)
+    mock_redis.set.return_value = True
+    mock_thread = mocker.patch("app.articles.pages.threading.Thread")
+
+    with app_.test_request_context():
+        with requests_mock.mock() as request_mock:
+            assert get_page_by_slug_with_cache(endpoint, params) == response_json
+            assert not request_mock.called
+
+    mock_redis.set.assert_called_once_with(f"{cache_key}-refresh-lock", "1", ex=GC_ARTICLES_REFRESH_LOCK_TTL, nx=True)
+    mock_thread.assert_called_once_with(
+        target=_refresh_page,
+        args=(app_, endpoint, params, cache_key, f"{cache_key}-refresh-lock"),
+        daemon=True,
+    )
+    mock_thread.return_value.start.assert_called_once_with()
+
+
+def test_get_page_by_slug_with_cache_leaves_refreshing_to_whoever_holds_the_lock(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.return_value = json.dumps({"response": response_json, "fetched_at": 0})
+    mock_redis.set.return_value = None
+    mock_thread = mocker.patch("app.articles.pages.threading.Thread")
+
+    with app_.test_request_context():
+        assert get_page_by_slug_with_cache(endpoint, params) == response_json
+
+    assert not mock_thread.called
+
+
+def test_refresh_page_saves_the_page_and_releases_the_lock(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mocker.patch("app.articles.api.redis_client")
+
+    with app_.app_context():
+        mocker.patch.dict("app.current_app.config", values={"GC_ARTICLES_API": gc_articles_api})
+        with requests_mock.mock() as request_mock:
+            request_mock.get(request_url, json=response_json, status_code=200)
+
+            _refresh_page(app_, endpoint, params, cache_key, "lock")
+
+            assert request_mock.last_request.qs == {"slug": ["mypage"], "lang": ["en"]}
+
+    mock_redis.set.assert_called_once_with(cache_key, ANY, ex=ANY)
+    assert json.loads(mock_redis.set.call_args[0][1])["response"] == response_json
+    mock_redis.delete.assert_called_once_with("lock")
+
+
+def test_refresh_page_releases_the_lock_if_gc_articles_is_down(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_api_redis = mocker.patch("app.articles.api.redis_client")
+    mock_api_redis.get.return_value = None
+
+    with app_.app_context():
+        with requests_mock.mock() as request_mock:
+            request_mock.get(request_url, exc=requests.exceptions.ConnectionError)
+
+            _refresh_page(app_, endpoint, params, cache_key, "lock")
+
+    assert not mock_redis.set.called
+    mock_redis.delete.assert_called_once_with("lock")
+
+
+def _slug_index_entry(slugs, fetched_at=None):
+    return json.dumps({"slugs": slugs, "fetched_at": time.time() if fetched_at is None else fetched_at})
+
+
+@pytest.mark.parametrize(
+    "slug, expected_unknown",
+    [
+        ("features", False),
+        ("fonctionnalites", False),
+        ("Features", False),
+        ("wp-login.php", True),
+        ("features/../../etc/passwd", True),
+    ],
+)
+def test_is_unknown_page_checks_the_slug_index_for_every_language(app_, mocker, slug, expected_unknown):
+    redis_cache = {
+        f"{GC_ARTICLES_CACHE_PREFIX}slug-index/en": _slug_index_entry(["home", "features"]),
+        f"{GC_ARTICLES_CACHE_PREFIX}slug-index/fr": _slug_index_entry(["accueil", "fonctionnalites"]),
+    }
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.side_effect = MockRedis(redis_cache).get
+    mock_thread = mocker.patch("app.articles.pages.threading.Thread")
+
+    with app_.test_request_context():
+        assert is_unknown_page(endpoint, slug) is expected_unknown
+
+    assert not mock_thread.called
+
+
+@pytest.mark.parametrize("lang", ["en", "fr"])
+def test_is_unknown_page_is_false_for_cached_pages_missing_from_the_slug_index(app_, mocker, lang):
+    redis_cache = {
+        f"{GC_ARTICLES_CACHE_PREFIX}slug-index/en": _slug_index_entry(["home"]),
+        f"{GC_ARTICLES_CACHE_PREFIX}slug-index/fr": _slug_index_entry(["accueil"]),
+        f"{GC_ARTICLES_CACHE_PREFIX}{endpoint}/{lang}/new-page": response_json,
+    }
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.side_effect = MockRedis(redis_cache).get
+
+    with app_.test_request_context():
+        assert is_unknown_page(endpoint, "new-page") is False
+
+
+def test_is_unknown_page_remembers_missing_pages(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.side_effect = MockRedis({}).get
+
+    with app_.test_request_context():
+        set_missing_page("nope")
+        mock_redis.set.assert_called_once_with(
+            f"{GC_ARTICLES_CACHE_PREFIX}missing/nope", "1", ex=GC_ARTICLES_MISSING_PAGE_CACHE_TTL
+        )
+
+        mock_redis.get.side_effect = MockRedis({f"{GC_ARTICLES_CACHE_PREFIX}missing/nope": "1"}).get
+        assert is_unknown_page(endpoint, "nope") is True
+
+
+def test_is_unknown_page_asks_gc_articles_until_the_slug_index_is_built(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.side_effect = MockRedis({}).get
+    mock_redis.set.return_value = True
+    mock_thread = mocker.patch("app.articles.pages.threading.Thread")
+
+    with app_.test_request_context():
+        assert is_unknown_page(endpoint, "features") is False
+
+    assert [kwargs["args"][1] for _args, kwargs in mock_thread.call_args_list] == ["en", "fr"]
+    assert all(kwargs["target"] == _refresh_slug_index for _args, kwargs in mock_thread.call_args_list)
+
+
+def test_get_slug_index_refreshes_a_stale_index_in_the_background(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mock_redis.get.return_value = _slug_index_entry(["home"], fetched_at=time.time() - GC_ARTICLES_SLUG_INDEX_FRESH_TTL)
+    mock_redis.set.return_value = True
+    mock_thread = mocker.patch("app.articles.pages.threading.Thread")
+
+    with app_.test_request_context():
+        assert get_slug_index("en") == {"home"}
+
+    lock_key = f"{GC_ARTICLES_CACHE_PREFIX}slug-index/en-refresh-lock"
+    mock_thread.assert_called_once_with(target=_refresh_slug_index, args=(app_, "en", lock_key), daemon=True)
+
+
+@pytest.mark.parametrize("slugs", [["home", "features"], None])
+def test_refresh_slug_index_saves_the_slugs_and_releases_the_lock(app_, mocker, slugs):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mocker.patch("app.articles.pages.get_page_slugs", return_value=slugs)
+
+    _refresh_slug_index(app_, "en", "lock")
+
+    if slugs:
+        mock_redis.set.assert_called_once_with(f"{GC_ARTICLES_CACHE_PREFIX}slug-index/en", ANY, ex=ANY)
+        assert json.loads(mock_redis.set.call_args[0][1])["slugs"] == slugs
+    else:
+        assert not mock_redis.set.called
+    mock_redis.delete.assert_called_once_with("lock")
+
+
+def test_cache_page_by_slug_replaces_the_cached_page(app_, mocker):
+    mock_redis = mocker.patch("app.articles.pages.redis_client")
+    mocker.patch("app.articles.api.redis_client")
+
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"GC_ARTICLES_API": gc_articles_api})
+        with requests_mock.mock() as request_mock:
+            request_mock.get(request_url, json=response_json, status_code=200)
+
+            assert cache_page_by_slug(endpoint, "mypage", "en") is True
+
+    assert not mock_redis.get.called
+    mock_redis.set.assert_called_once_with(cache_key, ANY, ex=ANY)
+    assert json.loads(mock_redis.set.call_args[0][1])["response"] == response_json
+
+
 @pytest.mark.parametrize(
     "url", ["/a11y", "/why-notify", "/personalise", "/format", "/messages-status", "/pourquoi-gc-notification"]
 )
@@ -1,6 +1,6 @@
 import pytest
 import requests_mock
-from app.articles.api import _get_headers, get_content
+from app.articles.api import _get_headers, get_content, get_page_slugs
 from werkzeug.exceptions import Forbidden
 
 gc_articles_api = "articles.alpha.canada.ca/notification-gc-notify"
@@ -55,6 +55,27 @@ def test_get_content_403(app_, mocker, capsys):
             assert "403 Forbidden" in str(exception.value)
 
 
+@pytest.mark.parametrize(
+    "status_code, response_json, expected_response",
+    [
+        (200, [], "no page"),
+        (404, {"code": "rest_no_route"}, None),
+        (500, [], None),
+    ],
+)
+def test_get_content_only_returns_the_empty_result_when_gc_articles_found_nothing(
+    app_, mocker, status_code, response_json, expected_response
+):
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"GC_ARTICLES_API": gc_articles_api})
+        with requests_mock.mock() as mock:
+            mock.request("GET", notify_url, json=response_json, status_code=status_code)
+
+            assert get_content("pages", {"slug": "mypage", "lang": "en"}, cacheable=False, empty_result="no page") == (
+                expected_response
+            )
+
+
 class TestGetHeaders:
     def test_waf_rate_bypass_header_included_when_secret_set(self, app_, mocker):
         with app_.test_request_context():
@@ -84,3 +105,77 @@ class TestGetHeaders:
             headers = _get_headers(auth_required=True)
             assert headers["waf-rate-bypass"] == "some-secret"
             assert headers["Authorization"] == "Bearer some-token"
+
+
+def test_get_page_slugs_lists_every_page_of_results(app_, mocker):
+    pages_url = f"https://{gc_articles_api}/wp-json/wp/v2/pages"
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"GC_ARTICLES_API": gc_articles_api})
+        with requests_mock.mock() as mock:
+            mock.get(
+                pages_url,
+                [
+                    {"json": [{"slug": "home"}, {"slug": "features"}], "headers": {"X-WP-TotalPages": "2"}},
+                    {"json": [{"slug": "security"}], "headers": {"X-WP-TotalPages": "2"}},
+                ],
+            )
+
+            assert get_page_slugs("en") == ["home", "features", "security"]
+            assert [request.qs["page"] for request in mock.request_history] == [["1"], ["2"]]
+            assert mock.request_history[0].qs["lang"] == ["en"]
+            assert mock.request_history[0].qs["_fields"] == ["slug"]
+
+
+@pytest.mark.parametrize(
+    "responses",
+    [
+        [{"json": {}, "status_code": 500}],
+        [
+            {"json": [{"slug": "home"}], "headers": {"X-WP-TotalPages": "2"}},
+            {"json": {}, "status_code": 503},
+        ],
+    ],
+)
+def test_get_page_slugs_returns_none_if_any_page_fails(app_, mocker, responses):
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"GC_ARTICLES_API": gc_articles_api})
+        with requests_mock.mock() as mock:
+            mock.get(f"https://{gc_articles_api}/wp-json/wp/v2/pages", responses)
+
+            assert get_page_slugs("en") is None
+
+
+@pytest.mark.parametrize("status_code", [401, 403])
+def test_get_content_gets_a_new_token_if_the_cached_one_is_rejected(app_, mocker, status_code):
+    mocker.patch("app.articles.api.authenticate", side_effect=["old-token", "new-token"])
+    mock_validate_token = mocker.patch("app.articles.api.validate_token", return_value=False)
+    mock_redis = mocker.patch("app.articles.api.redis_client")
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"GC_ARTICLES_API": gc_articles_api})
+        with requests_mock.mock() as mock:
+            mock.get(
+                notify_url,
+                [{"json": {}, "status_code": status_code}, {"json": {"title": "Draft"}, "status_code": 200}],
+            )
+
+            assert get_content("pages", auth_required=True, cacheable=False) == {"title": "Draft"}
+            assert [request.headers["Authorization"] for request in mock.request_history] == [
+                "Bearer old-token",
+                "Bearer new-token",
+            ]
+
+    mock_validate_token.assert_called_once_with("old-token")
+    mock_redis.delete.assert_called_once()
+
+
+def test_get_content_does_not_retry_if_the_token_is_still_valid(app_, mocker):
+    mocker.patch("app.articles.api.authenticate", return_value="token")
+    mocker.patch("app.articles.api.validate_token", return_value=True)
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"GC_ARTICLES_API": gc_articles_api})
+        with requests_mock.mock() as mock:
+            mock.get(notify_url, json={}, status_code=403)
+
+            with pytest.raises(Forbidden):
+                get_content("pages", auth_required=True, cacheable=False)
+            assert mock.call_count == 1
@@ -1,4 +1,5 @@
 import pytest
+from app.articles.pages import NO_PAGE
 from bs4 import BeautifulSoup
 from flask import Response, url_for
 from flask_wtf.csrf import CSRFError
@@ -12,6 +13,50 @@ def test_bad_url_returns_page_not_found(client, mock_GCA_404):
     assert page.h1.string.strip() == "Page could not be found"
 
 
+def test_unknown_page_returns_page_not_found_without_asking_gc_articles(client, mock_GCA_404, mocker):
+    mocker.patch("app.main.views.index.is_unknown_page", return_value=True)
+    mock_get_page = mocker.patch("app.main.views.index.get_page_by_slug_with_cache")
+
+    response = client.get("/wp-login.php")
+
+    assert response.status_code == 404
+    assert not mock_get_page.called
+
+
+def test_bad_url_is_remembered_as_missing(client, mock_GCA_404, mocker):
+    mocker.patch("app.main.views.index.is_unknown_page", return_value=False)
+    mocker.patch("app.main.views.index.get_page_by_slug_with_cache", return_value=NO_PAGE)
+    mocker.patch("app.main.views.index.get_page_by_slug", return_value=NO_PAGE)
+    mock_set_missing_page = mocker.patch("app.main.views.index.set_missing_page")
+
+    response = client.get("/bad_url")
+
+    assert response.status_code == 404
+    mock_set_missing_page.assert_called_once_with("bad_url")
+
+
+@pytest.mark.parametrize(
+    "current_language_response, other_language_response",
+    [
+        (None, None),
+        (None, NO_PAGE),
+        (NO_PAGE, None),
+    ],
+)
+def test_bad_url_isnt_remembered_as_missing_if_gc_articles_didnt_answer(
+    client, mock_GCA_404, mocker, current_language_response, other_language_response
+):
+    mocker.patch("app.main.views.index.is_unknown_page", return_value=False)
+    mocker.patch("app.main.views.index.get_page_by_slug_with_cache", return_value=current_language_response)
+    mocker.patch("app.main.views.index.get_page_by_slug", return_value=other_language_response)
+    mock_set_missing_page = mocker.patch("app.main.views.index.set_missing_page")
+
+    response = client.get("/bad_url")
+
+    assert response.status_code == 404
+    assert not mock_set_missing_page.called
+
+
 def test_load_service_before_request_handles_404(client_request, mocker):
     exc = HTTPError(Response(status=404), "Not found")
     get_service = mocker.patch("app.service_api_client.get_service", side_effect=exc)
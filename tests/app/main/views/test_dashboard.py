@@ -1,4 +1,5 @@
 import copy
+import json
 import re
 from unittest.mock import ANY
 
@@ -13,6 +14,7 @@ from app.main.views.dashboard import (
     get_dashboard_totals,
     get_free_paid_breakdown_for_billable_units,
 )
+from app.notify_client.cache import RELEASE_LOCK_SCRIPT
 from bs4 import BeautifulSoup
 from flask import url_for
 from freezegun import freeze_time
@@ -2281,3 +2283,88 @@ class TestGetAnnualDataWithBillableUnits:
                     mock_service_api_client.get_monthly_notification_stats.assert_called_once_with(mock_service_id, 2023)
             # Result should still be returned from API fallback
             assert result == {"sms": 40, "email": 60}
+
+
+def test_service_dashboard_updates_returns_not_modified_for_matching_etag(client_request, mocker):
+    mocker.patch("app.main.views.dashboard.get_dashboard_partials", return_value={"jobs": "<p>jobs</p>", "debug_timings": {}})
+
+    response = client_request.get("main.service_dashboard_updates", service_id=SERVICE_ONE_ID, _return_response=True)
+    etag = response.headers["ETag"]
+    assert response.get_json() == {"jobs": "<p>jobs</p>", "debug_timings": {}}
+
+    response = client_request.get(
+        "main.service_dashboard_updates",
+        service_id=SERVICE_ONE_ID,
+        _expected_status=304,
+        _return_response=True,
+        _headers={"If-None-Match": etag},
+    )
+    assert response.data == b""
+
+
+def test_service_dashboard_updates_uses_shared_cache(app_, client_request, mocker):
+    mock_get_partials = mocker.patch("app.main.views.dashboard.get_dashboard_partials")
+    mock_redis_get = mocker.patch(
+        "app.main.views.dashboard.redis_client.get",
+        return_value=b'{"etag": "abc", "partials": {"jobs": "<p>cached</p>"}}',
+    )
+
+    with set_config(app_, "REDIS_ENABLED", True):
+        response = client_request.get("main.service_dashboard_updates", service_id=SERVICE_ONE_ID, _return_response=True)
+
+    assert response.get_json() == {"jobs": "<p>cached</p>"}
+    assert response.headers["ETag"] == '"abc"'
+    assert mock_redis_get.call_args[0][0].startswith(f"dashboard-partials-{SERVICE_ONE_ID}-en-")
+    assert not mock_get_partials.called
+
+
+def test_service_dashboard_updates_computes_and_caches_partials_when_holding_the_lock(app_, client_request, mocker):
+    mocker.patch("app.main.views.dashboard.get_dashboard_partials", return_value={"jobs": "<p>fresh</p>"})
+    mocker.patch("app.main.views.dashboard.redis_client.get", return_value=None)
+    mock_redis_store = mocker.patch("app.main.views.dashboard.redis_client.redis_store")
+    mock_redis_store.set.return_value = True
+    mock_redis_set = mocker.patch("app.main.views.dashboard.redis_client.set")
+
+    with set_config(app_, "REDIS_ENABLED", True):
+        response = client_request.get("main.service_dashboard_updates", service_id=SERVICE_ONE_ID, _return_response=True)
+
+    assert response.get_json() == {"jobs": "<p>fresh</p>"}
+    (lock_key, lock_token), lock_kwargs = mock_redis_store.set.call_args
+    (cache_key, cached_value), cache_kwargs = mock_redis_set.call_args
+    assert lock_key == f"{cache_key}-lock"
+    assert lock_kwargs == {"ex": 3, "nx": True}
+    assert cache_kwargs == {"ex": 5}
+    assert json.loads(cached_value)["partials"] == {"jobs": "<p>fresh</p>"}
+    mock_redis_store.eval.assert_called_once_with(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+
+
+def test_service_dashboard_updates_waits_for_another_worker(app_, client_request, mocker):
+    mock_get_partials = mocker.patch("app.main.views.dashboard.get_dashboard_partials")
+    mocker.patch(
+        "app.main.views.dashboard.redis_client.get",
+        side_effect=[None, None, b'{"etag": "abc", "partials": {"jobs": "<p>theirs</p>"}}'],
+    )
+    mock_redis_store = mocker.patch("app.main.views.dashboard.redis_client.redis_store")
+    mock_redis_store.set.return_value = None
+    mocker.patch("app.main.views.dashboard.time.sleep")
+
+    with set_config(app_, "REDIS_ENABLED", True):
+        response = client_request.get("main.service_dashboard_updates", service_id=SERVICE_ONE_ID, _return_response=True)
+
+    assert response.get_json() == {"jobs": "<p>theirs</p>"}
+    assert not mock_get_partials.called
+
+
+def test_service_dashboard_updates_does_not_wait_for_the_lock_if_redis_is_failing(app_, client_request, mocker):
+    mocker.patch("app.main.views.dashboard.get_dashboard_partials", return_value={"jobs": "<p>fresh</p>"})
+    mocker.patch("app.main.views.dashboard.redis_client.get", return_value=None)
+    mock_redis_store = mocker.patch("app.main.views.dashboard.redis_client.redis_store")
+    mock_redis_store.set.side_effect = ConnectionError("Redis is down")
+    mock_sleep = mocker.patch("app.main.views.dashboard.time.sleep")
+
+    with set_config(app_, "REDIS_ENABLED", True):
+        response = client_request.get("main.service_dashboard_updates", service_id=SERVICE_ONE_ID, _return_response=True)
+
+    assert response.get_json() == {"jobs": "<p>fresh</p>"}
+    assert not mock_sleep.called
+    assert not mock_redis_store.eval.called
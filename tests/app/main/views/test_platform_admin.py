@@ -989,7 +989,7 @@ def test_letter_validation_preview_doesnt_call_template_preview_when_file_doesnt
 
 
 def test_clear_cache_shows_form(client_request, platform_admin_user, mocker):
-    redis = mocker.patch("app.main.views.platform_admin.redis_client")
+    mock_delete_by_pattern = mocker.patch("app.extensions.RedisClient.delete_cache_keys_by_pattern")
     client_request.login(platform_admin_user)
 
     page = client_request.get("main.clear_cache")
@@ -1001,7 +1001,7 @@ def test_clear_cache_shows_form(client_request, platform_admin_user, mocker):
     assert page.select("input[type=radio]")[4]["value"] == "email_branding"
     assert page.select("input[type=radio]")[5]["value"] == "letter_branding"
     assert page.select("input[type=radio]")[6]["value"] == "organisation"
-    assert not redis.delete_cache_keys_by_pattern.called
+    assert not mock_delete_by_pattern.called
 
 
 @pytest.mark.parametrize(
@@ -1035,26 +1035,26 @@ def test_clear_cache_submits_and_tells_you_how_many_things_were_deleted(
     expected_calls,
     expected_confirmation,
 ):
-    redis = mocker.patch("app.main.views.platform_admin.redis_client")
-    redis.delete_cache_keys_by_pattern.side_effect = [0, 3, 1]
+    mock_delete_by_pattern = mocker.patch("app.extensions.RedisClient.delete_cache_keys_by_pattern")
+    mock_delete_by_pattern.side_effect = [0, 3, 1]
     client_request.login(platform_admin_user)
 
     page = client_request.post("main.clear_cache", _data={"model_type": model_type}, _expected_status=200)
 
-    assert redis.delete_cache_keys_by_pattern.call_args_list == expected_calls
+    assert mock_delete_by_pattern.call_args_list == expected_calls
 
     flash_banner = page.find("div", class_="banner-default")
     assert flash_banner.text.strip() == expected_confirmation
 
 
 def test_clear_cache_requires_option(client_request, platform_admin_user, mocker):
-    redis = mocker.patch("app.main.views.platform_admin.redis_client")
+    mock_delete_by_pattern = mocker.patch("app.extensions.RedisClient.delete_cache_keys_by_pattern")
     client_request.login(platform_admin_user)
 
     page = client_request.post("main.clear_cache", _data={}, _expected_status=200)
 
     assert normalize_spaces(page.find("span", class_="error-message").text) == "Error: You need to choose an option"
-    assert not redis.delete_cache_keys_by_pattern.called
+    assert not mock_delete_by_pattern.called
 
 
 def test_reports_page(platform_admin_client):
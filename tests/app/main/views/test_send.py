@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
+import json
 import sys
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from glob import glob
 from io import BytesIO
@@ -11,7 +13,14 @@ from uuid import uuid4
 from zipfile import BadZipFile
 
 import pytest
-from app.main.views.send import daily_email_count, daily_sms_count
+from app.main.views.send import (
+    CSV_VALIDATION_SUMMARY_TTL,
+    csv_row_offset_index_stored_cache_key,
+    csv_validation_summary_cache_key,
+    daily_email_count,
+    daily_sms_count,
+)
+from app.utils import SummarisedRecipientCSV, get_csv_row_offset_index
 from bs4 import BeautifulSoup
 from flask import url_for
 from notifications_python_client.errors import HTTPError
@@ -264,6 +273,39 @@ def test_example_spreadsheet(
     assert normalize_spaces(page.select_one("tbody tr").text) == ("1 phone number name date")
 
 
+def test_upload_big_files_in_chunks(
+    app_,
+    client_request,
+    service_one,
+    mocker,
+    mock_get_service_template,
+    mock_s3_upload,
+    fake_uuid,
+):
+    uploaded = []
+
+    def s3upload_chunks(service_id, chunks, region):
+        uploaded.append(b"".join(chunks))
+        return fake_uuid
+
+    mock_s3_upload_chunks = mocker.patch("app.main.views.send.s3upload_chunks", side_effect=s3upload_chunks)
+    file_contents = "phone number\r\n" + "\r\n".join(["6502532222"] * 100)
+
+    with set_config(app_, "CSV_UPLOAD_STREAMING_MIN_SIZE", 1000):
+        client_request.post(
+            "main.send_messages",
+            service_id=service_one["id"],
+            template_id=fake_uuid,
+            _data={"file": (BytesIO(file_contents.encode("utf-8")), "example.csv")},
+            _content_type="multipart/form-data",
+            _expected_status=302,
+        )
+
+    assert not mock_s3_upload.called
+    assert mock_s3_upload_chunks.call_args[0][0] == service_one["id"]
+    assert uploaded == [file_contents.encode("utf-8")]
+
+
 @pytest.mark.parametrize(
     "filename, acceptable_file, expected_status",
     list(zip(test_spreadsheet_files, repeat(True), repeat(302)))
@@ -628,6 +670,25 @@ def test_upload_valid_csv_redirects_to_check_page(
     )
 
 
+def test_upload_valid_csv_doesnt_store_a_row_offset_index(
+    client_request,
+    mock_get_service_template_with_placeholders,
+    mock_s3_upload,
+    mock_s3_upload_row_offset_index,
+    fake_uuid,
+):
+    client_request.post(
+        "main.send_messages",
+        service_id=SERVICE_ONE_ID,
+        template_id=fake_uuid,
+        _data={"file": (BytesIO("phone number,name\r\n6502532222,Jo\r\n".encode("utf-8")), "valid.csv")},
+        _expected_status=302,
+    )
+
+    assert mock_s3_upload.called
+    assert not mock_s3_upload_row_offset_index.called
+
+
 @pytest.mark.parametrize(
     "extra_args, expected_recipient, expected_message",
     [
@@ -3168,6 +3229,438 @@ def test_check_messages_adds_sender_id_in_session_to_metadata(
     )
 
 
+def test_check_messages_saves_a_validation_summary_of_the_upload(
+    client_request,
+    mocker,
+    mock_get_live_service,
+    mock_get_service_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_template_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    mock_s3_set_metadata,
+    mock_s3_upload_row_offset_index,
+    fake_uuid,
+):
+    contents = "phone number\r\n+16502532222\r\n+16502532223\r\n+16502532222"
+    mocker.patch("app.main.views.send.s3download", return_value=contents)
+    mocker.patch("app.main.views.send.redis_client.active", True)
+    mocker.patch("app.main.views.send.redis_client.redis_store").mget.return_value = [None, None, None]
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+
+    with client_request.session_transaction() as session:
+        session["file_uploads"] = {fake_uuid: {"template_id": fake_uuid}}
+
+    client_request.get(
+        "main.check_messages",
+        service_id=SERVICE_ONE_ID,
+        template_id=fake_uuid,
+        upload_id=fake_uuid,
+        _test_page_title=False,
+    )
+
+    (summary_call,) = [
+        call
+        for call in mock_redis_set.call_args_list
+        if call[0][0] == csv_validation_summary_cache_key(SERVICE_ONE_ID, fake_uuid)
+    ]
+    assert summary_call[1] == {"ex": CSV_VALIDATION_SUMMARY_TTL}
+    summary = json.loads(summary_call[0][1])
+    assert summary["template_id"] == fake_uuid
+    assert summary["row_count"] == 3
+    assert summary["error_row_indices"] == []
+    assert summary["duplicate_row_indices"] == [2]
+    assert summary["count_of_duplicate_recipients"] == 1
+    assert summary["sms_parts_to_send"] == 3
+    assert summary["is_sms_parts_estimated"] is False
+    assert summary["row_offset_index"] == get_csv_row_offset_index(contents)
+    mock_s3_upload_row_offset_index.assert_called_once_with(SERVICE_ONE_ID, fake_uuid, get_csv_row_offset_index(contents))
+
+
+def test_check_messages_doesnt_store_a_row_offset_index_thats_already_stored(
+    client_request,
+    mocker,
+    mock_get_live_service,
+    mock_get_service_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_template_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    mock_s3_set_metadata,
+    mock_s3_upload_row_offset_index,
+    fake_uuid,
+):
+    mocker.patch("app.main.views.send.s3download", return_value="phone number\r\n+16502532222")
+    mocker.patch("app.main.views.send.redis_client.active", True)
+    mocker.patch("app.main.views.send.redis_client.redis_store").mget.return_value = [None, None, None]
+    mocker.patch(
+        "app.extensions.RedisClient.get",
+        side_effect=lambda key: b"1" if key == csv_row_offset_index_stored_cache_key(SERVICE_ONE_ID, fake_uuid) else None,
+    )
+    mocker.patch("app.extensions.RedisClient.set")
+
+    with client_request.session_transaction() as session:
+        session["file_uploads"] = {fake_uuid: {"template_id": fake_uuid}}
+
+    client_request.get(
+        "main.check_messages",
+        service_id=SERVICE_ONE_ID,
+        template_id=fake_uuid,
+        upload_id=fake_uuid,
+        _test_page_title=False,
+    )
+
+    assert not mock_s3_upload_row_offset_index.called
+
+
+def test_check_messages_validation_summary_depends_on_the_trial_mode_team(
+    client_request,
+    mocker,
+    mock_get_service_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_template_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    mock_s3_set_metadata,
+    fake_uuid,
+):
+    mocker.patch("app.main.views.send.s3download", return_value="phone number\r\n+16502532222")
+    mock_get_summary = mocker.patch("app.main.views.send.get_csv_validation_summary", return_value=None)
+    get_team = mock_get_users_by_service.side_effect
+
+    for mobile_number in ["+16502532222", "+16502532222", "+16502539999"]:
+        mock_get_users_by_service.side_effect = lambda service_id: [{**get_team(service_id)[0], "mobile_number": mobile_number}]
+        with client_request.session_transaction() as session:
+            session["file_uploads"] = {fake_uuid: {"template_id": fake_uuid}}
+        client_request.get(
+            "main.check_messages",
+            service_id=SERVICE_ONE_ID,
+            template_id=fake_uuid,
+            upload_id=fake_uuid,
+            _test_page_title=False,
+        )
+
+    first, same_team, new_team = (call[0][2] for call in mock_get_summary.call_args_list)
+    assert first == same_team
+    assert first != new_team
+
+
+def test_check_messages_validates_big_uploads_in_the_background(
+    client_request,
+    app_,
+    mocker,
+    mock_get_live_service,
+    mock_get_service_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_template_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    mock_s3_set_metadata,
+    fake_uuid,
+):
+    contents = "phone number\r\n+16502532222\r\n+16502532223\r\n+16502532222"
+    mocker.patch("app.main.views.send.s3download", return_value=contents)
+    mocker.patch("app.main.views.send.redis_client.active", True)
+    mocker.patch("app.main.views.send.redis_client.redis_store").mget.return_value = [None, None, None]
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    mock_redis_delete = mocker.patch("app.extensions.RedisClient.delete")
+    mock_store_index = mocker.patch("app.main.views.send.s3upload_row_offset_index")
+    pool = ThreadPoolExecutor(max_workers=1)
+    mock_get_pool = mocker.patch("app.main.views.send.get_csv_validation_pool", return_value=pool)
+    mock_get_errors = mocker.patch("app.main.views.send.get_errors_for_csv")
+
+    with client_request.session_transaction() as session:
+        session["file_uploads"] = {fake_uuid: {"template_id": fake_uuid}}
+
+    with set_config(app_, "CSV_VALIDATION_PROCESSES", 2), set_config(app_, "CSV_VALIDATION_PROCESSES_MIN_ROWS", 3):
+        page = client_request.get(
+            "main.check_messages",
+            service_id=SERVICE_ONE_ID,
+            template_id=fake_uuid,
+            upload_id=fake_uuid,
+            original_file_name="example.csv",
+            _test_page_title=False,
+        )
+    pool.shutdown(wait=True)
+
+    assert normalize_spaces(page.select_one("h1").text) == "Checking your file"
+    assert page.select_one("meta[http-equiv=refresh]")["content"] == "5"
+    mock_get_pool.assert_called_once_with(2)
+    assert not mock_get_errors.called
+
+    (pending_call,) = [
+        call for call in mock_redis_set.call_args_list if call[0][0].startswith(f"csv-validation-pending-{SERVICE_ONE_ID}")
+    ]
+    assert json.loads(pending_call[0][1]) == "pending"
+    (summary_call,) = [
+        call
+        for call in mock_redis_set.call_args_list
+        if call[0][0] == csv_validation_summary_cache_key(SERVICE_ONE_ID, fake_uuid)
+    ]
+    summary = json.loads(summary_call[0][1])
+    assert summary["template_id"] == fake_uuid
+    assert summary["row_count"] == 3
+    assert summary["error_row_indices"] == []
+    assert summary["duplicate_row_indices"] == [2]
+    assert summary["count_of_duplicate_recipient_rows"] == 1
+    assert summary["sms_parts_to_send"] == 3
+    mock_store_index.assert_called_once_with(SERVICE_ONE_ID, fake_uuid, get_csv_row_offset_index(contents))
+    mock_redis_delete.assert_called_once_with(pending_call[0][0])
+
+
+@pytest.mark.parametrize(
+    "state, expected_to_wait",
+    [
+        ("pending", True),
+        ("failed", False),
+        (None, False),
+    ],
+)
+def test_check_messages_only_waits_for_big_uploads_being_validated_in_the_background(
+    client_request,
+    app_,
+    mocker,
+    mock_get_live_service,
+    mock_get_service_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_template_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    mock_s3_set_metadata,
+    fake_uuid,
+    state,
+    expected_to_wait,
+):
+    # Four rows when the upload can only have three, unless it's already being validated
+    contents = "phone number\r\n+16502532222\r\n+16502532223\r\n+16502532224\r\n+16502532225"
+    mocker.patch("app.main.views.send.s3download", return_value=contents)
+    mocker.patch("app.main.views.send.get_csv_max_rows", return_value=3)
+    mocker.patch("app.main.views.send.redis_client.active", True)
+    mocker.patch("app.main.views.send.redis_client.redis_store").mget.return_value = [None, None, None]
+    mocker.patch(
+        "app.extensions.RedisClient.get",
+        side_effect=lambda key: json.dumps(state) if state and key.startswith("csv-validation-pending-") else None,
+    )
+    mocker.patch("app.extensions.RedisClient.set")
+    mock_get_pool = mocker.patch("app.main.views.send.get_csv_validation_pool")
+
+    with client_request.session_transaction() as session:
+        session["file_uploads"] = {fake_uuid: {"template_id": fake_uuid}}
+
+    with set_config(app_, "CSV_VALIDATION_PROCESSES", 2), set_config(app_, "CSV_VALIDATION_PROCESSES_MIN_ROWS", 3):
+        page = client_request.get(
+            "main.check_messages",
+            service_id=SERVICE_ONE_ID,
+            template_id=fake_uuid,
+            upload_id=fake_uuid,
+            _test_page_title=False,
+        )
+
+    assert (normalize_spaces(page.select_one("h1").text) == "Checking your file") is expected_to_wait
+    assert not mock_get_pool.called
+
+
+def test_check_messages_with_a_validation_summary_only_reads_the_rows_shown(
+    client_request,
+    mocker,
+    mock_get_live_service,
+    mock_get_service_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_template_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    mock_s3_set_metadata,
+    fake_uuid,
+):
+    contents = "\r\n".join(["phone number"] + ["+1650253{:04}".format(i) for i in range(250)])
+    row_offset_index = get_csv_row_offset_index(contents)
+    mock_s3download = mocker.patch("app.main.views.send.s3download")
+    mock_s3download_range = mocker.patch(
+        "app.main.views.send.s3download_range",
+        side_effect=lambda service_id, upload_id, start, end: contents.encode("utf-8")[start:end],
+    )
+    mocker.patch(
+        "app.main.views.send.get_csv_validation_summary",
+        return_value={
+            "row_count": 250,
+            "error_row_indices": [],
+            "bad_recipient_row_count": 0,
+            "missing_data_row_count": 0,
+            "content_too_long_row_count": 0,
+            "duplicate_row_indices": [],
+            "count_of_duplicate_recipients": 0,
+            "count_of_duplicate_recipient_rows": 0,
+            "allowed_to_send_to": True,
+            "sms_parts_to_send": 250,
+            "is_sms_parts_estimated": False,
+            "row_offset_index": row_offset_index,
+        },
+    )
+    mock_recipient_csv = mocker.patch("app.main.views.send.SummarisedRecipientCSV", wraps=SummarisedRecipientCSV)
+    mock_get_errors = mocker.patch("app.main.views.send.get_errors_for_csv")
+
+    with client_request.session_transaction() as session:
+        session["file_uploads"] = {fake_uuid: {"template_id": fake_uuid}}
+
+    page = client_request.get(
+        "main.check_messages",
+        service_id=SERVICE_ONE_ID,
+        template_id=fake_uuid,
+        upload_id=fake_uuid,
+        _test_page_title=False,
+    )
+
+    assert not mock_s3download.called
+    mock_s3download_range.assert_called_once_with(SERVICE_ONE_ID, fake_uuid, 0, row_offset_index[2])
+    parsed_contents = mock_recipient_csv.call_args[0][0].strip().splitlines()
+    assert parsed_contents[1:] == ["+1650253{:04}".format(i) for i in range(100)]
+    assert not mock_get_errors.called
+    assert len(page.select("tbody tr")) == 10
+
+
+def test_check_messages_preview_only_parses_the_rows_near_the_previewed_row(
+    platform_admin_client,
+    mock_get_service_letter_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    service_one,
+    fake_uuid,
+    mocker,
+):
+    service_one["permissions"] = ["letter"]
+    mocker.patch("app.service_api_client.get_service", return_value={"data": service_one})
+    mocker.patch("app.main.views.send.get_page_count_for_letter", return_value=1)
+    contents = "\r\n".join(["address line 1, postcode"] + [f"{i} street, abc{i}" for i in range(250)])
+    mock_s3download = mocker.patch("app.main.views.send.s3download")
+    mock_s3download_range = mocker.patch(
+        "app.main.views.send.s3download_range",
+        side_effect=lambda service_id, upload_id, start, end: contents.encode("utf-8")[start:end],
+    )
+    mocker.patch(
+        "app.main.views.send.get_csv_validation_summary",
+        return_value={
+            "row_count": 250,
+            "row_offset_index": get_csv_row_offset_index(contents),
+            "sms_parts_to_send": 0,
+            "is_sms_parts_estimated": False,
+        },
+    )
+    mock_recipient_csv = mocker.patch("app.main.views.send.RecipientCSV", wraps=RecipientCSV)
+    mocked_preview = mocker.patch("app.main.views.send.TemplatePreview.from_utils_template", return_value="foo")
+
+    response = platform_admin_client.get(
+        url_for(
+            "main.check_messages_preview",
+            service_id=service_one["id"],
+            template_id=fake_uuid,
+            upload_id=fake_uuid,
+            filetype="png",
+            row_index=207,
+        )
+    )
+
+    assert response.status_code == 200
+    assert mocked_preview.call_args[0][0].values == {"addressline1": "205 street", "postcode": "abc205"}
+    parsed_contents = mock_recipient_csv.call_args[0][0].strip().splitlines()
+    assert parsed_contents[0] == "address line 1, postcode"
+    assert parsed_contents[1:] == [f"{i} street, abc{i}" for i in range(200, 250)]
+    assert not mock_s3download.called
+    assert mock_s3download_range.call_count == 2
+
+
+def test_check_messages_preview_reads_rows_using_the_stored_row_offset_index(
+    platform_admin_client,
+    mock_get_service_letter_template,
+    mock_get_users_by_service,
+    mock_get_service_statistics,
+    mock_get_job_doesnt_exist,
+    mock_get_jobs,
+    mock_s3_get_row_offset_index,
+    mock_s3_upload_row_offset_index,
+    service_one,
+    fake_uuid,
+    mocker,
+):
+    service_one["permissions"] = ["letter"]
+    mocker.patch("app.service_api_client.get_service", return_value={"data": service_one})
+    mocker.patch("app.main.views.send.get_page_count_for_letter", return_value=1)
+    contents = "\r\n".join(["address line 1, postcode"] + [f"{i} street, abc{i}" for i in range(250)])
+    mock_s3_get_row_offset_index.return_value = get_csv_row_offset_index(contents)
+    mock_s3download = mocker.patch("app.main.views.send.s3download")
+    mock_s3download_range = mocker.patch(
+        "app.main.views.send.s3download_range",
+        side_effect=lambda service_id, upload_id, start, end: contents.encode("utf-8")[start:end],
+    )
+    mocker.patch("app.main.views.send.get_csv_validation_summary", return_value=None)
+    mocked_preview = mocker.patch("app.main.views.send.TemplatePreview.from_utils_template", return_value="foo")
+
+    response = platform_admin_client.get(
+        url_for(
+            "main.check_messages_preview",
+            service_id=service_one["id"],
+            template_id=fake_uuid,
+            upload_id=fake_uuid,
+            filetype="png",
+            row_index=107,
+        )
+    )
+
+    assert response.status_code == 200
+    assert mocked_preview.call_args[0][0].values == {"addressline1": "105 street", "postcode": "abc105"}
+    mock_s3_get_row_offset_index.assert_called_once_with(service_one["id"], str(fake_uuid))
+    assert not mock_s3download.called
+    assert mock_s3download_range.call_count == 2
+    assert not mock_s3_upload_row_offset_index.called
+
+
+def test_download_duplicate_recipients_only_parses_the_rows_with_duplicates(
+    client_request,
+    mocker,
+    mock_get_service_template,
+    fake_uuid,
+):
+    phone_numbers = ["+1650253{:04}".format(i) for i in range(200)]
+    phone_numbers[150] = phone_numbers[0]
+    contents = "\r\n".join(["phone number"] + phone_numbers)
+    mock_s3download = mocker.patch("app.main.views.send.s3download")
+    mock_s3download_range = mocker.patch(
+        "app.main.views.send.s3download_range",
+        side_effect=lambda service_id, upload_id, start, end: contents.encode("utf-8")[start:end],
+    )
+    mocker.patch(
+        "app.main.views.send.get_csv_validation_summary",
+        return_value={
+            "template_id": fake_uuid,
+            "row_offset_index": get_csv_row_offset_index(contents),
+            "duplicate_row_indices": [150],
+        },
+    )
+    mock_recipient_csv = mocker.patch("app.main.views.send.RecipientCSV", wraps=RecipientCSV)
+
+    response = client_request.get(
+        "main.download_duplicate_recipients",
+        service_id=SERVICE_ONE_ID,
+        template_id=fake_uuid,
+        upload_id=fake_uuid,
+        _return_response=True,
+    )
+
+    assert response.get_data(as_text=True).splitlines() == ["Row number,phone number", "152,+16502530000"]
+    assert len(mock_recipient_csv.call_args[0][0].strip().splitlines()) == 101
+    assert not mock_s3download.called
+    assert mock_s3download_range.call_count == 2
+
+
 def test_check_messages_adds_template_attachments_to_metadata(
     client_request,
     mocker,
@@ -4012,15 +4505,8 @@ def test_s3_send_link_is_shown(
     ],
 )
 def test_s3_send_page_only_visible_to_hc(logged_in_client, fake_uuid, mocker, bulk_send_allowed, expected_title):
-    class Object(object):
-        pass
-
     expected_filenames = ["file0.csv", "file1.csv"]
-    s3_file_objects = []
-    for filename in expected_filenames:
-        x = Object()
-        x.key = filename
-        s3_file_objects.append(x)
+    s3_file_objects = [{"key": filename, "last_modified": "2024-01-01T00:00:00+00:00"} for filename in expected_filenames]
 
     mocker.patch("app.main.views.send.service_can_bulk_send", return_value=bulk_send_allowed)
     mocker.patch("app.main.views.send.list_bulk_send_uploads", return_value=s3_file_objects)
@@ -4041,15 +4527,8 @@ def test_s3_send_shows_available_files(
     fake_uuid,
     mocker,
 ):
-    class Object(object):
-        pass
-
     expected_filenames = ["file0.csv", "file1.csv"]
-    s3_file_objects = []
-    for filename in expected_filenames:
-        x = Object()
-        x.key = filename
-        s3_file_objects.append(x)
+    s3_file_objects = [{"key": filename, "last_modified": "2024-01-01T00:00:00+00:00"} for filename in expected_filenames]
 
     mocker.patch("app.main.views.send.service_can_bulk_send", return_value=True)
     mocker.patch("app.main.views.send.list_bulk_send_uploads", return_value=s3_file_objects)
@@ -4069,6 +4548,70 @@ def test_s3_send_shows_available_files(
     assert multiple_choise_options == expected_filenames
 
 
+@pytest.mark.parametrize(
+    "page, expected_filenames, expected_previous_page, expected_next_page",
+    [
+        (1, ["file0.csv", "file1.csv"], None, 2),
+        (2, ["file2.csv", "file3.csv"], 1, 3),
+        (3, ["file4.csv"], 2, None),
+    ],
+)
+def test_s3_send_shows_a_page_of_files(
+    logged_in_client,
+    fake_uuid,
+    mocker,
+    app_,
+    page,
+    expected_filenames,
+    expected_previous_page,
+    expected_next_page,
+):
+    s3_file_objects = [{"key": f"file{i}.csv", "last_modified": "2024-01-01T00:00:00+00:00"} for i in range(5)]
+
+    mocker.patch("app.main.views.send.service_can_bulk_send", return_value=True)
+    mock_list = mocker.patch("app.main.views.send.list_bulk_send_uploads", return_value=s3_file_objects)
+    mocker.patch("app.service_api_client.get_service_template", return_value=create_template(template_type="email"))
+    with set_config(app_, "BULK_SEND_UPLOADS_PAGE_SIZE", 2):
+        response = logged_in_client.get(
+            url_for("main.s3_send", service_id=SERVICE_ONE_ID, template_id=fake_uuid, page=page, prefix="file")
+        )
+    page_html = BeautifulSoup(response.data.decode("utf-8"), "html.parser")
+
+    assert response.status_code == 200
+    mock_list.assert_called_once_with(prefix="file")
+    assert [x.text.strip() for x in page_html.select(".multiple-choice label")] == expected_filenames
+    for rel, expected_page in (("previous", expected_previous_page), ("next", expected_next_page)):
+        link = page_html.select_one(f"a[rel={rel}]")
+        if expected_page:
+            assert link["href"] == url_for(
+                "main.s3_send", service_id=SERVICE_ONE_ID, template_id=fake_uuid, page=expected_page, prefix="file"
+            )
+        else:
+            assert link is None
+
+
+def test_s3_send_accepts_a_file_from_another_page(
+    logged_in_client,
+    fake_uuid,
+    mocker,
+    app_,
+):
+    s3_file_objects = [{"key": f"file{i}.csv", "last_modified": "2024-01-01T00:00:00+00:00"} for i in range(5)]
+
+    mocker.patch("app.main.views.send.service_can_bulk_send", return_value=True)
+    mocker.patch("app.main.views.send.list_bulk_send_uploads", return_value=s3_file_objects)
+    mocker.patch("app.service_api_client.get_service_template", return_value=create_template(template_type="email"))
+    mock_copy = mocker.patch("app.main.views.send.copy_bulk_send_file_to_uploads", return_value=fake_uuid)
+    with set_config(app_, "BULK_SEND_UPLOADS_PAGE_SIZE", 2):
+        response = logged_in_client.post(
+            url_for("main.s3_send", service_id=SERVICE_ONE_ID, template_id=fake_uuid),
+            data={"s3_files": "file4.csv"},
+        )
+
+    assert response.status_code == 302
+    mock_copy.assert_called_once_with(SERVICE_ONE_ID, "file4.csv")
+
+
 class TestBulkCheckSmsSendingInfo:
     """Tests for the SMS sending-info block on the bulk-send review page (ok.html)."""
 
@@ -5,6 +5,8 @@ import pytest
 from app.models.service import Service
 from app.models.user import User
 from tests import organisation_json
+from tests.conftest import _template
+from werkzeug.exceptions import NotFound
 
 INV_PARENT_FOLDER_ID = "7e979e79-d970-43a5-ac69-b625a8d147b0"
 INV_CHILD_1_FOLDER_ID = "92ee1ee0-e4ee-4dcc-b1a7-a5da9ebcfa2b"
@@ -173,6 +175,94 @@ def test_get_template_folders_shows_all_folders_when_user_id_not_passed_in(
     ]
 
 
+@pytest.mark.parametrize(
+    "template_type, template_folder_id, expected_names",
+    [
+        ("all", None, ["sms 1", "email 1", "sms 2"]),
+        ("sms", None, ["sms 1", "sms 2"]),
+        (["email"], None, ["email 1"]),
+        (["sms", "email"], None, ["sms 1", "email 1", "sms 2"]),
+        (["all", "sms"], None, ["sms 1", "email 1", "sms 2"]),
+        ("all", VIS_PARENT_FOLDER_ID, ["email in folder"]),
+        ("sms", VIS_PARENT_FOLDER_ID, []),
+        ("all", uuid.UUID(VIS_PARENT_FOLDER_ID), ["email in folder"]),
+        ("all", INV_CHILD_2_FOLDER_ID, []),
+    ],
+)
+def test_get_templates_filters_by_folder_and_template_type(
+    mocker, service_one, mock_get_template_folders, template_type, template_folder_id, expected_names
+):
+    mock_get_service_templates = mocker.patch(
+        "app.service_api_client.get_service_templates",
+        return_value={
+            "data": [
+                _template("sms", "sms 1"),
+                _template("email", "email 1"),
+                _template("email", "email in folder", parent=VIS_PARENT_FOLDER_ID),
+                _template("sms", "sms 2"),
+            ]
+        },
+    )
+    service = Service(service_one)
+
+    for _ in range(2):
+        templates = service.get_templates(template_type, template_folder_id)
+        assert [template["name"] for template in templates] == expected_names
+
+    assert mock_get_service_templates.call_count == 1
+
+
+def test_is_folder_visible_looks_for_templates_in_nested_folders_once(
+    mocker, service_one, mock_get_template_folders, active_user_with_permissions
+):
+    mock_get_template_folders.return_value = _get_all_folders(active_user_with_permissions)
+    mocker.patch(
+        "app.service_api_client.get_service_templates",
+        return_value={"data": [_template("email", "email in grandchild", parent=INV_CHILD_1_FOLDER_ID)]},
+    )
+    service = Service(service_one)
+    mock_get_templates = mocker.spy(service, "get_templates")
+
+    assert service.is_folder_visible(INV_PARENT_FOLDER_ID, "email") is True
+    assert service.is_folder_visible(INV_PARENT_FOLDER_ID, "sms") is False
+    assert service.is_folder_visible(VIS_PARENT_FOLDER_ID, "email") is False
+    assert [folder["id"] for folder in service.get_template_folders("email", INV_PARENT_FOLDER_ID)] == [INV_CHILD_1_FOLDER_ID]
+    calls_made = mock_get_templates.call_count
+
+    assert service.is_folder_visible(INV_PARENT_FOLDER_ID, "email") is True
+    assert service.is_folder_visible(uuid.UUID(INV_PARENT_FOLDER_ID), "sms") is False
+    assert [folder["id"] for folder in service.get_template_folders("email", INV_PARENT_FOLDER_ID)] == [INV_CHILD_1_FOLDER_ID]
+    assert mock_get_templates.call_count == calls_made
+
+
+def test_get_template_folder_finds_folder_by_id(service_one, mock_get_template_folders, active_user_with_permissions):
+    mock_get_template_folders.return_value = _get_all_folders(active_user_with_permissions)
+    service = Service(service_one)
+
+    assert service.get_template_folder(uuid.UUID(INV_CHILD_1_FOLDER_ID))["name"] == "1's Invisible child"
+    assert service.get_template_folder(None)["id"] is None
+    with pytest.raises(NotFound):
+        service.get_template_folder(str(uuid.uuid4()))
+    assert mock_get_template_folders.call_count == 1
+
+
+def test_get_user_template_folders_works_out_folders_once_per_user(
+    mocker, service_one, mock_get_template_folders, active_user_with_permissions
+):
+    mock_get_template_folders.return_value = _get_all_folders(active_user_with_permissions)
+    service = Service(service_one)
+    user = User(active_user_with_permissions)
+    mock_has_permission = mocker.spy(User, "has_template_folder_permission")
+
+    first_result = service.get_user_template_folders(user)
+    calls_made = mock_has_permission.call_count
+    first_result.clear()
+
+    assert len(service.get_user_template_folders(user)) == 5
+    assert len(service.get_template_folders(user=user)) == 3
+    assert mock_has_permission.call_count == calls_made
+
+
 def test_organisation_type_when_services_organisation_has_no_org_type(mocker, service_one, organisation_one):
     service = Service(service_one)
     mocker.patch(
@@ -3,6 +3,8 @@ import requests
 from app.notify_client.service_api_client import service_api_client
 from notifications_python_client.errors import HTTP503Error
 
+from app.notify_client import get_api_session
+
 
 def test_retry_on_server_error_2_failed_tries(mocker):
     response = requests.Response()
@@ -42,3 +44,20 @@ def test_retry_on_server_error_3_failed_tries(mocker):
 
     with pytest.raises(HTTP503Error):
         service_api_client.get_live_services_data()
+
+
+def test_retry_on_server_error_through_the_shared_session(mocker):
+    response = requests.Response()
+    response._content = b'{"foo": "bar"}'
+    response.encoding = "utf-8"
+    response.status_code = 200
+
+    mocker.patch.object(service_api_client, "keepalive_enabled", True)
+    mock_request = mocker.patch.object(
+        get_api_session(service_api_client.pool_connections, service_api_client.pool_maxsize, service_api_client.pool_block),
+        "request",
+        side_effect=[requests.exceptions.ConnectionError(), response],
+    )
+
+    assert service_api_client.get_live_services_data() == {"foo": "bar"}
+    assert mock_request.call_count == 2
@@ -0,0 +1,516 @@
+import json
+from contextlib import suppress
+from inspect import signature
+from types import SimpleNamespace
+from unittest.mock import call
+
+import pytest
+from app.notify_client.cache import CacheSerializer, LocalCache
+from freezegun import freeze_time
+
+from app.notify_client import cache
+
+
+def _local_cache(enabled=True, max_size=3, ttl=5):
+    local_cache = LocalCache()
+    local_cache.init_app(
+        SimpleNamespace(
+            config={
+                "REDIS_LOCAL_CACHE_ENABLED": enabled,
+                "REDIS_LOCAL_CACHE_MAX_SIZE": max_size,
+                "REDIS_LOCAL_CACHE_TTL": ttl,
+                "REDIS_ENABLED": False,
+            }
+        )
+    )
+    return local_cache
+
+
+class FakeClient:
+    def __init__(self):
+        self.api_calls = 0
+
+    @cache.set("thing-{thing_id}")
+    def get_thing(self, thing_id):
+        self.api_calls += 1
+        return {"data_from": "api", "id": thing_id}
+
+    @cache.delete("thing-{thing_id}")
+    def update_thing(self, thing_id):
+        return None
+
+    @cache.delete_by_pattern("thing-*")
+    def update_all_things(self):
+        return None
+
+
+def test_local_cache_does_nothing_when_disabled():
+    local_cache = _local_cache(enabled=False)
+    local_cache.set("key", "value")
+
+    assert local_cache.get("key") is None
+    assert len(local_cache) == 0
+
+
+def test_local_cache_evicts_least_recently_used():
+    local_cache = _local_cache(max_size=2)
+    local_cache.set("a", "1")
+    local_cache.set("b", "2")
+    local_cache.get("a")
+    local_cache.set("c", "3")
+
+    assert local_cache.get("a") == "1"
+    assert local_cache.get("b") is None
+    assert local_cache.get("c") == "3"
+
+
+def test_local_cache_entries_expire():
+    local_cache = _local_cache(ttl=5)
+    with freeze_time("2026-01-01 12:00:00") as frozen_time:
+        local_cache.set("key", "value")
+        frozen_time.tick(4)
+        assert local_cache.get("key") == "value"
+        frozen_time.tick(2)
+        assert local_cache.get("key") is None
+
+
+def test_local_cache_evicts_by_redis_pattern():
+    local_cache = _local_cache(max_size=10)
+    local_cache.set("service-1-templates", "1")
+    local_cache.set("service-1-template-folders", "2")
+    local_cache.set("service-2-templates", "3")
+
+    local_cache.evict_by_pattern("service-?-templates")
+
+    assert local_cache.get("service-1-templates") is None
+    assert local_cache.get("service-2-templates") is None
+    assert local_cache.get("service-1-template-folders") == "2"
+
+
+@pytest.mark.parametrize(
+    "message, expected_remaining",
+    [
+        ({"pid": 0, "keys": ["thing-1"]}, {"thing-2"}),
+        ({"pid": 0, "pattern": "thing-*"}, set()),
+        ({"pid": "own", "keys": ["thing-1"]}, {"thing-1", "thing-2"}),
+        ("not json", {"thing-1", "thing-2"}),
+    ],
+)
+def test_local_cache_handles_invalidation_messages_from_other_workers(mocker, message, expected_remaining):
+    mocker.patch("app.notify_client.cache.os.getpid", return_value="own")
+    local_cache = _local_cache()
+    local_cache.set("thing-1", "1")
+    local_cache.set("thing-2", "2")
+
+    data = json.dumps(message) if isinstance(message, dict) else message
+    local_cache._handle_message({"type": "message", "data": data.encode("utf-8")})
+
+    assert {key for key in ("thing-1", "thing-2") if local_cache.get(key)} == expected_remaining
+
+
+def test_set_decorator_serves_local_hits_without_calling_redis(mocker):
+    mocker.patch("app.notify_client.cache.local_cache", _local_cache())
+    mock_redis_get = mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    client = FakeClient()
+
+    assert client.get_thing("1") == {"data_from": "api", "id": "1"}
+    assert client.get_thing("1") == {"data_from": "api", "id": "1"}
+
+    mock_redis_get.assert_called_once_with("thing-1")
+    mock_redis_set.assert_called_once_with("thing-1", '{"data_from": "api", "id": "1"}', ex=cache.TTL)
+    assert client.api_calls == 1
+
+
+def test_set_decorator_fills_local_cache_from_redis_hits(mocker):
+    local_cache = _local_cache()
+    mocker.patch("app.notify_client.cache.local_cache", local_cache)
+    mocker.patch("app.extensions.RedisClient.get", return_value=b'{"data_from": "cache"}')
+
+    assert FakeClient().get_thing("1") == {"data_from": "cache"}
+    assert local_cache.get("thing-1") == b'{"data_from": "cache"}'
+
+
+def test_delete_decorators_evict_local_entries(mocker):
+    local_cache = _local_cache()
+    mocker.patch("app.notify_client.cache.local_cache", local_cache)
+    mocker.patch("app.extensions.RedisClient.delete")
+    mocker.patch("app.extensions.RedisClient.delete_cache_keys_by_pattern")
+    local_cache.set("thing-1", "1")
+    local_cache.set("thing-2", "2")
+
+    FakeClient().update_thing("1")
+    assert local_cache.get("thing-1") is None
+    assert local_cache.get("thing-2") == "2"
+
+    FakeClient().update_all_things()
+    assert local_cache.get("thing-2") is None
+
+
+def test_delete_keys_evicts_local_entries(mocker):
+    local_cache = _local_cache()
+    mocker.patch("app.notify_client.cache.local_cache", local_cache)
+    mock_redis_delete = mocker.patch("app.extensions.RedisClient.delete", side_effect=ValueError("Redis is down"))
+    mock_delete_by_pattern = mocker.patch("app.extensions.RedisClient.delete_cache_keys_by_pattern", return_value=2)
+    local_cache.set("service-1", "1")
+    local_cache.set("service-1-templates", "2")
+    local_cache.set("service-2", "3")
+
+    with pytest.raises(ValueError):
+        cache.delete_keys("service-1")
+    mock_redis_delete.assert_called_once_with("service-1")
+    assert local_cache.get("service-1") is None
+    assert local_cache.get("service-1-templates") == "2"
+
+    assert cache.delete_keys_by_pattern("service-1*") == 2
+    mock_delete_by_pattern.assert_called_once_with("service-1*")
+    assert local_cache.get("service-1-templates") is None
+    assert local_cache.get("service-2") == "3"
+
+
+def _listening_local_cache(mocker):
+    local_cache = _local_cache()
+    local_cache._redis_enabled = True
+    mock_redis_store = mocker.patch("app.notify_client.cache.redis_client.redis_store")
+    return local_cache, mock_redis_store.pubsub.return_value
+
+
+def test_local_cache_serves_nothing_until_it_has_subscribed(mocker):
+    local_cache, mock_pubsub = _listening_local_cache(mocker)
+    mock_pubsub.subscribe.side_effect = [ConnectionError("Redis is down"), None]
+    local_cache.set("key", "value")
+
+    with freeze_time("2026-01-01 12:00:00") as frozen_time:
+        assert local_cache.get("key") is None
+        assert local_cache._listener_pid is None
+
+        # waits before trying to subscribe again
+        assert local_cache.get("key") is None
+        assert mock_pubsub.subscribe.call_count == 1
+
+        frozen_time.tick(local_cache.LISTENER_RETRY_INTERVAL + 1)
+        local_cache.set("key", "value")
+        assert local_cache.get("key") is None  # cleared on subscribing, as invalidations may have been missed
+        assert mock_pubsub.subscribe.call_count == 2
+        assert local_cache._listener is mock_pubsub.run_in_thread.return_value
+
+        local_cache.set("key", "value")
+        assert local_cache.get("key") == "value"
+        assert mock_pubsub.subscribe.call_count == 2
+
+
+def test_local_cache_subscribes_again_if_the_listener_dies(mocker):
+    local_cache, mock_pubsub = _listening_local_cache(mocker)
+    mock_pubsub.run_in_thread.return_value.is_alive.return_value = True
+    local_cache.get("key")
+
+    mock_pubsub.run_in_thread.return_value.is_alive.return_value = False
+    local_cache.get("key")
+
+    assert mock_pubsub.subscribe.call_count == 2
+
+
+class FakeSingleFlightClient:
+    def __init__(self):
+        self.api_calls = 0
+
+    @cache.set("hot-thing", single_flight=True)
+    def get_hot_thing(self):
+        self.api_calls += 1
+        return {"data_from": "api"}
+
+    @cache.set("hot-thing", single_flight=True)
+    def get_hot_thing_from_broken_api(self):
+        raise ValueError("API is down")
+
+
+def _mock_redis_store_for_locks(mocker, lock_taken):
+    mocker.patch("app.notify_client.cache.redis_client.active", True)
+    mock_redis_store = mocker.patch("app.notify_client.cache.redis_client.redis_store")
+    if isinstance(lock_taken, Exception):
+        mock_redis_store.set.side_effect = lock_taken
+    else:
+        mock_redis_store.set.return_value = lock_taken
+    return mock_redis_store
+
+
+def test_single_flight_refreshes_and_releases_the_lock(mocker):
+    mock_redis_store = _mock_redis_store_for_locks(mocker, lock_taken=True)
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    client = FakeSingleFlightClient()
+
+    assert client.get_hot_thing() == {"data_from": "api"}
+
+    (lock_key, token), lock_kwargs = mock_redis_store.set.call_args
+    assert (lock_key, lock_kwargs) == ("hot-thing-refresh-lock", {"ex": cache.REFRESH_LOCK_TTL, "nx": True})
+    mock_redis_set.assert_called_once_with("hot-thing", '{"data_from": "api"}', ex=cache.TTL)
+    mock_redis_store.eval.assert_called_once_with(cache.RELEASE_LOCK_SCRIPT, 1, "hot-thing-refresh-lock", token)
+    assert client.api_calls == 1
+
+
+def test_single_flight_releases_the_lock_if_the_api_call_fails(mocker):
+    mock_redis_store = _mock_redis_store_for_locks(mocker, lock_taken=True)
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mocker.patch("app.extensions.RedisClient.set")
+
+    with pytest.raises(ValueError):
+        FakeSingleFlightClient().get_hot_thing_from_broken_api()
+
+    (_, token), _ = mock_redis_store.set.call_args
+    mock_redis_store.eval.assert_called_once_with(cache.RELEASE_LOCK_SCRIPT, 1, "hot-thing-refresh-lock", token)
+
+
+def test_locks_are_released_with_the_token_of_their_holder(mocker):
+    mock_redis_store = _mock_redis_store_for_locks(mocker, lock_taken=True)
+
+    first_token = cache.acquire_lock("lock", 10)
+    second_token = cache.acquire_lock("lock", 10)
+    cache.release_lock("lock", first_token)
+
+    assert first_token != second_token
+    assert [call_args[0][1] for call_args in mock_redis_store.set.call_args_list] == [first_token, second_token]
+    mock_redis_store.eval.assert_called_once_with(cache.RELEASE_LOCK_SCRIPT, 1, "lock", first_token)
+
+
+def test_single_flight_waits_for_the_value_refreshed_by_another_caller(mocker):
+    mock_redis_store = _mock_redis_store_for_locks(mocker, lock_taken=None)
+    mocker.patch("app.extensions.RedisClient.get", side_effect=[None, None, b'{"data_from": "other caller"}'])
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    mock_sleep = mocker.patch("app.notify_client.cache.sleep")
+    client = FakeSingleFlightClient()
+
+    assert client.get_hot_thing() == {"data_from": "other caller"}
+
+    assert mock_redis_store.set.call_count == 1
+    assert not mock_redis_set.called
+    assert mock_sleep.call_count == 2
+    assert client.api_calls == 0
+
+
+def test_single_flight_refreshes_without_the_lock_if_the_holder_is_too_slow(mocker):
+    mock_redis_store = _mock_redis_store_for_locks(mocker, lock_taken=None)
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    mocker.patch("app.notify_client.cache.sleep")
+    mocker.patch("app.notify_client.cache.monotonic", side_effect=[0, 1, cache.REFRESH_LOCK_WAIT + 1])
+    client = FakeSingleFlightClient()
+
+    assert client.get_hot_thing() == {"data_from": "api"}
+
+    mock_redis_set.assert_called_once_with("hot-thing", '{"data_from": "api"}', ex=cache.TTL)
+    assert not mock_redis_store.eval.called
+    assert client.api_calls == 1
+
+
+def test_single_flight_refreshes_without_waiting_if_redis_is_failing(mocker):
+    mock_redis_store = _mock_redis_store_for_locks(mocker, lock_taken=ConnectionError("Redis is down"))
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mocker.patch("app.extensions.RedisClient.set")
+    mock_sleep = mocker.patch("app.notify_client.cache.sleep")
+    client = FakeSingleFlightClient()
+
+    assert client.get_hot_thing() == {"data_from": "api"}
+
+    assert not mock_sleep.called
+    assert not mock_redis_store.eval.called
+    assert client.api_calls == 1
+
+
+def test_single_flight_is_skipped_when_redis_is_disabled(mocker):
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+
+    FakeSingleFlightClient().get_hot_thing()
+
+    mock_redis_set.assert_called_once_with("hot-thing", '{"data_from": "api"}', ex=cache.TTL)
+
+
+class FakeTaggedClient:
+    @cache.set("service-{service_id}-things", tags=["service-things"])
+    def get_service_things(self, service_id):
+        return ["thing"]
+
+    @cache.delete_by_tag("service-things")
+    def update_all_service_things(self):
+        return None
+
+
+@freeze_time("2026-01-01 12:00:00")
+def test_set_stores_and_tags_keys_in_one_transaction(mocker):
+    mocker.patch("app.notify_client.cache.redis_client.active", True)
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    mock_redis_store = mocker.patch("app.notify_client.cache.redis_client.redis_store")
+    mock_pipeline = mock_redis_store.pipeline.return_value
+    now = 1767268800.0
+
+    FakeTaggedClient().get_service_things("1234")
+
+    mock_redis_store.pipeline.assert_called_once_with(transaction=True)
+    assert mock_pipeline.method_calls == [
+        call.set("service-1234-things", '["thing"]', ex=cache.TTL),
+        call.zremrangebyscore("cache-tagged-service-things", "-inf", now),
+        call.zadd("cache-tagged-service-things", {"service-1234-things": now + cache.TTL}),
+        call.expire("cache-tagged-service-things", cache.TTL),
+        call.execute(),
+    ]
+    assert not mock_redis_set.called
+
+
+def test_set_does_not_tag_keys_when_redis_is_disabled(mocker):
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    mock_redis_store = mocker.patch("app.notify_client.cache.redis_client.redis_store")
+
+    FakeTaggedClient().get_service_things("1234")
+
+    mock_redis_set.assert_called_once_with("service-1234-things", '["thing"]', ex=cache.TTL)
+    assert not mock_redis_store.pipeline.called
+
+
+def test_delete_by_tag_deletes_tagged_keys_without_scanning(mocker):
+    local_cache = _local_cache()
+    mocker.patch("app.notify_client.cache.local_cache", local_cache)
+    mocker.patch("app.notify_client.cache.redis_client.active", True)
+    mock_redis_store = mocker.patch("app.notify_client.cache.redis_client.redis_store")
+    mock_redis_store.eval.return_value = [b"service-1234-things", b"service-5678-things"]
+    mock_delete_by_pattern = mocker.patch("app.extensions.RedisClient.delete_cache_keys_by_pattern")
+    local_cache.set("service-1234-things", "1")
+    local_cache.set("service-other-stuff", "2")
+
+    FakeTaggedClient().update_all_service_things()
+
+    mock_redis_store.eval.assert_called_once_with(cache.DELETE_TAGGED_KEYS_SCRIPT, 1, "cache-tagged-service-things")
+    assert not mock_delete_by_pattern.called
+    assert local_cache.get("service-1234-things") is None
+    assert local_cache.get("service-other-stuff") == "2"
+
+
+def _get_thing(self, service_id, thing_id, version=None):
+    pass
+
+
+@pytest.mark.parametrize(
+    "args, kwargs, expected_key",
+    [
+        (("1234", "5678"), {}, "service-1234-thing-5678-version-None"),
+        (("1234",), {"thing_id": "5678", "version": 2}, "service-1234-thing-5678-version-2"),
+        ((), {"service_id": "1234", "thing_id": "5678"}, "service-1234-thing-5678-version-None"),
+        (("1234", "5678", 3), {}, "service-1234-thing-5678-version-3"),
+    ],
+)
+def test_key_maker_formats_keys_from_args_kwargs_and_defaults(args, kwargs, expected_key):
+    make_key = cache._key_maker("service-{service_id}-thing-{thing_id}-version-{version}", _get_thing)
+
+    assert make_key(args, kwargs) == expected_key
+
+
+def test_key_maker_rejects_unknown_arguments_when_decorating():
+    with pytest.raises(TypeError) as exception:
+        cache.set("thing-{thing_name}")(_get_thing)
+
+    assert str(exception.value) == "_get_thing() takes no argument called 'thing_name'"
+
+
+def _make_key_by_inspecting_the_signature(key_format, client_method, args, kwargs):
+    # How keys were built before `_key_maker`, kept to check it builds the same keys
+    def get_argument(argument_name):
+        with suppress(KeyError):
+            return kwargs[argument_name]
+        with suppress(ValueError, IndexError):
+            return args[list(signature(client_method).parameters).index(argument_name) - 1]
+        return signature(client_method).parameters[argument_name].default
+
+    return key_format.format(
+        **{argument_name: get_argument(argument_name) for argument_name in signature(client_method).parameters}
+    )
+
+
+def test_key_maker_only_inspects_the_signature_when_decorating(mocker):
+    mock_signature = mocker.patch("app.notify_client.cache.signature", wraps=signature)
+    key_format = "service-{service_id}-thing-{thing_id}-version-{version}"
+    make_key = cache._key_maker(key_format, _get_thing)
+    args = ("1234", "5678")
+
+    for _ in range(3):
+        assert make_key(args, {}) == _make_key_by_inspecting_the_signature(key_format, _get_thing, args, {})
+
+    mock_signature.assert_called_once_with(_get_thing)
+
+
+def _cache_serializer(compression_threshold):
+    cache_serializer = CacheSerializer()
+    cache_serializer.init_app(SimpleNamespace(config={"REDIS_CACHE_COMPRESSION_THRESHOLD": compression_threshold}))
+    return cache_serializer
+
+
+def _large_service_templates(count=500):
+    return {
+        "data": [
+            {
+                "id": f"{i:08}-0000-0000-0000-000000000000",
+                "name": f"Template {i}",
+                "template_type": "email",
+                "subject": "Your application ((reference)) has been received",
+                "content": "Hello ((name)),\n\nWe received your application on ((date)). " * 5,
+                "folder": None,
+                "archived": False,
+                "version": 3,
+            }
+            for i in range(count)
+        ]
+    }
+
+
+@pytest.mark.parametrize("compression_threshold", [0, 1_000_000])
+def test_cache_serializer_stores_plain_json_below_the_threshold(compression_threshold):
+    cache_serializer = _cache_serializer(compression_threshold)
+
+    assert cache_serializer.dumps({"id": "1"}) == '{"id": "1"}'
+    assert cache_serializer.loads(b'{"id": "1"}') == {"id": "1"}
+
+
+def test_cache_serializer_compresses_large_values():
+    cache_serializer = _cache_serializer(1_000)
+    value = _large_service_templates(count=10)
+
+    serialized = cache_serializer.dumps(value)
+
+    assert serialized.startswith(CacheSerializer.COMPRESSED_PREFIX)
+    assert len(serialized) < len(json.dumps(value)) / 4
+    assert cache_serializer.loads(serialized) == value
+
+
+def test_cache_serializer_reads_compressed_values_when_compression_is_off():
+    value = _large_service_templates(count=10)
+    serialized = _cache_serializer(1_000).dumps(value)
+
+    assert _cache_serializer(0).loads(serialized) == value
+
+
+def test_set_decorator_stores_and_reads_compressed_values(mocker):
+    mocker.patch("app.notify_client.cache.cache_serializer", _cache_serializer(10))
+    mock_redis_set = mocker.patch("app.extensions.RedisClient.set")
+    mocker.patch("app.extensions.RedisClient.get", return_value=None)
+
+    assert FakeClient().get_thing("1") == {"data_from": "api", "id": "1"}
+
+    stored = mock_redis_set.call_args[0][1]
+    assert stored.startswith(CacheSerializer.COMPRESSED_PREFIX)
+
+    mocker.patch("app.extensions.RedisClient.get", return_value=stored)
+    client = FakeClient()
+    assert client.get_thing("1") == {"data_from": "api", "id": "1"}
+    assert client.api_calls == 0
+
+
+def test_cache_serializer_round_trips_a_large_service_compressed():
+    value = _large_service_templates()
+    plain = _cache_serializer(0).dumps(value).encode("utf-8")
+    compressed = _cache_serializer(16_384).dumps(value)
+
+    assert compressed.startswith(b"\x00zlib1:")
+    assert len(compressed) < len(plain) / 10
+    assert _cache_serializer(0).loads(compressed) == value
+    assert _cache_serializer(16_384).loads(compressed) == value
@@ -1,8 +1,16 @@
 from unittest.mock import Mock, patch
 
 import pytest
-from app.notify_client.notification_counts_client import NotificationCounts
+from app.notify_client.notification_counts_client import (
+    NotificationCounts,
+    get_todays_count_from_redis,
+)
 from app.utils import get_current_financial_year
+from notifications_utils.clients.redis import (
+    billable_units_sms_daily_count_cache_key,
+    email_daily_count_cache_key,
+    sms_daily_count_cache_key,
+)
 
 from tests.conftest import set_config
 
@@ -312,3 +320,43 @@ class TestNotificationCountsWithBillableUnits:
         mock_annual_limit.get_all_notification_counts.assert_not_called()
         # Annual SMS should use standard year counts
         assert result["sms"]["annual"]["sent"] == 25
+
+
+class TestTodaysCountsFromRedis:
+    @pytest.fixture
+    def mock_redis_store(self, mocker):
+        mocker.patch("app.notify_client.notification_counts_client.redis_client.active", True)
+        return mocker.patch("app.notify_client.notification_counts_client.redis_client.redis_store")
+
+    def test_reads_all_counters_in_one_round_trip_per_request(self, app_, mocker, mock_redis_store):
+        mock_redis_get = mocker.patch("app.extensions.RedisClient.get")
+        mock_redis_store.mget.return_value = [b"5", b"15", b"10"]
+
+        with app_.test_request_context():
+            with set_config(app_, "FF_USE_BILLABLE_UNITS", True):
+                assert NotificationCounts().get_all_notification_counts_for_today("service-123") == {"sms": 15, "email": 10}
+            assert get_todays_count_from_redis("service-123", sms_daily_count_cache_key("service-123")) == b"5"
+
+        mock_redis_store.mget.assert_called_once_with(
+            [
+                sms_daily_count_cache_key("service-123"),
+                billable_units_sms_daily_count_cache_key("service-123"),
+                email_daily_count_cache_key("service-123"),
+            ]
+        )
+        assert not mock_redis_get.called
+
+    def test_reads_counters_again_in_the_next_request(self, app_, mock_redis_store):
+        mock_redis_store.mget.return_value = [b"5", b"15", b"10"]
+
+        for _ in range(2):
+            with app_.test_request_context():
+                get_todays_count_from_redis("service-123", email_daily_count_cache_key("service-123"))
+
+        assert mock_redis_store.mget.call_count == 2
+
+    def test_returns_none_if_redis_fails(self, app_, mock_redis_store):
+        mock_redis_store.mget.side_effect = ConnectionError
+
+        with app_.test_request_context():
+            assert get_todays_count_from_redis("service-123", email_daily_count_cache_key("service-123")) is None
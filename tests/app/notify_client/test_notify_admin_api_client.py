@@ -1,13 +1,17 @@
+import socket
 from datetime import date
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 import pytest
+import requests_mock
 import werkzeug
 from app.models.service import Service
 from app.notify_client.notification_api_client import notification_api_client
 from flask import g
+from notifications_python_client.errors import HTTPError
 
-from app.notify_client import NotifyAdminAPIClient
+import app.notify_client
+from app.notify_client import NotifyAdminAPIClient, get_api_session
 from tests import service_json
 from tests.conftest import (
     create_api_user_active,
@@ -159,3 +163,161 @@ def test_sensitive_logging_enabled_for_admin_users(app_, platform_admin_user, me
     assert len(caplog.records) == 1
     assert "Sensitive Admin API request" in caplog.text
     assert ret == request.return_value
+
+
+def test_get_is_memoized_within_a_request(app_, mocker):
+    mock_request = mocker.patch(
+        "notifications_python_client.base.BaseAPIClient.request",
+        side_effect=lambda method, url, params=None: {"url": url, "params": params},
+    )
+    api_client = NotifyAdminAPIClient()
+    with set_config(app_, "API_REQUEST_MEMO_ENABLED", True):
+        api_client.init_app(app_)
+
+    with app_.test_request_context():
+        g.current_service = None
+        first = api_client.get("/service/1")
+        first["url"] = "mutated by the caller"
+        assert api_client.get("/service/1") == {"url": "/service/1", "params": None}
+        assert api_client.get(url="/service/1", params={"a": 1}) == {"url": "/service/1", "params": {"a": 1}}
+        assert api_client.get("/service/1", params={"a": 1}) == {"url": "/service/1", "params": {"a": 1}}
+        assert g.api_get_memo_hits == 2
+
+    assert mock_request.call_args_list == [
+        call("GET", "/service/1", params=None),
+        call("GET", "/service/1", params={"a": 1}),
+    ]
+
+    with app_.test_request_context():
+        g.current_service = None
+        api_client.get("/service/1")
+
+    assert mock_request.call_count == 3
+
+
+def test_paged_gets_are_not_memoized(app_, mocker):
+    mock_request = mocker.patch("notifications_python_client.base.BaseAPIClient.request", return_value={})
+    api_client = NotifyAdminAPIClient()
+    with set_config(app_, "API_REQUEST_MEMO_ENABLED", True):
+        api_client.init_app(app_)
+
+    with app_.test_request_context():
+        g.current_service = None
+        api_client.get("/service/1/notifications", params={"page": 1})
+        api_client.get("/service/1/notifications", params={"page": 1})
+        assert "api_get_memo" not in g
+
+    assert mock_request.call_count == 2
+
+
+def test_request_memo_drops_the_oldest_responses_when_full(app_, mocker):
+    mock_request = mocker.patch("notifications_python_client.base.BaseAPIClient.request", return_value={})
+    api_client = NotifyAdminAPIClient()
+    with set_config(app_, "API_REQUEST_MEMO_ENABLED", True), set_config(app_, "API_REQUEST_MEMO_MAX_ENTRIES", 2):
+        api_client.init_app(app_)
+
+    with app_.test_request_context():
+        g.current_service = None
+        for url in ["/service/1", "/service/2", "/service/3", "/service/3", "/service/1"]:
+            api_client.get(url)
+        assert [url for url, _ in g.api_get_memo] == ["/service/3", "/service/1"]
+
+    assert [args[1] for args, _ in mock_request.call_args_list] == ["/service/1", "/service/2", "/service/3", "/service/1"]
+
+
+@pytest.mark.parametrize("method", ["put", "post", "delete"])
+def test_writes_clear_the_request_memo(app_, mocker, method):
+    mock_request = mocker.patch("notifications_python_client.base.BaseAPIClient.request", return_value={})
+    api_client = NotifyAdminAPIClient()
+    with set_config(app_, "API_REQUEST_MEMO_ENABLED", True):
+        api_client.init_app(app_)
+
+    with app_.test_request_context():
+        g.current_service = None
+        api_client.get("/service/1")
+        getattr(api_client, method)("/service/1", {})
+        api_client.get("/service/1")
+
+    assert [args[0] for args, _ in mock_request.call_args_list] == ["GET", method.upper(), "GET"]
+
+
+def test_get_is_not_memoized_when_disabled(app_, mocker):
+    mock_request = mocker.patch("notifications_python_client.base.BaseAPIClient.request", return_value={})
+    api_client = NotifyAdminAPIClient()
+    api_client.init_app(app_)
+
+    with app_.test_request_context():
+        g.current_service = None
+        api_client.get("/service/1")
+        api_client.get("/service/1")
+
+    assert mock_request.call_count == 2
+
+
+def test_api_clients_share_one_session_per_process(mocker):
+    mocker.patch("app.notify_client.os.getpid", return_value=1)
+    session = get_api_session(4, 10, False)
+    assert get_api_session(4, 10, False) is session
+
+    mocker.patch("app.notify_client.os.getpid", return_value=2)
+    assert get_api_session(4, 10, False) is not session
+
+
+def test_api_session_tracks_new_connections_and_keeps_them_alive():
+    adapter = get_api_session(4, 10, False).get_adapter("https://api.example.com")
+    app.notify_client._connection_tracking.opened = False
+
+    adapter.poolmanager.connection_from_url("https://api.example.com")._new_conn()
+
+    assert app.notify_client._connection_tracking.opened is True
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.poolmanager.connection_pool_kw["socket_options"]
+
+
+def test_requests_report_opened_and_reused_connections(app_, mocker):
+    def request(method, url, **kwargs):
+        app.notify_client._connection_tracking.opened = mock_session.request.call_count == 1
+        return mocker.Mock(status_code=200, json=lambda: {"data": url})
+
+    mock_session = mocker.patch("app.notify_client.get_api_session").return_value
+    mock_session.request.side_effect = request
+    mock_statsd = mocker.patch("app.notify_client.statsd_client")
+    api_client = NotifyAdminAPIClient()
+    with set_config(app_, "API_HTTP_KEEPALIVE_ENABLED", True):
+        api_client.init_app(app_)
+    api_client.base_url = "https://api.example.com"
+
+    assert api_client.request("GET", "/service/1") == {"data": "https://api.example.com/service/1"}
+    assert api_client.request("GET", "/service/2") == {"data": "https://api.example.com/service/2"}
+
+    assert mock_statsd.incr.call_args_list == [
+        call("api_client.connections.opened"),
+        call("api_client.connections.reused"),
+    ]
+
+
+def test_requests_through_the_shared_session_raise_api_errors(app_, mocker):
+    mock_session_request = mocker.spy(get_api_session(4, 50, False), "request")
+    api_client = NotifyAdminAPIClient()
+    with set_config(app_, "API_HTTP_KEEPALIVE_ENABLED", True):
+        api_client.init_app(app_)
+    api_client.base_url = "https://api.example.com"
+
+    with requests_mock.mock() as mock:
+        mock.get("https://api.example.com/service/1", status_code=500, json={"message": "Internal server error"})
+        with pytest.raises(HTTPError) as exception:
+            api_client.request("GET", "/service/1")
+
+    assert exception.value.status_code == 500
+    assert mock_session_request.call_args[0][:2] == ("GET", "https://api.example.com/service/1")
+
+
+def test_requests_do_not_use_the_shared_session_when_keepalive_is_disabled(app_, mocker):
+    mock_get_api_session = mocker.patch("app.notify_client.get_api_session")
+    mock_request = mocker.patch("requests.request")
+    api_client = NotifyAdminAPIClient()
+    api_client.init_app(app_)
+
+    api_client.request("GET", "/service/1")
+
+    assert mock_request.called
+    assert not mock_get_api_session.called
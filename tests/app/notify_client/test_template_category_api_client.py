@@ -86,6 +86,7 @@ def test_update_template_category(template_category_client, fake_uuid, mocker):
     mock_redis_delete = mocker.patch(
         "app.extensions.RedisClient.delete",
     )
+    mock_redis_delete_by_pattern = mocker.patch("app.extensions.RedisClient.delete_cache_keys_by_pattern")
 
     template_category_client.update_template_category(
         template_category_id="template_category_id",
@@ -114,6 +115,7 @@ def test_update_template_category(template_category_client, fake_uuid, mocker):
     assert call("template_categories") in mock_redis_delete.call_args_list
     assert call("template_category-template_category_id") in mock_redis_delete.call_args_list
     assert len(mock_redis_delete.call_args_list) == 2
+    assert not mock_redis_delete_by_pattern.called
 
 
 def test_delete_template_category(template_category_client, mocker):
@@ -1,6 +1,22 @@
+import json
+from datetime import datetime, timezone
+from io import BytesIO
 from unittest.mock import Mock
 
-from app.s3_client.s3_csv_client import set_metadata_on_csv_upload
+import boto3
+import botocore
+import pytest
+from app.s3_client.s3_csv_client import (
+    MULTIPART_COPY_CHUNK_SIZE,
+    copy_bulk_send_file_to_uploads,
+    get_row_offset_index,
+    list_bulk_send_uploads,
+    s3download_range,
+    s3upload_chunks,
+    s3upload_row_offset_index,
+    set_metadata_on_csv_upload,
+)
+from botocore.stub import Stubber
 from flask import current_app
 
 
@@ -20,3 +36,215 @@ def test_sets_metadata(client, mocker):
         MetadataDirective="REPLACE",
         ServerSideEncryption="AES256",
     )
+
+
+def test_s3upload_chunks_uploads_to_the_csv_location(client, mocker):
+    mocker.patch("app.s3_client.s3_csv_client.uuid.uuid4", return_value="5678")
+    mock_get_aws_client = mocker.patch("app.s3_client.s3_csv_client.get_aws_client")
+
+    assert s3upload_chunks("1234", iter([b"phone number\r\n", b"6502532222"]), "ca-central-1") == "5678"
+
+    mock_get_aws_client.assert_called_once_with("s3", region_name="ca-central-1")
+    (file, bucket_name, file_location), kwargs = mock_get_aws_client.return_value.upload_fileobj.call_args
+    assert (bucket_name, file_location) == (current_app.config["CSV_UPLOAD_BUCKET_NAME"], "service-1234-notify/5678.csv")
+    assert file.read() == b"phone number\r\n6502532222"
+    assert kwargs["ExtraArgs"] == {"ServerSideEncryption": "AES256"}
+
+
+def test_s3upload_chunks_uploads_big_files_in_parts(client, mocker, stubbed_s3_client):
+    mocker.patch("app.s3_client.s3_csv_client.MULTIPART_CHUNK_SIZE", 5 * 1024 * 1024)
+    stubbed_s3_client.add_response("create_multipart_upload", {"UploadId": "upload"})
+    stubbed_s3_client.add_response("upload_part", {"ETag": "1"})
+    stubbed_s3_client.add_response("upload_part", {"ETag": "2"})
+    stubbed_s3_client.add_response("complete_multipart_upload", {})
+
+    s3upload_chunks("1234", (b"6502532222\r\n" * 100_000 for _chunk in range(6)), "ca-central-1")
+
+
+def test_s3upload_chunks_aborts_the_upload_if_the_file_cannot_be_converted(client, mocker, stubbed_s3_client):
+    mocker.patch("app.s3_client.s3_csv_client.MULTIPART_CHUNK_SIZE", 5 * 1024 * 1024)
+
+    def chunks():
+        yield b"6502532222\r\n" * 500_000
+        raise UnicodeDecodeError("utf-8", b"\xe9", 0, 1, "invalid continuation byte")
+
+    stubbed_s3_client.add_response("create_multipart_upload", {"UploadId": "upload"})
+    stubbed_s3_client.add_response("upload_part", {"ETag": "1"})
+    stubbed_s3_client.add_response("abort_multipart_upload", {})
+
+    with pytest.raises(UnicodeDecodeError):
+        s3upload_chunks("1234", chunks(), "ca-central-1")
+
+
+def test_s3download_range_only_gets_the_bytes_asked_for(client, mocker):
+    mocked_s3_object = Mock()
+    mocked_s3_object.get.return_value = {"Body": BytesIO(b"6502532222")}
+    mocker.patch("app.s3_client.s3_csv_client.get_csv_upload", return_value=mocked_s3_object)
+
+    assert s3download_range("1234", "5678", 14, 24) == b"6502532222"
+    mocked_s3_object.get.assert_called_once_with(Range="bytes=14-23")
+
+
+def test_s3download_range_does_not_get_an_empty_range(client, mocker):
+    mocked_get_csv_upload = mocker.patch("app.s3_client.s3_csv_client.get_csv_upload")
+
+    assert s3download_range("1234", "5678", 14, 14) == b""
+    assert not mocked_get_csv_upload.called
+
+
+def test_s3upload_row_offset_index_stores_it_next_to_the_upload(client, mocker):
+    mocked_get_s3_object = mocker.patch("app.s3_client.s3_csv_client.get_s3_object")
+
+    s3upload_row_offset_index("1234", "5678", [0, 14, 26])
+
+    mocked_get_s3_object.assert_called_once_with(
+        current_app.config["CSV_UPLOAD_BUCKET_NAME"], "service-1234-notify/5678.index.json"
+    )
+    mocked_get_s3_object.return_value.put.assert_called_once_with(
+        Body=b"[0, 14, 26]",
+        ContentType="application/json",
+        ServerSideEncryption="AES256",
+    )
+
+
+def test_get_row_offset_index(client, mocker):
+    mocked_get_s3_object = mocker.patch("app.s3_client.s3_csv_client.get_s3_object")
+    mocked_get_s3_object.return_value.get.return_value = {"Body": BytesIO(json.dumps([0, 14, 26]).encode("utf-8"))}
+
+    assert get_row_offset_index("1234", "5678") == [0, 14, 26]
+
+
+def test_get_row_offset_index_returns_none_for_uploads_without_one(client, mocker):
+    mocked_get_s3_object = mocker.patch("app.s3_client.s3_csv_client.get_s3_object")
+    mocked_get_s3_object.return_value.get.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": "The specified key does not exist."}}, "GetObject"
+    )
+
+    assert get_row_offset_index("1234", "5678") is None
+
+
+@pytest.fixture
+def stubbed_s3_client(mocker):
+    s3 = boto3.client("s3", region_name="ca-central-1", aws_access_key_id="foo", aws_secret_access_key="bar")
+    mocker.patch("app.s3_client.s3_csv_client.get_aws_client", return_value=s3)
+    with Stubber(s3) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def test_list_bulk_send_uploads_lists_every_page_of_the_bucket(client, mocker, stubbed_s3_client):
+    mock_redis = mocker.patch("app.s3_client.s3_csv_client.redis_client")
+    mock_redis.get.return_value = None
+    bucket = "bulk-send"
+    mocker.patch.dict(current_app.config, {"BULK_SEND_AWS_BUCKET": bucket})
+    stubbed_s3_client.add_response(
+        "list_objects_v2",
+        {
+            "Contents": [
+                {"Key": "daily/a.csv", "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+                {"Key": "daily/b.csv", "LastModified": datetime(2024, 3, 1, tzinfo=timezone.utc)},
+            ],
+            "IsTruncated": True,
+            "NextContinuationToken": "token",
+        },
+        {"Bucket": bucket, "Prefix": ""},
+    )
+    stubbed_s3_client.add_response(
+        "list_objects_v2",
+        {
+            "Contents": [
+                {"Key": "daily/c.csv", "LastModified": datetime(2024, 2, 1, tzinfo=timezone.utc)},
+                {"Key": "weekly/d.csv", "LastModified": datetime(2024, 4, 1, tzinfo=timezone.utc)},
+            ],
+            "IsTruncated": False,
+        },
+        {"Bucket": bucket, "Prefix": "", "ContinuationToken": "token"},
+    )
+
+    files = list_bulk_send_uploads(prefix="daily/")
+
+    assert [f["key"] for f in files] == ["daily/b.csv", "daily/c.csv", "daily/a.csv"]
+    cache_key, cached_files = mock_redis.set.call_args[0]
+    assert cache_key == "bulk-send-uploads"
+    assert [f["key"] for f in json.loads(cached_files)] == ["weekly/d.csv", "daily/b.csv", "daily/c.csv", "daily/a.csv"]
+    assert mock_redis.set.call_args[1] == {"ex": current_app.config["BULK_SEND_UPLOADS_CACHE_TTL"]}
+
+
+@pytest.mark.parametrize(
+    "prefix, expected_keys",
+    [
+        ("", ["b.csv", "daily/a.csv"]),
+        ("daily/", ["daily/a.csv"]),
+        ("x" * 10_000, []),
+    ],
+)
+def test_list_bulk_send_uploads_filters_the_cached_listing(client, mocker, prefix, expected_keys):
+    files = [
+        {"key": "b.csv", "last_modified": "2024-02-01T00:00:00+00:00"},
+        {"key": "daily/a.csv", "last_modified": "2024-01-01T00:00:00+00:00"},
+    ]
+    mock_redis = mocker.patch("app.s3_client.s3_csv_client.redis_client")
+    mock_redis.get.return_value = json.dumps(files)
+    mock_get_aws_client = mocker.patch("app.s3_client.s3_csv_client.get_aws_client")
+
+    assert [f["key"] for f in list_bulk_send_uploads(prefix=prefix)] == expected_keys
+
+    mock_redis.get.assert_called_once_with("bulk-send-uploads")
+    mock_get_aws_client.assert_not_called()
+
+
+def test_list_bulk_send_uploads_lists_only_the_prefix_without_a_cache(client, mocker, stubbed_s3_client):
+    mock_redis = mocker.patch("app.s3_client.s3_csv_client.redis_client")
+    mocker.patch.dict(current_app.config, {"BULK_SEND_AWS_BUCKET": "bulk-send", "BULK_SEND_UPLOADS_CACHE_TTL": 0})
+    stubbed_s3_client.add_response(
+        "list_objects_v2",
+        {"Contents": [{"Key": "daily/a.csv", "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)}]},
+        {"Bucket": "bulk-send", "Prefix": "daily/"},
+    )
+
+    assert [f["key"] for f in list_bulk_send_uploads(prefix="daily/")] == ["daily/a.csv"]
+
+    mock_redis.get.assert_not_called()
+    mock_redis.set.assert_not_called()
+
+
+def test_copy_bulk_send_file_to_uploads_copies_the_file_within_s3(client, mocker):
+    mocker.patch("app.s3_client.s3_csv_client.uuid.uuid4", return_value="5678")
+    mocker.patch.dict(current_app.config, {"BULK_SEND_AWS_BUCKET": "bulk-send"})
+    mocker.patch("app.s3_client.s3_csv_client.redis_client")
+    mock_get_aws_client = mocker.patch("app.s3_client.s3_csv_client.get_aws_client")
+
+    assert copy_bulk_send_file_to_uploads("1234", "daily/a.csv") == "5678"
+
+    mock_get_aws_client.assert_called_once_with("s3", region_name=current_app.config["AWS_REGION"])
+    args, kwargs = mock_get_aws_client.return_value.copy.call_args
+    assert args == (
+        {"Bucket": "bulk-send", "Key": "daily/a.csv"},
+        current_app.config["CSV_UPLOAD_BUCKET_NAME"],
+        "service-1234-notify/5678.csv",
+    )
+    assert kwargs["ExtraArgs"] == {"ServerSideEncryption": "AES256"}
+    assert kwargs["Config"].multipart_threshold == MULTIPART_COPY_CHUNK_SIZE
+    mock_get_aws_client.return_value.get_object.assert_not_called()
+
+
+def test_copy_bulk_send_file_to_uploads_multipart_copies_big_files(client, mocker, stubbed_s3_client):
+    mocker.patch.dict(current_app.config, {"BULK_SEND_AWS_BUCKET": "bulk-send"})
+    mocker.patch("app.s3_client.s3_csv_client.redis_client")
+    stubbed_s3_client.add_response("head_object", {"ContentLength": MULTIPART_COPY_CHUNK_SIZE + 1})
+    stubbed_s3_client.add_response("create_multipart_upload", {"UploadId": "upload"})
+    stubbed_s3_client.add_response("upload_part_copy", {"CopyPartResult": {"ETag": "1"}})
+    stubbed_s3_client.add_response("upload_part_copy", {"CopyPartResult": {"ETag": "2"}})
+    stubbed_s3_client.add_response("complete_multipart_upload", {})
+
+    copy_bulk_send_file_to_uploads("1234", "a.csv")
+
+
+def test_copy_bulk_send_file_to_uploads_clears_the_cached_listings(client, mocker):
+    mock_redis = mocker.patch("app.s3_client.s3_csv_client.redis_client")
+    mocker.patch("app.s3_client.s3_csv_client.get_aws_client")
+
+    copy_bulk_send_file_to_uploads("1234", "a.csv")
+
+    mock_redis.delete.assert_called_once_with("bulk-send-uploads")
+    mock_redis.delete_cache_keys_by_pattern.assert_not_called()
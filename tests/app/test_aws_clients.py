@@ -0,0 +1,49 @@
+import pytest
+from app.aws_clients import get_aws_client, get_s3_resource
+
+from app import aws_clients
+from tests.conftest import set_config
+
+
+@pytest.fixture(autouse=True)
+def new_boto3_session(mocker):
+    mocker.patch("app.aws_clients._session_pid", None)
+    yield
+    aws_clients._clients.clear()
+
+
+def test_get_aws_client_reuses_the_client_for_each_service_and_region(app_):
+    with app_.app_context():
+        client = get_aws_client("ses", region_name="ca-central-1")
+
+        assert get_aws_client("ses", region_name="ca-central-1") is client
+        assert get_aws_client("ses", region_name="us-east-1") is not client
+        assert get_aws_client("sts", region_name="ca-central-1") is not client
+
+
+def test_get_aws_client_uses_the_pool_and_retry_config(app_):
+    with app_.app_context(), set_config(app_, "AWS_MAX_POOL_CONNECTIONS", 20), set_config(app_, "AWS_MAX_ATTEMPTS", 5):
+        client = get_aws_client("ses", region_name="ca-central-1")
+
+    assert client.meta.config.max_pool_connections == 20
+    assert client.meta.config.retries == {"max_attempts": 5, "mode": "standard"}
+
+
+def test_get_s3_resource_makes_a_new_resource_for_each_call(app_):
+    with app_.app_context(), set_config(app_, "AWS_MAX_POOL_CONNECTIONS", 20):
+        s3 = get_s3_resource("ca-central-1")
+
+        assert get_s3_resource("ca-central-1") is not s3
+        assert get_s3_resource("ca-central-1").meta.client is not s3.meta.client
+        assert get_s3_resource("ca-central-1").meta.client is not get_aws_client("s3", region_name="ca-central-1")
+
+    assert s3.meta.client.meta.config.max_pool_connections == 20
+
+
+def test_aws_clients_are_made_again_after_a_fork(app_, mocker):
+    with app_.app_context():
+        client = get_aws_client("ses", region_name="ca-central-1")
+
+        mocker.patch("app.aws_clients.os.getpid", return_value=-1)
+
+        assert get_aws_client("ses", region_name="ca-central-1") is not client
@@ -0,0 +1,60 @@
+from unittest.mock import call
+
+from app.articles.routing import GC_ARTICLES_ROUTES
+
+
+def test_warm_gc_articles_cache_fills_every_cache_in_both_languages(app_, mocker):
+    mock_cache_nav = mocker.patch("app.articles.menu.cache_nav", return_value=True)
+    mock_cache_slug_index = mocker.patch("app.articles.pages.cache_slug_index", return_value=True)
+    mock_cache_page = mocker.patch("app.articles.pages.cache_page_by_slug", return_value=True)
+    mock_get_latest_stats = mocker.patch("app.utils.get_latest_stats")
+    mocker.patch("app.extensions.cache.delete_memoized")
+
+    result = app_.test_cli_runner().invoke(args=["warm-gc-articles-cache"])
+
+    assert result.exit_code == 0
+    assert "0 failed" in result.output
+    assert mock_cache_nav.call_args_list == [call("en"), call("fr")]
+    assert mock_cache_slug_index.call_args_list == [call("en"), call("fr")]
+    assert call("wp/v2/pages", "features", "en") in mock_cache_page.call_args_list
+    assert call("wp/v2/pages", "fonctionnalites", "fr") in mock_cache_page.call_args_list
+    assert mock_cache_page.call_count == 2 * len(GC_ARTICLES_ROUTES)
+    assert mock_get_latest_stats.call_args_list == [call("en", filter_heartbeats=True), call("fr", filter_heartbeats=True)]
+
+
+def test_warm_gc_articles_cache_carries_on_past_failures(app_, mocker):
+    mocker.patch("app.articles.menu.cache_nav", side_effect=Exception("GC Articles is down"))
+    mocker.patch("app.articles.pages.cache_slug_index", return_value=True)
+    mock_cache_page = mocker.patch(
+        "app.articles.pages.cache_page_by_slug", side_effect=lambda endpoint, slug, lang: slug != "features"
+    )
+    mocker.patch("app.utils.get_latest_stats")
+    mocker.patch("app.extensions.cache.delete_memoized")
+
+    result = app_.test_cli_runner().invoke(args=["warm-gc-articles-cache"])
+
+    assert result.exit_code == 0
+    assert "3 failed: menu (en), /features, menu (fr)" in result.output
+    assert mock_cache_page.call_count == 2 * len(GC_ARTICLES_ROUTES)
+
+
+def test_warm_gc_articles_cache_runs_again_after_the_interval(app_, mocker):
+    mocker.patch("app.commands._warm_gc_articles_cache", return_value=[])
+    mock_sleep = mocker.patch("app.commands.time.sleep", side_effect=[None, KeyboardInterrupt])
+
+    app_.test_cli_runner().invoke(args=["warm-gc-articles-cache", "--interval", "600"])
+
+    assert mock_sleep.call_args_list == [call(600), call(600)]
+
+
+def test_delete_untagged_template_caches_sweeps_each_pattern_once(app_, mocker):
+    mock_delete_by_pattern = mocker.patch("app.notify_client.cache.delete_keys_by_pattern", return_value=3)
+
+    result = app_.test_cli_runner().invoke(args=["delete-untagged-template-caches"])
+
+    assert result.exit_code == 0
+    assert mock_delete_by_pattern.call_args_list == [
+        call("service-????????-????-????-????-????????????-templates"),
+        call("template-????????-????-????-????-????????????-version-*"),
+    ]
+    assert "Deleted 3 keys matching service-????????-????-????-????-????????????-templates" in result.output
@@ -1,18 +1,32 @@
+import csv
+import threading
+import time
+import tracemalloc
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from csv import DictReader
-from io import StringIO
+from functools import partial
+from io import BytesIO, StringIO
 from pathlib import Path
 from unittest.mock import Mock, patch
 from urllib.parse import unquote
 
 import pytest
 from app.utils import (
+    CSV_ROW_OFFSET_INDEX_STRIDE,
+    CSVRowReader,
+    SMSFragmentCounter,
     Spreadsheet,
+    _get_notification_pages,
+    count_csv_rows,
     documentation_url,
     email_safe,
     generate_next_dict,
     generate_notifications_csv,
     generate_previous_dict,
+    get_csv_row_offset_index,
+    get_csv_rows_from_offset_index,
+    get_csv_validation_pool,
     get_latest_stats,
     get_letter_printing_statement,
     get_limit_reset_time_et,
@@ -23,12 +37,16 @@ from app.utils import (
     get_verified_ses_domains,
     printing_today_or_tomorrow,
     report_security_finding,
+    run_concurrently,
+    validate_csv,
 )
-from flask import current_app, request
+from flask import current_app, g, request
 from freezegun import freeze_time
+from notifications_utils.recipients import RecipientCSV
+from notifications_utils.template import SMSMessageTemplate, SMSPreviewTemplate
 from pytest_mock import MockerFixture
 
-from app import format_datetime_relative
+from app import format_datetime_relative, notification_api_client
 from tests.conftest import (
     SERVICE_ONE_ID,
     create_reply_to_email_address,
@@ -190,6 +208,69 @@ def test_can_create_spreadsheet_from_large_excel_file():
     assert ret.as_csv_data
 
 
+@pytest.mark.parametrize("filename", sorted((Path.cwd() / "tests" / "spreadsheet_files").iterdir()))
+def test_iter_csv_data_from_file_matches_from_file(filename):
+    with open(filename, "rb") as spreadsheet:
+        expected = Spreadsheet.from_file(spreadsheet, filename=filename.name).as_csv_data
+    with open(filename, "rb") as spreadsheet:
+        assert b"".join(Spreadsheet.iter_csv_data_from_file(spreadsheet, filename=filename.name)) == expected.encode("utf-8")
+
+
+@pytest.mark.parametrize(
+    "file_contents",
+    [
+        b"",
+        b"\r\n\r\n",
+        b"phone number,name\n6502532222,Emily\n",
+        b"phone number,name\r6502532222,\xc3\x89mile\r\n\r\n6502532223,\xc3\x89lodie",
+        "phone number,name\r\n6502532222,Émile\r\n".encode("utf-8") * 20,
+    ],
+)
+def test_iter_csv_data_from_file_handles_lines_and_characters_split_between_reads(mocker, file_contents):
+    mocker.patch.object(Spreadsheet, "read_size", 3)
+    mocker.patch.object(Spreadsheet, "chunk_size", 20)
+
+    chunks = list(Spreadsheet.iter_csv_data_from_file(BytesIO(file_contents), filename="file.csv"))
+
+    assert b"".join(chunks) == Spreadsheet.from_file(BytesIO(file_contents), filename="file.csv").as_csv_data.encode("utf-8")
+    assert all(len(chunk) < 20 + 30 for chunk in chunks)
+
+
+def test_iter_csv_data_from_file_raises_for_files_that_are_not_utf_8():
+    with pytest.raises(UnicodeDecodeError):
+        list(Spreadsheet.iter_csv_data_from_file(BytesIO("phone number,name\r\n6502532222,Émile".encode("latin-1")), "file.csv"))
+
+
+@pytest.mark.parametrize("extension", ["csv", "tsv"])
+def test_iter_csv_data_from_file_uses_a_fraction_of_the_memory_for_big_files(tmp_path, extension):
+    separator = "," if extension == "csv" else "\t"
+    spreadsheet_file = tmp_path / f"big.{extension}"
+    spreadsheet_file.write_text(
+        "phone number{0}name{0}reference\n".format(separator)
+        + "".join("65025{1:05}{0}Name {1}{0}reference-{1}\n".format(separator, i) for i in range(100_000))
+    )
+
+    def peak_memory(convert):
+        with open(spreadsheet_file, "rb") as spreadsheet:
+            tracemalloc.start()
+            try:
+                for _chunk in convert(spreadsheet):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    before = peak_memory(lambda spreadsheet: [Spreadsheet.from_file(spreadsheet, filename=spreadsheet_file.name).as_csv_data])
+    after = peak_memory(lambda spreadsheet: Spreadsheet.iter_csv_data_from_file(spreadsheet, filename=spreadsheet_file.name))
+
+    if extension == "csv":
+        # Only the chunk being built and the one just yielded are held, however big the file is
+        assert after < 4 * Spreadsheet.chunk_size < before
+    else:
+        # tsv files are still decoded in one go, but the converted rows are not all kept
+        assert after < before
+
+
 def test_can_create_spreadsheet_from_dict():
     assert Spreadsheet.from_dict(
         OrderedDict(
@@ -255,7 +336,7 @@ def test_generate_notifications_csv_without_job(
                 job_name=None,
             ),
         )
-        assert list(generate_notifications_csv(service_id=fake_uuid))[1::] == expected_content
+        assert "".join(list(generate_notifications_csv(service_id=fake_uuid))[1::]) == "".join(expected_content)
 
 
 @pytest.mark.parametrize(
@@ -360,6 +441,67 @@ def test_generate_notifications_csv_returns_correct_csv_file(
         assert next(csv_file) == dict(zip(expected_column_headers, expected_1st_row))
 
 
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "phone number\n07700900123\n07700900124",
+        "\n\n  phone_number, name, code \n\n07700900123, Jo\n\n,,\n 07700900124 , Sam, 123\n",
+        'email address,"Address, line 1"\nfoo@bar.com,"1 Main Street,\nApartment 2"\r\nbar@foo.com,"\u200bPlace\u00a0"\r\n',
+        "",
+    ],
+)
+def test_csv_row_reader_reads_rows_like_recipient_csv(contents):
+    recipients = RecipientCSV(contents, template_type="email")
+    reader = CSVRowReader(contents, "email")
+
+    assert reader.column_headers == recipients.column_headers
+    assert len(reader) == len(recipients)
+    for index, row in enumerate(recipients.rows):
+        assert [reader[index].get(header) for header in reader.column_headers] == [
+            row.get(header).data for header in recipients.column_headers
+        ]
+
+
+@pytest.mark.parametrize(
+    "contents, template_type",
+    [
+        ("email address,name,name,email address\nfoo@bar.com,Jo,Joanne,bar@foo.com\nfoo@baz.com,,Sam,", "email"),
+        ("phone number,code,code,code\n07700900123,1,,3", "sms"),
+    ],
+)
+def test_csv_row_reader_reads_repeated_columns_like_recipient_csv(contents, template_type):
+    recipients = RecipientCSV(contents, template_type=template_type)
+    reader = CSVRowReader(contents, template_type)
+
+    assert reader.column_headers == recipients.column_headers
+    for index, row in enumerate(recipients.rows):
+        assert [reader[index].get(header) for header in reader.column_headers] == [
+            row.get(header).data for header in recipients.column_headers
+        ]
+    assert isinstance(reader[0].get(reader.column_headers[1]), list)
+
+
+def test_generate_notifications_csv_reads_job_rows_without_validating_the_upload(app_, mocker):
+    mocker.patch(
+        "app.notification_api_client.get_notifications_for_service",
+        side_effect=_get_notifications_csv(row_number=2, rows=2),
+    )
+    mocker.patch(
+        "app.s3_client.s3_csv_client.s3download",
+        return_value="phone_number,name\n07700900123,Jo\n\n07700900124,Sam\n07700900125,Alex\n",
+    )
+    mock_recipient_csv = mocker.patch("app.utils.RecipientCSV")
+
+    with app_.test_request_context():
+        csv_content = list(generate_notifications_csv(service_id="1234", job_id=fake_uuid, template_type="sms"))[1::]
+
+    assert [row[:3] for row in csv.reader(StringIO("".join(csv_content)))][1:] == [
+        ["2", "07700900124", "Sam"],
+        ["3", "07700900125", "Alex"],
+    ]
+    mock_recipient_csv.assert_not_called()
+
+
 def test_generate_notifications_csv_only_calls_once_if_no_next_link(
     app_,
     mocker,
@@ -429,6 +571,81 @@ def test_generate_notifications_csv_calls_twice_if_next_link(
         assert mock_get_notifications.mock_calls[1][2]["page"] == 2
 
 
+def test_generate_notifications_csv_yields_rows_in_chunks(app_, mocker):
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"LANGUAGES": ["en", "fr"]})
+        mocker.patch("app.utils.NOTIFICATIONS_CSV_CHUNK_SIZE", 200)
+        mocker.patch(
+            "app.notification_api_client.get_notifications_for_service",
+            side_effect=_get_notifications_csv(rows=10, job_id=None, job_name=None),
+        )
+
+        chunks = list(generate_notifications_csv(service_id=fake_uuid))[1::]
+
+    assert len(chunks) == 3
+    assert all(chunk.endswith("\r\n") for chunk in chunks)
+    rows = list(DictReader(StringIO("".join(chunks))))
+    assert len(rows) == 10
+    assert rows[9]["Recipient"] == "foo@bar.com"
+
+
+def test_generate_notifications_csv_fetches_the_next_page_before_writing_the_current_one(app_, mocker):
+    with app_.test_request_context():
+        fetched = threading.Event()
+        pages = [_get_notifications_csv(rows=2, with_links=True)("1234"), _get_notifications_csv(rows=1)("1234")]
+
+        def get_notifications_for_service(**kwargs):
+            if kwargs["page"] == 2:
+                fetched.set()
+            return pages[kwargs["page"] - 1]
+
+        mocker.patch("app.notification_api_client.get_notifications_for_service", side_effect=get_notifications_for_service)
+
+        notification_pages = _get_notification_pages({"service_id": "1234", "page": 1})
+        assert next(notification_pages) == pages[0]
+        assert fetched.wait(timeout=5)
+        assert list(notification_pages) == [pages[1]]
+
+
+def test_generate_notifications_csv_translates_labels_once(app_, mocker):
+    with app_.test_request_context():
+        mocker.patch("app.get_current_locale", return_value="fr")
+        mock_translate = mocker.patch("app.utils._l", side_effect=lambda value: value.upper())
+        mocker.patch(
+            "app.notification_api_client.get_notifications_for_service",
+            side_effect=_get_notifications_csv(rows=5, job_id=None, job_name=None),
+        )
+
+        rows = "".join(list(generate_notifications_csv(service_id=fake_uuid))[1::]).splitlines()[1:]
+
+    assert rows == ["foo@bar.com,foo,SMS,,,,DELIVERED,1943-04-19 12:00:00"] * 5
+    assert mock_translate.call_count == 2
+
+
+def test_generate_notifications_csv_does_not_keep_pages_in_the_request_memo(app_, mocker):
+    mocker.patch.object(notification_api_client, "request_memo_enabled", True)
+    mocker.patch.object(notification_api_client, "request_memo_max_entries", 50)
+    pages = [_get_notifications_csv(rows=2, with_links=True)("1234"), _get_notifications_csv(rows=1)("1234")]
+    mock_request = mocker.patch(
+        "notifications_python_client.base.BaseAPIClient.request",
+        side_effect=lambda method, url, params=None: pages[params["page"] - 1] if params else {"data": url},
+    )
+
+    with app_.test_request_context():
+        mocker.patch.dict("app.current_app.config", values={"LANGUAGES": ["en", "fr"]})
+        g.current_service = None
+
+        rows = "".join(list(generate_notifications_csv(service_id=fake_uuid))[1::]).splitlines()[1:]
+        assert len(rows) == 3
+        assert g.get("api_get_memo", {}) == {}
+
+        notification_api_client.get_notification(fake_uuid, "5678")
+        notification_api_client.get_notification(fake_uuid, "5678")
+        assert list(g.api_get_memo) == [("/service/{}/notifications/5678".format(fake_uuid), "null")]
+
+    assert mock_request.call_count == 3
+
+
 def test_get_cdn_domain_on_localhost(client, mocker):
     mocker.patch.dict("app.current_app.config", values={"ADMIN_BASE_URL": "http://localhost:6012"})
     domain = get_logo_cdn_domain()
@@ -824,7 +1041,7 @@ def test_get_new_default_reply_to_address_returns_none_if_one_reply_to(mocker: M
 class TestGetSESDomains:
     @pytest.fixture
     def mock_ses_client(self):
-        with patch("boto3.client") as mock_client:
+        with patch("app.utils.get_aws_client") as mock_client:
             mock_ses = Mock()
             mock_client.return_value = mock_ses
             yield mock_ses
@@ -909,3 +1126,228 @@ class TestGetLimitResetTimeET:
     def test_returns_dict_with_en_and_fr_keys(self):
         result = get_limit_reset_time_et()
         assert set(result.keys()) == {"en", "fr"}
+
+
+def test_run_concurrently_returns_results_in_order_and_keeps_request_context(app_):
+    def slow(value, delay):
+        time.sleep(delay)
+        return value, request.path, g.marker
+
+    with app_.test_request_context("/dashboard"):
+        g.marker = "from the view"
+        results = run_concurrently(partial(slow, "first", 0.05), partial(slow, "second", 0))
+
+    assert results == [("first", "/dashboard", "from the view"), ("second", "/dashboard", "from the view")]
+
+
+def test_run_concurrently_runs_calls_at_the_same_time(app_):
+    barrier = threading.Barrier(3, timeout=5)
+
+    with app_.test_request_context():
+        assert run_concurrently(barrier.wait, barrier.wait, barrier.wait)
+
+
+def test_run_concurrently_raises_errors_from_calls(app_):
+    def fail():
+        raise ValueError("nope")
+
+    with app_.test_request_context(), pytest.raises(ValueError, match="nope"):
+        run_concurrently(fail, lambda: "fine")
+
+
+def test_run_concurrently_runs_sequentially_when_disabled(app_):
+    with app_.test_request_context(), set_config(app_, "CONCURRENT_FETCH_ENABLED", False):
+        results = run_concurrently(threading.get_ident, threading.get_ident)
+
+    assert results == [threading.get_ident()] * 2
+
+
+def _parse_csv(contents):
+    return list(csv.reader(StringIO(contents.strip()), quoting=csv.QUOTE_MINIMAL, skipinitialspace=True))
+
+
+@pytest.fixture
+def indexed_csv():
+    rows = [["phone number", "name"]] + [
+        ["+1613555{:04}".format(i), "multi\nline" if i % 7 == 0 else 'Émile "quoted"' if i % 5 == 0 else f"name {i}"]
+        for i in range(CSV_ROW_OFFSET_INDEX_STRIDE * 2 + 57)
+    ]
+    with StringIO() as converted:
+        csv.writer(converted).writerows(rows)
+        contents = "\n  " + converted.getvalue() + "\n"
+    return contents, _parse_csv(contents)
+
+
+def test_get_csv_row_offset_index(indexed_csv):
+    contents, rows = indexed_csv
+    data = contents.encode("utf-8")
+
+    row_offset_index = get_csv_row_offset_index(contents)
+
+    assert len(row_offset_index) == 5
+    assert _parse_csv(data[row_offset_index[0] : row_offset_index[1]].decode("utf-8")) == rows[:1]
+    assert _parse_csv(data[row_offset_index[2] : row_offset_index[3]].decode("utf-8")) == rows[101:201]
+    assert row_offset_index[-1] == len(contents.rstrip().encode("utf-8"))
+
+
+@pytest.mark.parametrize("row_indices", [[0], [99, 100], [256], [250, 3, 150]])
+def test_get_csv_rows_from_offset_index_reads_only_the_blocks_needed(indexed_csv, row_indices):
+    contents, rows = indexed_csv
+    data = contents.encode("utf-8")
+    reads = []
+
+    def read_bytes(start, end):
+        reads.append((start, end))
+        return data[start:end]
+
+    csv_data, positions = get_csv_rows_from_offset_index(read_bytes, get_csv_row_offset_index(contents), row_indices)
+
+    parsed = _parse_csv(csv_data)
+    assert parsed[0] == rows[0]
+    for row_index in row_indices:
+        assert parsed[positions[row_index] + 1] == rows[row_index + 1]
+    assert len(reads) == 1 + len({row_index // CSV_ROW_OFFSET_INDEX_STRIDE for row_index in row_indices})
+
+
+@pytest.mark.parametrize("row_indices", [[0], [99, 100], [130, 5, 201]])
+def test_get_csv_row_offset_index_skips_empty_rows_like_recipient_csv(row_indices):
+    lines = [",,", "phone number,name", ""]
+    for i in range(CSV_ROW_OFFSET_INDEX_STRIDE * 2 + 10):
+        lines.append(f"+1613555{i:04},name {i}")
+        if i % 30 == 0:
+            lines += ["", ",,", " , "]
+    contents = "\n".join(lines) + "\n"
+    data = contents.encode("utf-8")
+
+    row_offset_index = get_csv_row_offset_index(contents)
+    csv_data, positions = get_csv_rows_from_offset_index(lambda start, end: data[start:end], row_offset_index, row_indices)
+
+    assert len(row_offset_index) == 5
+    rows = CSVRowReader(csv_data, "sms")
+    assert rows.column_headers == ["phone number", "name"]
+    for row_index in row_indices:
+        assert rows[positions[row_index]]["name"] == f"name {row_index}"
+        assert rows[positions[row_index]] == CSVRowReader(contents, "sms")[row_index]
+
+
+def test_get_csv_row_offset_index_for_a_file_with_only_a_header():
+    row_offset_index = get_csv_row_offset_index("phone number\r\n")
+
+    assert row_offset_index == [0, 12]
+    assert get_csv_rows_from_offset_index(lambda start, end: b"phone number"[start:end], row_offset_index, []) == (
+        "phone number",
+        {},
+    )
+
+
+@pytest.mark.parametrize(
+    "content, show_prefix",
+    [
+        ("Hello ((name)), your code is ((code)).", True),
+        ("((name)) ((name)) ((name)) " + "x" * 140, False),
+        ("Bonjour ((name)) — ((code))", True),
+        ("Hello ((name))((show??, see you soon))", False),
+        ("No placeholders here", True),
+    ],
+)
+def test_sms_fragment_counter_matches_rendering_every_row(content, show_prefix):
+    template = SMSPreviewTemplate({"content": content, "template_type": "sms"}, prefix="Service one", show_prefix=show_prefix)
+    rows = [
+        {"phone number": "6502532222", "Name": "Jo", "code": "1234", "show": "yes"},
+        {"phone number": "6502532222", "Name": "Jo-Anne O'Neil", "code": "12 34", "show": ""},
+        {"phone number": "6502532222", "Name": "x" * 150, "code": "+1 613/555", "show": "no"},
+        {"phone number": "6502532222", "Name": "Hélène", "code": "ŵ", "show": "yes"},
+        {"phone number": "6502532222", "Name": "Jo ", "code": "a ,", "show": "yes"},
+        {"phone number": "6502532222", "Name": "[Jo]", "code": None, "show": "yes"},
+        {"phone number": "6502532222", "Name": "", "code": "1234", "show": "yes"},
+    ]
+
+    expected = 0
+    for row in rows:
+        template.values = row
+        expected += template.fragment_count
+    template.values = {"name": "Preview"}
+
+    assert SMSFragmentCounter(template).total(rows) == expected
+    assert template.values == {"name": "Preview"}
+
+
+def test_sms_fragment_counter_only_renders_once_per_message_length(mocker):
+    template = SMSPreviewTemplate({"content": "Hello ((name))", "template_type": "sms"})
+    counter = SMSFragmentCounter(template)
+    render = mocker.spy(counter, "_render_fragment_count")
+
+    rows = [{"name": name} for name in ("Jo", "Al", "Sam", "Kim", "Jo", "x" * 200, "y" * 200)]
+
+    assert counter.total(rows) == 1 + 1 + 1 + 1 + 1 + 2 + 2
+    assert render.call_count == 3
+
+
+def test_validate_csv_matches_validating_in_one_go():
+    template = {"content": "Hi ((name))", "template_type": "sms"}
+    rows = ["phone number,name"]
+    for i in range(450):
+        if i % 97 == 5:
+            rows.append(f"not a number,person {i}")
+        elif i % 101 == 7:
+            rows.append(f"+1650253{i:04},")
+        elif i % 50 == 3:
+            # the same recipient as row 0, written differently
+            rows.append(f"(650) 253-0000,{'x' * 200 if i == 203 else 'dupe'}")
+        else:
+            rows.append(f"+1650253{i:04},person {i}")
+    contents = "\r\n".join(rows)
+
+    validation = validate_csv(contents, template, prefix="Service one", show_prefix=True)
+
+    recipients = RecipientCSV(
+        contents,
+        template=SMSMessageTemplate(template, prefix="Service one", show_prefix=True),
+        template_type="sms",
+        placeholders=["name"],
+    )
+    assert validation["row_count"] == len(recipients) == 450
+    assert validation["bad_recipient_row_count"] == len(list(recipients.rows_with_bad_recipients))
+    assert validation["missing_data_row_count"] == len(list(recipients.rows_with_missing_data))
+    assert validation["duplicate_row_indices"] == [row.index for row in recipients.rows_with_duplicate_recipients]
+    assert validation["count_of_duplicate_recipients"] == recipients.count_of_unique_duplicate_recipients
+    assert validation["count_of_duplicate_recipient_rows"] == recipients.count_of_duplicate_recipient_rows
+    assert validation["allowed_to_send_to"] is True
+    assert validation["error_row_indices"] == sorted(
+        {row.index for row in recipients.rows_with_bad_recipients} | {row.index for row in recipients.rows_with_missing_data}
+    )
+    assert validation["sms_parts_to_send"] == 450 + 1
+    assert validation["is_sms_parts_estimated"] is False
+    assert validation["row_offset_index"] == get_csv_row_offset_index(contents)
+
+
+def test_validate_csv_in_a_spawned_process(mocker):
+    mocker.patch("app.utils._csv_validation_pool", None)
+    template = {"content": "Hi ((name))", "subject": "Hi", "template_type": "email"}
+    rows = ["email address,name"] + [f"person{i % 150}@example.com,person {i}" for i in range(300)] + ["not an email,"]
+    contents = "\r\n".join(rows)
+
+    try:
+        assert isinstance(get_csv_validation_pool(2), ProcessPoolExecutor)
+        validation = get_csv_validation_pool(2).submit(validate_csv, contents, template).result()
+    finally:
+        get_csv_validation_pool(2).shutdown()
+
+    recipients = RecipientCSV(contents, template_type="email", placeholders=["name"])
+    assert validation["row_count"] == len(recipients) == 301
+    assert validation["error_row_indices"] == [300]
+    assert validation["duplicate_row_indices"] == [row.index for row in recipients.rows_with_duplicate_recipients]
+    assert validation["count_of_duplicate_recipients"] == recipients.count_of_unique_duplicate_recipients
+
+
+@pytest.mark.parametrize(
+    "contents, expected_count",
+    [
+        ("", 0),
+        ("email address\r\n", 0),
+        ("email address\r\na@example.com\r\n\r\n,\r\nb@example.com", 2),
+        ('email address,note\r\na@example.com,"one\r\ntwo"\r\nb@example.com,', 2),
+    ],
+)
+def test_count_csv_rows(contents, expected_count):
+    assert count_csv_rows(contents) == expected_count == len(RecipientCSV(contents, template_type="email", placeholders=[]))
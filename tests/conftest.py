@@ -3041,6 +3041,16 @@ def mock_s3_get_metadata(mocker):
     return mocker.patch("app.main.views.send.get_csv_metadata", return_value={})
 
 
+@pytest.fixture(scope="function", autouse=True)
+def mock_s3_get_row_offset_index(mocker):
+    return mocker.patch("app.main.views.send.get_row_offset_index", return_value=None)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_s3_upload_row_offset_index(mocker):
+    return mocker.patch("app.main.views.send.s3upload_row_offset_index")
+
+
 @pytest.fixture(scope="function")
 def sample_invite(mocker, service_one, status="pending", permissions=None):
     id_ = USER_ONE_ID